@@ -0,0 +1,1137 @@
+import argparse
+import asyncio
+import bisect
+import contextlib
+import itertools
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from telegram import Update
+from telegram.request import BaseRequest
+import psycopg2.errors
+import psycopg2.extensions
+import bot
+import database
+import web_panel
+from bot_cache import PredictionIndex
+from migrations import run_migrations
+from winners import determine_winners
+from points import rebuild_standings, standings_page, update_match_points, user_standing
+from webhook import WebhookServer, SECRET_HEADER
+
+BENCH_TOKEN = '123456:BENCHMARK-TOKEN'
+BENCH_BOT_USER = {'id': 123456, 'is_bot': True, 'first_name': 'Benchmark', 'username': 'benchmark_bot'}
+
+
+class FakeTelegramRequest(BaseRequest):
+    """Telegram API'ye gitmeyen sahte transport - her çağrıyı sayar ve gecikme ekler"""
+
+    def __init__(self, api_delay=0.0):
+        self.api_delay = api_delay
+        self.calls = {}
+        self._message_ids = itertools.count(1)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        endpoint = url.rsplit('/', 1)[-1]
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+        if self.api_delay:
+            await asyncio.sleep(self.api_delay)
+
+        params = request_data.parameters if request_data else {}
+        if endpoint == 'getMe':
+            result = BENCH_BOT_USER
+        elif endpoint in ('sendMessage', 'editMessageText'):
+            result = {
+                'message_id': next(self._message_ids),
+                'date': int(time.time()),
+                'chat': {'id': params.get('chat_id', bot.ALLOWED_GROUP_ID), 'type': 'group'},
+                'from': BENCH_BOT_USER,
+                'text': params.get('text', ''),
+            }
+        else:
+            result = True
+
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+
+def _user(user_id):
+    return {'id': user_id, 'is_bot': False, 'first_name': f'Kullanici{user_id}', 'username': f'kullanici{user_id}'}
+
+
+def _chat():
+    return {'id': bot.ALLOWED_GROUP_ID, 'type': 'group', 'title': 'Benchmark'}
+
+
+def command_update(update_id, user_id, command):
+    """Sahte komut update'i (/tahmin, /tahminlerim...)"""
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': _chat(),
+            'from': _user(user_id),
+            'text': command,
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(command)}],
+        },
+    }
+
+
+def callback_update(update_id, user_id, data):
+    """Sahte inline buton update'i (match_, score_...)"""
+    return {
+        'update_id': update_id,
+        'callback_query': {
+            'id': str(update_id),
+            'from': _user(user_id),
+            'chat_instance': 'benchmark',
+            'data': data,
+            'message': {
+                'message_id': update_id,
+                'date': int(time.time()),
+                'chat': _chat(),
+                'from': BENCH_BOT_USER,
+                'text': 'menu',
+            },
+        },
+    }
+
+
+def user_session(user_id, ids, mac_id=1, skor='2-1'):
+    """Tek kullanıcının tipik akışı: /tahmin -> maç seç -> skor seç"""
+    return [
+        command_update(next(ids), user_id, '/tahmin'),
+        callback_update(next(ids), user_id, f'match_{mac_id}'),
+        callback_update(next(ids), user_id, f'score_{mac_id}_{skor}'),
+    ]
+
+
+def simulated_db(delay, counter=None):
+    """bot.py veritabanı yardımcılarının yavaş veritabanını taklit eden sürümleri"""
+    match = {'id': 1, 'mac_adi': 'Galatasaray-Fenerbahçe', 'takim1': 'Galatasaray',
+             'takim2': 'Fenerbahçe', 'mac_tarihi': None}
+
+    def slow(value):
+        def helper(*args, **kwargs):
+            # Taklitte her yardımcı çağrısı tek round-trip sayılır
+            if counter is not None:
+                counter.add()
+            time.sleep(delay)
+            return value
+        return helper
+
+    return {
+        'kullanici_kayitli_mi': slow(True),
+        'get_active_matches': slow([match]),
+        'load_user_predictions': slow({}),
+        'load_predictions_for_matches': slow([]),
+        'save_prediction': slow(('kaydedildi', '2-1', match['mac_adi'])),
+        'get_user_predictions': slow([]),
+        'get_site_username': slow('kullanici'),
+    }
+
+
+async def _inline_run_db(func, *args, **kwargs):
+    # Eski davranış: senkron çağrı event loop'u bloklar
+    return func(*args, **kwargs)
+
+
+async def process_updates(app, updates):
+    """Update'leri Application'ın eşzamanlılık sınırı ile işle"""
+    processor = app.update_processor
+    await asyncio.gather(*(
+        processor.process_update(update, app.process_update(update)) for update in updates
+    ))
+
+
+@contextlib.contextmanager
+def simulated_bot(db_delay, blocking=False, counter=None):
+    """bot.py'yi yavaş veritabanı taklidiyle çalıştır, çıkışta eski hâline getir"""
+    patches = simulated_db(db_delay, counter)
+    if blocking:
+        patches['run_db'] = _inline_run_db
+
+    # Aktif maçlar ve tahmin indeksi bellekte - hot path maclar/tahminler okumaz
+    patches['prediction_index'] = PredictionIndex(
+        patches['load_user_predictions'], patches['load_predictions_for_matches']
+    )
+    originals = {name: getattr(bot, name) for name in patches}
+    for name, func in patches.items():
+        setattr(bot, name, func)
+    bot.match_cache.set_matches(patches['get_active_matches']())
+    try:
+        yield
+    finally:
+        for name, func in originals.items():
+            setattr(bot, name, func)
+
+
+async def run_async_benchmark(users, db_delay, api_delay, concurrency, blocking):
+    request = FakeTelegramRequest(api_delay)
+    with simulated_bot(db_delay, blocking):
+        app = bot.create_application(BENCH_TOKEN, request=request, concurrent_updates=concurrency)
+        try:
+            await app.initialize()
+            ids = itertools.count(1)
+            updates = [
+                Update.de_json(data, app.bot)
+                for user_id in range(1, users + 1)
+                for data in user_session(user_id, ids)
+            ]
+
+            start = time.perf_counter()
+            await process_updates(app, updates)
+            elapsed = time.perf_counter() - start
+        finally:
+            await app.shutdown()
+
+    return {
+        'mod': 'senkron (bloklayan)' if blocking else 'executor',
+        'update': len(updates),
+        'sure': elapsed,
+        'update_per_saniye': len(updates) / elapsed if elapsed else 0.0,
+        'api_cagrilari': sum(request.calls.values()),
+    }
+
+
+def cmd_async(args):
+    """Senkron ve executor tabanlı veritabanı erişimini karşılaştır"""
+    print(f"👥 Kullanıcı: {args.users} | 🐢 DB gecikmesi: {args.db_delay * 1000:.0f} ms | "
+          f"📡 API gecikmesi: {args.api_delay * 1000:.0f} ms | ⚙️ Eşzamanlılık: {args.concurrency}")
+
+    for blocking in (True, False):
+        result = asyncio.run(run_async_benchmark(
+            args.users, args.db_delay, args.api_delay, args.concurrency, blocking
+        ))
+        print(f"  {result['mod']:<22} {result['update']:>6} update  "
+              f"{result['sure']:>7.2f} sn  {result['update_per_saniye']:>9.1f} update/sn")
+
+
+def cmd_duplicate(args):
+    """Aynı (user_id, mac_id) için binlerce eşzamanlı tahmin denemesi - tek kayıt kalmalı"""
+    pool = database.get_pool()
+    pool.maxconn = max(pool.maxconn, args.workers)
+
+    conn = database.get_db_connection()
+    cursor = conn.cursor()
+    mac_adi = f"BENCH-{int(time.time() * 1000)}"
+    cursor.execute('''
+        INSERT INTO maclar (mac_adi, takim1, takim2) VALUES (%s, 'Bench A', 'Bench B')
+        RETURNING id
+    ''', (mac_adi,))
+    mac_id = cursor.fetchone()['id']
+    conn.commit()
+    conn.close()
+
+    user_id = 999000000 + mac_id
+    skorlar = [f"{i % 6}-{i // 6 % 6}" for i in range(args.attempts)]
+    baslangic_sayisi = min(args.workers, args.attempts)
+    barrier = threading.Barrier(baslangic_sayisi)
+
+    def attempt(i):
+        # İlk dalga aynı anda başlasın
+        if i < baslangic_sayisi:
+            barrier.wait()
+        return bot.save_prediction(user_id, 'bench', mac_id, skorlar[i])
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            results = list(executor.map(attempt, range(args.attempts)))
+        elapsed = time.perf_counter() - start
+
+        conn = database.get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COUNT(*) AS sayi, MIN(skor_tahmini) AS skor FROM tahminler
+            WHERE user_id = %s AND mac_id = %s
+        ''', (user_id, mac_id))
+        satir = cursor.fetchone()
+        conn.close()
+    finally:
+        conn = database.get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM tahminler WHERE mac_id = %s', (mac_id,))
+        cursor.execute('DELETE FROM maclar WHERE id = %s', (mac_id,))
+        conn.commit()
+        conn.close()
+
+    durumlar = Counter(r[0] for r in results)
+    donen_skorlar = {r[1] for r in results}
+    print(f"⚡ {args.attempts} deneme / {args.workers} thread: {elapsed:.2f} sn "
+          f"({args.attempts / elapsed:.0f} deneme/sn)")
+    print(f"  Sonuçlar: {dict(durumlar)} | Tablodaki satır: {satir['sayi']}")
+
+    ok = (durumlar['kaydedildi'] == 1 and satir['sayi'] == 1
+          and donen_skorlar == {satir['skor']})
+    print("✅ Tek tahmin kuralı korundu" if ok else "❌ Tek tahmin kuralı ihlal edildi!")
+    raise SystemExit(0 if ok else 1)
+
+
+async def run_webhook_benchmark(users, db_delay, concurrency, secret):
+    import httpx
+
+    request = FakeTelegramRequest()
+    with simulated_bot(db_delay):
+        app = bot.create_application(BENCH_TOKEN, request=request, concurrent_updates=concurrency)
+        server = WebhookServer(app, path='/telegram', secret_token=secret)
+        await app.initialize()
+        await app.start()
+        host, port = await server.start('127.0.0.1', 0)
+        url = f'http://{host}:{port}/telegram'
+        try:
+            ids = itertools.count(1)
+            payloads = [data for user_id in range(1, users + 1) for data in user_session(user_id, ids)]
+
+            limits = httpx.Limits(max_connections=concurrency)
+            async with httpx.AsyncClient(limits=limits) as client:
+                # Yanlış secret reddedilmeli
+                rejected = await client.post(url, json=payloads[0], headers={SECRET_HEADER: 'yanlis'})
+                headers = {SECRET_HEADER: secret}
+
+                start = time.perf_counter()
+                responses = await asyncio.gather(*(
+                    client.post(url, json=payload, headers=headers) for payload in payloads
+                ))
+                accepted = time.perf_counter() - start
+                await app.update_queue.join()
+                elapsed = time.perf_counter() - start
+        finally:
+            await server.stop()
+            await app.stop()
+            await app.shutdown()
+
+    return {
+        'update': len(payloads),
+        'kabul_suresi': accepted,
+        'sure': elapsed,
+        'http_200': sum(1 for r in responses if r.status_code == 200),
+        'yanlis_secret': rejected.status_code,
+        'sendMessage': request.calls.get('sendMessage', 0),
+    }
+
+
+def cmd_webhook(args):
+    """Gömülü webhook dinleyicisine kayıtlı update'leri POST et"""
+    result = asyncio.run(run_webhook_benchmark(args.users, args.db_delay, args.concurrency, 'bench-secret'))
+    print(f"🌐 {result['update']} update POST edildi: {result['http_200']} x 200, "
+          f"yanlış secret -> {result['yanlis_secret']}")
+    print(f"  Kabul: {result['kabul_suresi']:.2f} sn | İşlenme: {result['sure']:.2f} sn "
+          f"({result['update'] / result['sure']:.1f} update/sn) | sendMessage: {result['sendMessage']}")
+
+
+class RoundTripCounter:
+    """Veritabanı round-trip sayacı (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def add(self, n=1):
+        with self._lock:
+            self.count += n
+
+
+def counting_connection_factory(counter):
+    """Her execute/commit/rollback çağrısını sayan psycopg2 bağlantı sınıfı"""
+
+    class CountingCursor(database.TimedCursor):
+        def execute(self, query, vars=None):
+            counter.add()
+            return super().execute(query, vars)
+
+        def executemany(self, query, vars_list):
+            counter.add()
+            return super().executemany(query, vars_list)
+
+    class CountingConnection(psycopg2.extensions.connection):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.cursor_factory = CountingCursor
+
+        def commit(self):
+            counter.add()
+            return super().commit()
+
+        def rollback(self):
+            counter.add()
+            return super().rollback()
+
+    return CountingConnection
+
+
+# Yük testinde Postgres'e kaydedilen sahte kullanıcılar bu aralıktan seçilir
+LOAD_USER_BASE = 999100000
+
+# Kullanıcı akışındaki adımlar (user_session ile aynı sırada)
+LOAD_STEPS = ('tahmin_menu', 'mac_sec', 'skor_sec')
+
+
+@contextlib.contextmanager
+def postgres_bot(users, counter):
+    """bot.py'yi gerçek veritabanında çalıştır: geçici maç ve kayıtlı kullanıcılar oluştur, sonra sil"""
+    run_migrations()
+    database.close_pool()
+    pool = database.get_pool()
+    if not database.is_sqlite():
+        # Gömülü SQLite'da ağ turu yok, sayılacak bir şey de yok
+        pool.connect_kwargs['connection_factory'] = counting_connection_factory(counter)
+
+    user_ids = [LOAD_USER_BASE + i for i in range(1, users + 2)]
+    conn = database.get_db_connection()
+    cursor = conn.cursor()
+    mac_adi = f"BENCH-LOAD-{int(time.time() * 1000)}"
+    cursor.execute('''
+        INSERT INTO maclar (mac_adi, takim1, takim2) VALUES (%s, 'Bench A', 'Bench B')
+        RETURNING id
+    ''', (mac_adi,))
+    mac_id = cursor.fetchone()['id']
+    database.execute_values(cursor, '''
+        INSERT INTO kullanicilar (user_id, telegram_username, site_username) VALUES %s
+        ON CONFLICT (user_id) DO NOTHING
+    ''', [(user_id, f'kullanici{user_id}', f'bench{user_id}') for user_id in user_ids])
+    conn.commit()
+    conn.close()
+
+    bot.match_cache.refresh()
+    bot.prediction_index.warm([match['id'] for match in bot.match_cache.matches()])
+    try:
+        yield mac_id
+    finally:
+        conn = database.get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM tahminler WHERE mac_id = %s', (mac_id,))
+        cursor.execute('DELETE FROM maclar WHERE id = %s', (mac_id,))
+        cursor.execute('DELETE FROM kullanicilar WHERE user_id = ANY(%s)', (user_ids,))
+        conn.commit()
+        conn.close()
+        database.close_pool()
+
+
+def _percentiles(values):
+    """p50/p95/p99 (ms)"""
+    if not values:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+    if len(values) == 1:
+        return {key: values[0] * 1000 for key in ('p50', 'p95', 'p99')}
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return {'p50': cuts[49] * 1000, 'p95': cuts[94] * 1000, 'p99': cuts[98] * 1000}
+
+
+async def run_load_benchmark(users, concurrency, api_delay, think_time, db_delay, real_db):
+    counter = RoundTripCounter()
+    request = FakeTelegramRequest(api_delay)
+    errors = []
+
+    if real_db:
+        environment = postgres_bot(users, counter)
+        user_base = LOAD_USER_BASE
+    else:
+        environment = simulated_bot(db_delay, counter=counter)
+        user_base = 0
+
+    with environment as mac_id:
+        mac_id = mac_id or 1
+        app = bot.create_application(BENCH_TOKEN, request=request, concurrent_updates=concurrency)
+
+        async def on_error(update, context):
+            errors.append(context.error)
+        app.add_error_handler(on_error)
+
+        processor = app.update_processor
+        ids = itertools.count(1)
+
+        async def handle(data):
+            update = Update.de_json(data, app.bot)
+            before = counter.count
+            start = time.perf_counter()
+            await processor.process_update(update, app.process_update(update))
+            return time.perf_counter() - start, counter.count - before
+
+        try:
+            await app.initialize()
+
+            # Isınma + tek kullanıcıyla adım başına round-trip profili (eşzamanlılık yok)
+            profile = {}
+            for step, data in zip(LOAD_STEPS, user_session(user_base + users + 1, ids, mac_id)):
+                _, profile[step] = await handle(data)
+
+            latencies = {step: [] for step in LOAD_STEPS}
+            counter.count = 0
+
+            async def user_flow(user_id):
+                for step, data in zip(LOAD_STEPS, user_session(user_id, ids, mac_id)):
+                    elapsed, _ = await handle(data)
+                    latencies[step].append(elapsed)
+                    if think_time:
+                        await asyncio.sleep(think_time)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(user_flow(user_base + i) for i in range(1, users + 1)))
+            elapsed = time.perf_counter() - start
+            round_trips = counter.count
+        finally:
+            await app.shutdown()
+
+    interactions = sum(len(values) for values in latencies.values())
+    return {
+        'veritabani': database.get_backend().name if real_db else f'taklit ({db_delay * 1000:.0f} ms)',
+        'kullanici': users,
+        'eszamanlilik': concurrency,
+        'etkilesim': interactions,
+        'sure': elapsed,
+        'etkilesim_per_saniye': interactions / elapsed if elapsed else 0.0,
+        'round_trip_toplam': round_trips,
+        'round_trip_per_etkilesim': round_trips / interactions if interactions else 0.0,
+        'adimlar': {
+            step: dict(_percentiles(latencies[step]), round_trip=profile[step])
+            for step in LOAD_STEPS
+        },
+        'tumu': _percentiles([value for values in latencies.values() for value in values]),
+        'hata': len(errors),
+        'api_cagrilari': dict(request.calls),
+    }
+
+
+def cmd_load(args):
+    """Eşzamanlı kullanıcılarla tahmin akışı: gecikme yüzdelikleri, verim ve round-trip sayısı"""
+    result = asyncio.run(run_load_benchmark(
+        args.users, args.concurrency, args.api_delay, args.think_time, args.db_delay, args.db == 'postgres'
+    ))
+
+    print(f"👥 {result['kullanici']} kullanıcı | ⚙️ Eşzamanlılık: {result['eszamanlilik']} | "
+          f"🗄️ Veritabanı: {result['veritabani']}")
+    print(f"  {'adım':<14} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'round-trip':>11}")
+    for step, row in result['adimlar'].items():
+        print(f"  {step:<14} {row['p50']:>9.1f} {row['p95']:>9.1f} {row['p99']:>9.1f} {row['round_trip']:>11}")
+    tumu = result['tumu']
+    print(f"  {'tümü':<14} {tumu['p50']:>9.1f} {tumu['p95']:>9.1f} {tumu['p99']:>9.1f} "
+          f"{result['round_trip_per_etkilesim']:>11.2f}")
+    print(f"⚡ {result['etkilesim']} etkileşim {result['sure']:.2f} sn "
+          f"({result['etkilesim_per_saniye']:.1f} etkileşim/sn) | "
+          f"{result['round_trip_toplam']} DB round-trip | hata: {result['hata']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"📝 Sonuçlar {args.json} dosyasına yazıldı")
+
+    if result['hata']:
+        raise SystemExit(1)
+
+
+# Panel yük testinde gecikme histogramı sınırları (ms)
+PANEL_HISTOGRAM_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# /tahminler filtre değerleri - dataset.py verisiyle eşleşir
+TAHMIN_DURUMLARI = ('', 'dogru', 'yanlis', 'beklemede')
+
+
+def panel_request_mix(mac_ids, mac_filtre, kullanici_filtre):
+    """(rota adı, yol, ağırlık) listesi - /tahminler tüm filtre kombinasyonlarıyla"""
+    mix = [
+        ('/', '/', 10),
+        ('/maclar', '/maclar', 10),
+        ('/kazananlar', '/kazananlar', 15),
+        ('/api/stats', '/api/stats', 15),
+    ]
+
+    for mac, kullanici, durum in itertools.product(('', mac_filtre), ('', kullanici_filtre), TAHMIN_DURUMLARI):
+        params = {key: value for key, value in (('mac', mac), ('kullanici', kullanici), ('durum', durum)) if value}
+        name = '/tahminler?' + '&'.join(f"{key}={'*' if key != 'durum' else value}" for key, value in params.items())
+        path = '/tahminler' + ('?' + urlencode(params) if params else '')
+        mix.append((name.rstrip('?'), path, 2))
+
+    for mac_id in mac_ids:
+        mix.append(('/mac_tahminleri/<id>', f'/mac_tahminleri/{mac_id}', max(1, 20 // len(mac_ids))))
+    return mix
+
+
+def _histogram(values_ms):
+    """Kümülatif olmayan kova sayıları {'<=5': n, ..., '>10000': n}"""
+    counts = dict.fromkeys([f'<={b}' for b in PANEL_HISTOGRAM_BUCKETS] + [f'>{PANEL_HISTOGRAM_BUCKETS[-1]}'], 0)
+    for value in values_ms:
+        index = bisect.bisect_left(PANEL_HISTOGRAM_BUCKETS, value)
+        key = f'<={PANEL_HISTOGRAM_BUCKETS[index]}' if index < len(PANEL_HISTOGRAM_BUCKETS) \
+            else f'>{PANEL_HISTOGRAM_BUCKETS[-1]}'
+        counts[key] += 1
+    return counts
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+async def run_panel_benchmark(base_url, kullanici_adi, sifre, requests_total, concurrency, seed,
+                              mac_filtre, kullanici_filtre, max_matches, timeout):
+    import httpx
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        # Tek giriş - oturum çerezi tüm isteklerde paylaşılır
+        response = await client.post('/login', data={'kullanici_adi': kullanici_adi, 'sifre': sifre})
+        if response.status_code != 302 or response.headers.get('location', '').endswith('/login'):
+            raise SystemExit(f"❌ Giriş başarısız (HTTP {response.status_code})")
+
+        response = await client.get('/maclar')
+        mac_ids = sorted({int(i) for i in re.findall(r'/mac_duzenle/(\d+)', response.text)})[:max_matches]
+        mix = panel_request_mix(mac_ids, mac_filtre, kullanici_filtre)
+
+        # Aynı tohum aynı istek sırasını üretir
+        rng = random.Random(seed)
+        plan = rng.choices([(name, path) for name, path, _ in mix], weights=[w for _, _, w in mix],
+                           k=requests_total)
+
+        results = {}
+        queue = asyncio.Queue()
+        for item in plan:
+            queue.put_nowait(item)
+
+        async def worker():
+            while not queue.empty():
+                name, path = queue.get_nowait()
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    # Girişe yönlendirme de hata sayılır (oturum düştü)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                route = results.setdefault(name, {'sureler': [], 'hata': 0})
+                route['sureler'].append(elapsed_ms)
+                if not ok:
+                    route['hata'] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    def summary(values, errors):
+        return dict(
+            _percentiles([v / 1000 for v in values]),
+            istek=len(values),
+            hata=errors,
+            hata_orani=errors / len(values) if values else 0.0,
+            ortalama=statistics.fmean(values) if values else 0.0,
+            histogram=_histogram(values),
+        )
+
+    all_values = [v for route in results.values() for v in route['sureler']]
+    return {
+        'url': base_url,
+        'surum': _git_revision(),
+        'tarih': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'tohum': seed,
+        'eszamanlilik': concurrency,
+        'mac_sayisi': len(mac_ids),
+        'sure': elapsed,
+        'istek_per_saniye': len(plan) / elapsed if elapsed else 0.0,
+        'rotalar': {name: summary(route['sureler'], route['hata']) for name, route in sorted(results.items())},
+        'tumu': summary(all_values, sum(route['hata'] for route in results.values())),
+    }
+
+
+def compare_panel_reports(baseline, current, threshold):
+    """Rota bazında p95 karşılaştırması -> gerilemeler [(rota, eski, yeni)]"""
+    regressions = []
+    print(f"  {'rota':<46} {'eski p95':>10} {'yeni p95':>10} {'fark':>8}")
+    for name, row in current['rotalar'].items():
+        old = baseline['rotalar'].get(name)
+        if not old:
+            continue
+        fark = (row['p95'] - old['p95']) / old['p95'] if old['p95'] else 0.0
+        isaret = '❌' if fark > threshold or row['hata_orani'] > old['hata_orani'] else '  '
+        print(f"{isaret}{name:<46} {old['p95']:>10.1f} {row['p95']:>10.1f} {fark:>+7.0%}")
+        if isaret != '  ':
+            regressions.append((name, old['p95'], row['p95']))
+    return regressions
+
+
+def cmd_panel(args):
+    """Çalışan panele (gunicorn) ağırlıklı istek karışımı gönder, rota bazında rapor üret"""
+    sifre = args.sifre or os.environ.get('PANEL_SIFRE')
+    if not sifre:
+        raise SystemExit("❌ Şifre gerekli: --sifre veya PANEL_SIFRE")
+
+    result = asyncio.run(run_panel_benchmark(
+        args.url.rstrip('/'), args.kullanici, sifre, args.requests, args.concurrency, args.seed,
+        args.mac_filtre, args.kullanici_filtre, args.max_matches, args.timeout
+    ))
+
+    print(f"🌐 {result['url']} | ⚙️ Eşzamanlılık: {result['eszamanlilik']} | 🎲 Tohum: {result['tohum']} | "
+          f"maç: {result['mac_sayisi']}")
+    print(f"  {'rota':<46} {'istek':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'hata':>7}")
+    for name, row in list(result['rotalar'].items()) + [('tümü', result['tumu'])]:
+        print(f"  {name:<46} {row['istek']:>6} {row['p50']:>9.1f} {row['p95']:>9.1f} {row['p99']:>9.1f} "
+              f"{row['hata_orani']:>7.1%}")
+    print(f"⚡ {result['tumu']['istek']} istek {result['sure']:.2f} sn ({result['istek_per_saniye']:.1f} istek/sn)")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"📝 Rapor {args.json} dosyasına yazıldı")
+
+    if args.karsilastir:
+        with open(args.karsilastir, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"📊 Karşılaştırma: {baseline.get('surum') or args.karsilastir} -> {result['surum'] or 'şimdiki'}")
+        regressions = compare_panel_reports(baseline, result, args.esik)
+        if regressions:
+            print(f"❌ {len(regressions)} rotada gerileme (p95 > %{args.esik * 100:.0f} veya hata oranı arttı)")
+            raise SystemExit(1)
+        print("✅ Gerileme yok")
+
+
+def _measure(func, iterations):
+    """Çağrı başına CPU süresi (µs) ve bellek ayırma (bayt, blok)"""
+    func()  # ısınma
+
+    start = time.process_time()
+    for _ in range(iterations):
+        func()
+    cpu = (time.process_time() - start) / iterations * 1e6
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    results = [func() for _ in range(min(iterations, 200))]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, 'filename')
+    allocated = sum(stat.size_diff for stat in stats if stat.size_diff > 0) / len(results)
+    blocks = sum(stat.count_diff for stat in stats if stat.count_diff > 0) / len(results)
+    return cpu, allocated, blocks
+
+
+def cmd_keyboards(args):
+    """Klavye fabrikası öncesi/sonrası callback başına maliyet"""
+    matches = [
+        {'id': i, 'mac_adi': f'Takim{i}A-Takim{i}B', 'mac_tarihi': None}
+        for i in range(1, args.matches + 1)
+    ]
+    bot.prediction_index = PredictionIndex(lambda user_id: {}, lambda mac_ids: [])
+    bot.match_cache.set_matches(matches)
+    tahminli = {1, 3}
+
+    cases = [
+        ('match_ (skor klavyesi)',
+         lambda: bot.build_score_keyboard(1),
+         lambda: bot.keyboards.score_keyboard(1)),
+        ('custom_ (özel skor)',
+         lambda: bot.build_custom_score_keyboard(1),
+         lambda: bot.keyboards.custom_score_keyboard(1)),
+        ('/tahmin (maç listesi)',
+         lambda: bot.build_match_list(matches, tahminli),
+         lambda: bot.keyboards.match_list(matches, tahminli)),
+    ]
+
+    print(f"🔁 {args.iterations} tekrar, {args.matches} aktif maç")
+    print(f"  {'Callback':<24}{'Eski µs':>10}{'Yeni µs':>10}{'Eski bayt':>12}{'Yeni bayt':>12}"
+          f"{'Eski blok':>11}{'Yeni blok':>11}")
+    for name, old, new in cases:
+        old_cpu, old_bytes, old_blocks = _measure(old, args.iterations)
+        new_cpu, new_bytes, new_blocks = _measure(new, args.iterations)
+        print(f"  {name:<24}{old_cpu:>10.1f}{new_cpu:>10.1f}{old_bytes:>12.0f}{new_bytes:>12.0f}"
+              f"{old_blocks:>11.0f}{new_blocks:>11.0f}")
+
+
+def _create_explain_dataset(cursor, matches, predictions):
+    """Gerçek tabloların yapısıyla geçici (TEMP) tablolar oluştur ve doldur"""
+    for tablo in ('maclar', 'kullanicilar', 'tahminler', 'kazananlar'):
+        cursor.execute(f'CREATE TEMP TABLE {tablo} (LIKE public.{tablo} INCLUDING ALL)')
+
+    cursor.execute('''
+        INSERT INTO maclar (id, mac_adi, takim1, takim2, mac_tarihi, durum, gercek_skor)
+        SELECT i, 'Takim' || i || '-Rakip' || i, 'Takim' || i, 'Rakip' || i,
+               now() - (i || ' hours')::interval,
+               CASE WHEN i %% 10 = 0 THEN 'aktif' ELSE 'bitti' END,
+               CASE WHEN i %% 10 = 0 THEN NULL ELSE (i %% 4) || '-' || (i %% 3) END
+        FROM generate_series(1, %s) i
+    ''', (matches,))
+
+    kullanici_sayisi = -(-predictions // matches)
+    cursor.execute('''
+        INSERT INTO kullanicilar (user_id, telegram_username, site_username)
+        SELECT u, 'tg' || u, 'site' || u FROM generate_series(1, %s) u
+    ''', (kullanici_sayisi,))
+
+    # Her (user_id, mac_id) çifti bir kez - unique constraint korunur
+    cursor.execute('''
+        INSERT INTO tahminler (id, user_id, username, mac_id, mac_adi, skor_tahmini, tarih)
+        SELECT n, (n - 1) / %s + 1, 'tg' || ((n - 1) / %s + 1), m.id, m.mac_adi,
+               (n * 7 %% 5) || '-' || (n * 3 %% 4),
+               now() - (n || ' seconds')::interval
+        FROM generate_series(1, %s) n
+        JOIN maclar m ON m.id = (n - 1) %% %s + 1
+    ''', (matches, matches, predictions, matches))
+
+    # Geçici tablolar autovacuum tarafından analiz edilmez
+    for tablo in ('maclar', 'kullanicilar', 'tahminler', 'kazananlar'):
+        cursor.execute(f'ANALYZE {tablo}')
+
+
+def _plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from _plan_nodes(child)
+
+
+def _explain(cursor, query, params, timeout_ms):
+    """EXPLAIN ANALYZE -> (plan, süre ms) - zaman aşımında (None, None)"""
+    cursor.execute('SAVEPOINT explain_sorgu')
+    cursor.execute(f'SET LOCAL statement_timeout = {int(timeout_ms)}')
+    try:
+        cursor.execute('EXPLAIN (ANALYZE, FORMAT JSON) ' + query, params)
+        sonuc = cursor.fetchone()['QUERY PLAN'][0]
+        cursor.execute('RELEASE SAVEPOINT explain_sorgu')
+        return sonuc['Plan'], sonuc['Execution Time']
+    except psycopg2.errors.QueryCanceled:
+        cursor.execute('ROLLBACK TO SAVEPOINT explain_sorgu')
+        return None, None
+    finally:
+        cursor.execute('SET LOCAL statement_timeout = 0')
+
+
+def _plan_problems(plan, per_match):
+    """Plan OR birleşimi veya (maç bazlı sorgularda) tahminler taraması içeriyor mu"""
+    problems = []
+    for node in _plan_nodes(plan):
+        for key in ('Join Filter', 'Filter', 'Index Cond', 'Hash Cond'):
+            if ' OR ' in node.get(key, '') and 'mac_adi' in node.get(key, ''):
+                problems.append(f"{node['Node Type']}: {key} = {node[key]}")
+        if per_match and node['Node Type'] == 'Seq Scan' and node.get('Relation Name') == 'tahminler':
+            problems.append('tahminler üzerinde Seq Scan')
+    return problems
+
+
+def explain_cases(mac_id, mac_adi, gercek_skor, derin_offset, derin_imlec):
+    """(ad, eski sorgu, yeni sorgu, parametreler (eski, yeni), index zorunlu mu)"""
+    eski_join = 'LEFT JOIN maclar m ON (t.mac_id = m.id OR t.mac_adi = m.mac_adi)'
+    where_sql, params = web_panel.tahmin_filtreleri('', '', 'dogru')
+    return [
+        ('/tahminler liste',
+         web_panel.TAHMINLER_SELECT.replace('LEFT JOIN maclar m ON t.mac_id = m.id', eski_join)
+         + where_sql + ' ORDER BY t.tarih DESC LIMIT 50',
+         web_panel.TAHMINLER_SELECT + where_sql + ' ORDER BY t.tarih DESC LIMIT 50',
+         (params, params), False),
+        ('/tahminler sayım',
+         'SELECT COUNT(*)' + web_panel.TAHMINLER_FROM.replace('LEFT JOIN maclar m ON t.mac_id = m.id', eski_join)
+         + where_sql,
+         'SELECT COUNT(*)' + web_panel.TAHMINLER_FROM + where_sql,
+         (params, params), False),
+        ('/tahminler istatistik',
+         '''SELECT COUNT(*), COUNT(CASE WHEN t.skor_tahmini = m.gercek_skor THEN 1 END)
+            FROM tahminler t LEFT JOIN maclar m ON (t.mac_id = m.id OR t.mac_adi = m.mac_adi)''',
+         '''SELECT COUNT(*), COUNT(CASE WHEN t.skor_tahmini = m.gercek_skor THEN 1 END)
+            FROM tahminler t LEFT JOIN maclar m ON t.mac_id = m.id''',
+         ((), ()), False),
+        ('mac_tahminleri',
+         'SELECT t.id, t.user_id, t.username, t.skor_tahmini, t.tarih FROM tahminler t '
+         'WHERE t.mac_id = %s OR t.mac_adi = %s ORDER BY t.tarih ASC',
+         'SELECT t.id, t.user_id, t.username, t.skor_tahmini, t.tarih FROM tahminler t '
+         'WHERE t.mac_id = %s ORDER BY t.tarih ASC',
+         ((mac_id, mac_adi), (mac_id,)), True),
+        ('kazananlari_belirle',
+         'SELECT user_id, username, skor_tahmini FROM tahminler '
+         'WHERE (mac_id = %s OR mac_adi = %s) AND skor_tahmini = %s',
+         'SELECT user_id, username, skor_tahmini FROM tahminler '
+         'WHERE mac_id = %s AND skor_tahmini = %s',
+         ((mac_id, mac_adi, gercek_skor), (mac_id, gercek_skor)), True),
+        ('mac_sil sayım',
+         'SELECT COUNT(*) FROM tahminler WHERE mac_id = %s OR mac_adi = %s',
+         'SELECT COUNT(*) FROM tahminler WHERE mac_id = %s',
+         ((mac_id, mac_adi), (mac_id,)), True),
+        ('kazananlar',
+         '''SELECT t.id, m.mac_adi FROM tahminler t LEFT JOIN maclar m ON t.mac_adi = m.mac_adi
+            WHERE m.gercek_skor IS NOT NULL AND t.skor_tahmini = m.gercek_skor''',
+         '''SELECT t.id, m.mac_adi FROM tahminler t JOIN maclar m ON t.mac_id = m.id
+            WHERE m.gercek_skor IS NOT NULL AND t.skor_tahmini = m.gercek_skor''',
+         ((), ()), False),
+        ('/tahminler derin sayfa',
+         web_panel.TAHMINLER_SELECT + ' ORDER BY t.tarih DESC LIMIT 50 OFFSET %s',
+         web_panel.TAHMINLER_SELECT + ' AND (t.tarih, t.id) < (%s, %s) ORDER BY t.tarih DESC, t.id DESC LIMIT 51',
+         ((derin_offset,), derin_imlec), True),
+    ]
+
+
+def cmd_explain(args):
+    """Tahmin sorgularının planlarını büyük sentetik veriyle kontrol et (eski OR birleşimi ile karşılaştırır)"""
+    run_migrations()
+
+    conn = database.get_db_connection()
+    cursor = conn.cursor()
+    try:
+        start = time.perf_counter()
+        _create_explain_dataset(cursor, args.matches, args.predictions)
+        print(f"📦 {args.matches} maç, {args.predictions} tahmin oluşturuldu "
+              f"({time.perf_counter() - start:.1f} sn)")
+
+        # Skoru girilmiş (bitmiş) bir maç seç
+        mac_id = args.matches // 2 + 1
+        if mac_id % 10 == 0:
+            mac_id += 1
+        cursor.execute('SELECT mac_adi, gercek_skor FROM maclar WHERE id = %s', (mac_id,))
+        mac = cursor.fetchone()
+
+        # Son sayfalardan birinin imleci (OFFSET ile karşılaştırma için)
+        derin_offset = max(args.predictions - 100, 0)
+        cursor.execute('''
+            SELECT tarih, id FROM tahminler ORDER BY tarih DESC, id DESC LIMIT 1 OFFSET %s
+        ''', (derin_offset,))
+        derin = cursor.fetchone()
+
+        print(f"  {'Sorgu':<24}{'Eski (ms)':>12}{'Yeni (ms)':>12}  Plan")
+        ok = True
+        for ad, eski, yeni, (eski_params, yeni_params), per_match in explain_cases(
+            mac_id, mac['mac_adi'], mac['gercek_skor'], derin_offset, (derin['tarih'], derin['id'])
+        ):
+            _, eski_ms = _explain(cursor, eski, eski_params, args.timeout * 1000)
+            plan, yeni_ms = _explain(cursor, yeni, yeni_params, args.timeout * 1000)
+            problems = ['zaman aşımı'] if plan is None else _plan_problems(plan, per_match)
+            ok = ok and not problems
+
+            eski_text = f"{eski_ms:>12.1f}" if eski_ms is not None else f"{'>' + str(args.timeout * 1000):>12}"
+            yeni_text = f"{yeni_ms:>12.1f}" if yeni_ms is not None else f"{'-':>12}"
+            print(f"  {ad:<24}{eski_text}{yeni_text}  "
+                  + ('✅ ' + plan['Node Type'] if not problems else '❌ ' + '; '.join(problems)))
+    finally:
+        # Geçici tablolar transaction ile birlikte kaldırılır
+        conn.rollback()
+        conn.close()
+
+    print("✅ Tüm sorgular anahtar birleşimi/index kullanıyor" if ok else "❌ Sorun bulunan planlar var!")
+    raise SystemExit(0 if ok else 1)
+
+
+def _old_determine_winners(cursor, mac_id, gercek_skor):
+    """Önceki mac_duzenle döngüsü (kullanıcı başına SELECT + INSERT)"""
+    cursor.execute('''
+        SELECT DISTINCT user_id, username, skor_tahmini
+        FROM tahminler
+        WHERE mac_id = %s AND skor_tahmini = %s
+    ''', (mac_id, gercek_skor))
+    dogru_tahminler = cursor.fetchall()
+
+    cursor.execute('DELETE FROM kazananlar WHERE mac_id = %s', (mac_id,))
+    kazanan_sayisi = 0
+    for tahmin in dogru_tahminler:
+        cursor.execute('''
+            SELECT COUNT(*) as count FROM kazananlar
+            WHERE mac_id = %s AND user_id = %s
+        ''', (mac_id, tahmin['user_id']))
+        if cursor.fetchone()['count'] == 0:
+            cursor.execute('''
+                INSERT INTO kazananlar (mac_id, user_id, username, dogru_tahmin, cekilis_durumu)
+                VALUES (%s, %s, %s, %s, 'otomatik')
+            ''', (mac_id, tahmin['user_id'], tahmin['username'], tahmin['skor_tahmini']))
+            kazanan_sayisi += 1
+    return kazanan_sayisi
+
+
+def cmd_winners(args):
+    """Tek maçta çok sayıda tahminle kazanan belirleme süresi (DATABASE_URL gerekir)"""
+    run_migrations()
+
+    conn = database.get_db_connection()
+    cursor = conn.cursor()
+    mac_adi = f"BENCH-{int(time.time() * 1000)}"
+    cursor.execute('''
+        INSERT INTO maclar (mac_adi, takim1, takim2, durum, gercek_skor)
+        VALUES (%s, 'Bench A', 'Bench B', 'bitti', '2-1')
+        RETURNING id
+    ''', (mac_adi,))
+    mac_id = cursor.fetchone()['id']
+
+    # Her kullanıcı bir tahmin; yaklaşık --correct oranı doğru skoru bilir
+    cursor.execute('''
+        INSERT INTO tahminler (user_id, username, mac_id, mac_adi, skor_tahmini)
+        SELECT 900000000 + n, 'bench' || n, %s, %s,
+               CASE WHEN random() < %s THEN '2-1' ELSE (n %% 4) || '-' || (n %% 3 + 2) END
+        FROM generate_series(1, %s) n
+    ''', (mac_id, mac_adi, args.correct, args.predictions))
+    conn.commit()
+
+    sonuclar = []
+    try:
+        yontemler = [('set tabanlı', determine_winners)]
+        if not args.skip_old:
+            yontemler.insert(0, ('eski döngü', _old_determine_winners))
+
+        for ad, func in yontemler:
+            start = time.perf_counter()
+            sayi = func(cursor, mac_id, '2-1')
+            conn.commit()
+            sonuclar.append((ad, sayi, time.perf_counter() - start))
+    finally:
+        cursor.execute('DELETE FROM kazananlar WHERE mac_id = %s', (mac_id,))
+        cursor.execute('DELETE FROM tahminler WHERE mac_id = %s', (mac_id,))
+        cursor.execute('DELETE FROM maclar WHERE id = %s', (mac_id,))
+        conn.commit()
+        conn.close()
+
+    print(f"🏆 {args.predictions} tahmin, tek maç")
+    for ad, sayi, sure in sonuclar:
+        print(f"  {ad:<14}{sayi:>8} kazanan  {sure:>8.2f} sn")
+    if len({sayi for _, sayi, _ in sonuclar}) > 1:
+        print("❌ Yöntemler farklı sayıda kazanan buldu!")
+        raise SystemExit(1)
+
+
+def cmd_standings(args):
+    """Skor girişinde artımlı puan güncellemesi vs tüm geçmişten yeniden hesaplama (DATABASE_URL gerekir)"""
+    run_migrations()
+
+    conn = database.get_db_connection()
+    cursor = conn.cursor()
+    rng = random.Random(args.seed)
+    prefix = f"BENCH-{int(time.time() * 1000)}"
+
+    # Her şey tek transaction'da yapılır ve sonunda geri alınır
+    try:
+        mac_ids = []
+        for i in range(args.matches):
+            cursor.execute('''
+                INSERT INTO maclar (mac_adi, takim1, takim2, durum, gercek_skor)
+                VALUES (%s, 'Bench A', 'Bench B', 'bitti', %s)
+                RETURNING id
+            ''', (f"{prefix}-{i}", f"{rng.randint(0, 3)}-{rng.randint(0, 3)}"))
+            mac_ids.append(cursor.fetchone()['id'])
+
+        users = range(900000000, 900000000 + args.users)
+        for mac_id in mac_ids:
+            database.execute_values(cursor, '''
+                INSERT INTO tahminler (user_id, username, mac_id, mac_adi, skor_tahmini) VALUES %s
+            ''', [(user_id, f"bench{user_id}", mac_id, prefix, f"{rng.randint(0, 3)}-{rng.randint(0, 3)}")
+                  for user_id in rng.sample(users, min(args.per_match, args.users))], page_size=1000)
+
+        start = time.perf_counter()
+        kullanici = rebuild_standings(cursor)
+        rebuild_sure = time.perf_counter() - start
+
+        # Son maçın skoru değişir: sadece o maçın tahminleri puanlanır
+        start = time.perf_counter()
+        puanlanan = update_match_points(cursor, mac_ids[-1], '2-1')
+        artimli_sure = time.perf_counter() - start
+
+        sureler = []
+        for _ in range(args.reads):
+            start = time.perf_counter()
+            standings_page(cursor)
+            user_standing(cursor, rng.choice(users))
+            sureler.append((time.perf_counter() - start) * 1000)
+    finally:
+        conn.rollback()
+        conn.close()
+
+    print(f"🏆 {args.matches} maç x {args.per_match} tahmin, {kullanici} kullanıcı ({database.get_backend().name})")
+    print(f"  tüm geçmişten yeniden   {rebuild_sure:>8.3f} sn")
+    print(f"  tek maç skoru (artımlı) {artimli_sure:>8.3f} sn  ({puanlanan} tahmin)")
+    print(f"  /siralama okuma         p50 {statistics.median(sureler):.2f} ms  maks {max(sureler):.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Skor tahmin botu performans ölçümleri')
+    subparsers = parser.add_subparsers(dest='komut', required=True)
+
+    p = subparsers.add_parser('async', help='Yavaş veritabanı ile update/sn ölçümü')
+    p.add_argument('--users', type=int, default=200, help='Eşzamanlı kullanıcı sayısı')
+    p.add_argument('--db-delay', type=float, default=0.02, help='Her DB çağrısının gecikmesi (sn)')
+    p.add_argument('--api-delay', type=float, default=0.0, help='Her Telegram API çağrısının gecikmesi (sn)')
+    p.add_argument('--concurrency', type=int, default=bot.BOT_CONCURRENT_UPDATES,
+                   help='Aynı anda işlenecek update sayısı')
+    p.set_defaults(func=cmd_async)
+
+    p = subparsers.add_parser('duplicate', help='Eşzamanlı tekrar tahmin denemesi (DATABASE_URL gerekir)')
+    p.add_argument('--attempts', type=int, default=5000, help='Toplam deneme sayısı')
+    p.add_argument('--workers', type=int, default=64, help='Eşzamanlı thread sayısı')
+    p.set_defaults(func=cmd_duplicate)
+
+    p = subparsers.add_parser('webhook', help='Webhook dinleyicisi üzerinden update/sn ölçümü')
+    p.add_argument('--users', type=int, default=200, help='Eşzamanlı kullanıcı sayısı')
+    p.add_argument('--db-delay', type=float, default=0.02, help='Her DB çağrısının gecikmesi (sn)')
+    p.add_argument('--concurrency', type=int, default=bot.BOT_CONCURRENT_UPDATES,
+                   help='Aynı anda işlenecek update sayısı')
+    p.set_defaults(func=cmd_webhook)
+
+    p = subparsers.add_parser('load', help='Eşzamanlı kullanıcı yük testi (p50/p95/p99, round-trip)')
+    p.add_argument('--users', type=int, default=300, help='Eşzamanlı kullanıcı sayısı')
+    p.add_argument('--concurrency', type=int, default=bot.BOT_CONCURRENT_UPDATES,
+                   help='Aynı anda işlenecek update sayısı')
+    p.add_argument('--db', choices=('taklit', 'postgres'), default='taklit',
+                   help='taklit: gecikmeli sahte veritabanı, postgres: DATABASE_URL '
+                        '(yerel veritabanı önerilir; sqlite:///dosya.db ile gömülü SQLite)')
+    p.add_argument('--db-delay', type=float, default=0.005, help='Taklit modunda DB çağrısı gecikmesi (sn)')
+    p.add_argument('--api-delay', type=float, default=0.0, help='Her Telegram API çağrısının gecikmesi (sn)')
+    p.add_argument('--think-time', type=float, default=0.0, help='Kullanıcının adımlar arasındaki beklemesi (sn)')
+    p.add_argument('--json', help='Sonuçları referans olarak bu dosyaya yaz')
+    p.set_defaults(func=cmd_load)
+
+    p = subparsers.add_parser('panel', help='Çalışan panele HTTP yük testi, rota bazında JSON rapor')
+    p.add_argument('--url', default='http://127.0.0.1:8000', help='Panel adresi (gunicorn)')
+    p.add_argument('--kullanici', default=os.environ.get('PANEL_KULLANICI', 'admin'), help='Panel kullanıcı adı')
+    p.add_argument('--sifre', help='Panel şifresi (varsayılan: PANEL_SIFRE)')
+    p.add_argument('--requests', type=int, default=2000, help='Toplam istek sayısı')
+    p.add_argument('--concurrency', type=int, default=16, help='Eşzamanlı istek sayısı')
+    p.add_argument('--seed', type=int, default=42, help='İstek karışımı tohumu')
+    p.add_argument('--mac-filtre', default='Galatasaray', help='/tahminler maç filtresi değeri')
+    p.add_argument('--kullanici-filtre', default='ahmet', help='/tahminler kullanıcı filtresi değeri')
+    p.add_argument('--max-matches', type=int, default=20, help='/mac_tahminleri için en fazla maç')
+    p.add_argument('--timeout', type=float, default=30, help='İstek zaman aşımı (sn)')
+    p.add_argument('--json', help='Raporu bu dosyaya yaz')
+    p.add_argument('--karsilastir', help='Önceki JSON raporla p95/hata oranı karşılaştır')
+    p.add_argument('--esik', type=float, default=0.2, help='Gerileme sayılacak p95 artışı (0.2 = %%20)')
+    p.set_defaults(func=cmd_panel)
+
+    p = subparsers.add_parser('keyboards', help='Inline klavye oluşturma maliyeti (önce/sonra)')
+    p.add_argument('--iterations', type=int, default=2000, help='Tekrar sayısı')
+    p.add_argument('--matches', type=int, default=8, help='Aktif maç sayısı')
+    p.set_defaults(func=cmd_keyboards)
+
+    p = subparsers.add_parser('explain', help='Tahmin sorgularının EXPLAIN kontrolü (DATABASE_URL gerekir)')
+    p.add_argument('--matches', type=int, default=2000, help='Maç sayısı')
+    p.add_argument('--predictions', type=int, default=500000, help='Tahmin sayısı')
+    p.add_argument('--timeout', type=int, default=20, help='Eski sorgular için zaman aşımı (sn)')
+    p.set_defaults(func=cmd_explain)
+
+    p = subparsers.add_parser('winners', help='Kazanan belirleme süresi (DATABASE_URL gerekir)')
+    p.add_argument('--predictions', type=int, default=100000, help='Maçtaki tahmin sayısı')
+    p.add_argument('--correct', type=float, default=0.2, help='Doğru tahmin oranı')
+    p.add_argument('--skip-old', action='store_true', help='Eski döngüyü ölçme (uzak veritabanında yavaş)')
+    p.set_defaults(func=cmd_winners)
+
+    p = subparsers.add_parser('standings', help='Artımlı puan/sıralama güncellemesi süresi (DATABASE_URL gerekir)')
+    p.add_argument('--matches', type=int, default=200, help='Skoru girilmiş maç sayısı')
+    p.add_argument('--users', type=int, default=20000, help='Kullanıcı sayısı')
+    p.add_argument('--per-match', type=int, default=5000, help='Maç başına tahmin sayısı')
+    p.add_argument('--reads', type=int, default=200, help='Ölçülen sıralama okuması')
+    p.add_argument('--seed', type=int, default=42, help='Veri tohumu')
+    p.set_defaults(func=cmd_standings)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
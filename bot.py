@@ -1,11 +1,21 @@
+import asyncio
 import logging
 import os
-import psycopg2
-import psycopg2.extras
+import time
 from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.helpers import escape_markdown
 from telegram.ext import Application, CommandHandler, ContextTypes, CallbackQueryHandler, MessageHandler, filters
+from telegram.request import BaseRequest, HTTPXRequest
 from dotenv import load_dotenv
+from database import get_db_connection, run_db, close_pool, shutdown_db_executor, get_listen_dsn, is_sqlite
+from bot_cache import MatchCache, PredictionIndex
+from log_shipper import LogShipper
+from migrations import run_migrations
+from stats import StatsReconciler
+from points import standings_page, user_standing, POINTS_EXACT_SCORE, POINTS_GOAL_DIFFERENCE, POINTS_OUTCOME
+from metrics import Histogram, start_metrics_server, timed_async
+from slow_queries import SlowQueryRecorder
 
 load_dotenv()
 
@@ -16,6 +26,18 @@ logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(levelname
 ALLOWED_GROUP_ID = -4820404006
 LOG_CHANNEL_ID = -4814745228
 
+# Aynı anda işlenebilecek update sayısı
+BOT_CONCURRENT_UPDATES = int(os.environ.get('BOT_CONCURRENT_UPDATES', 256))
+
+# Çalışma modu: polling (varsayılan) veya webhook
+BOT_MODE = os.environ.get('BOT_MODE', 'polling')
+
+# Prometheus metrikleri bu yerel portta sunulur (0: kapalı)
+BOT_METRICS_PORT = int(os.environ.get('BOT_METRICS_PORT', 9101))
+
+HANDLER_SECONDS = Histogram('bot_handler_seconds', 'Bot handler süresi', ('handler', 'dal'))
+TELEGRAM_API_SECONDS = Histogram('telegram_api_seconds', 'Telegram API çağrı süresi', ('metod', 'sonuc'))
+
 def check_group_permission(func):
     """Sadece belirli grupta çalışmasını sağlayan decorator"""
     async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -43,152 +65,22 @@ def check_group_permission(func):
     
     return wrapper
 
-async def send_log(context: ContextTypes.DEFAULT_TYPE, message: str):
-    """Log kanalına mesaj gönder"""
-    try:
-        log_message = f"🤖 **BOT LOG**\n\n{message}\n\n⏰ {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}"
-        await context.bot.send_message(
-            chat_id=LOG_CHANNEL_ID,
-            text=log_message,
-            parse_mode='Markdown'
-        )
-    except Exception as e:
-        logging.error(f"Log gönderilemedi: {e}")
+# Log kanalı mesajları arka planda toplu gönderilir
+log_shipper = LogShipper(LOG_CHANNEL_ID)
 
-def get_db_connection():
-    """PostgreSQL bağlantısı"""
-    database_url = os.environ.get('DATABASE_URL')
-    if not database_url:
-        raise Exception("DATABASE_URL environment variable is required!")
-    return psycopg2.connect(database_url, cursor_factory=psycopg2.extras.RealDictCursor)
+# Panel istatistik sayaçları periyodik olarak tam sayımla düzeltilir
+stats_reconciler = StatsReconciler()
+
+# Eşiği aşan sorgular parmak iziyle toplanır, en yavaşlarının planı alınır
+slow_query_recorder = SlowQueryRecorder('bot')
+
+async def send_log(context: ContextTypes.DEFAULT_TYPE, message: str):
+    """Log kanalına mesaj gönder (kuyruğa ekler, beklemez)"""
+    log_shipper.enqueue(message)
 
 def init_database():
-    """Veritabanını başlat ve constraint'leri düzelt"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        # Maçlar tablosu
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS maclar (
-                id SERIAL PRIMARY KEY,
-                mac_adi VARCHAR(200) NOT NULL UNIQUE,
-                takim1 VARCHAR(100) NOT NULL,
-                takim2 VARCHAR(100) NOT NULL,
-                mac_tarihi TIMESTAMP,
-                durum VARCHAR(20) DEFAULT 'aktif',
-                gercek_skor VARCHAR(20),
-                olusturma_tarihi TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Kullanıcılar tablosu
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS kullanicilar (
-                user_id BIGINT PRIMARY KEY,
-                telegram_username VARCHAR(100),
-                site_username VARCHAR(50) NOT NULL,
-                kayit_tarihi TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Tahminler tablosu
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tahminler (
-                id SERIAL PRIMARY KEY,
-                user_id BIGINT NOT NULL,
-                username VARCHAR(100),
-                mac_id INTEGER REFERENCES maclar(id),
-                mac_adi VARCHAR(200),
-                skor_tahmini VARCHAR(20),
-                tarih TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Kazananlar tablosu
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS kazananlar (
-                id SERIAL PRIMARY KEY,
-                mac_id INTEGER REFERENCES maclar(id),
-                user_id BIGINT,
-                username VARCHAR(100),
-                dogru_tahmin VARCHAR(20),
-                cekilis_durumu VARCHAR(20) DEFAULT 'otomatik',
-                kazanma_tarihi TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # YÖNETİCİLER TABLOSU
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS yoneticiler (
-                id SERIAL PRIMARY KEY,
-                kullanici_adi VARCHAR(50) UNIQUE NOT NULL,
-                sifre_hash VARCHAR(255) NOT NULL,
-                tam_isim VARCHAR(100),
-                yetki_seviyesi VARCHAR(20) DEFAULT 'admin',
-                son_giris TIMESTAMP,
-                olusturma_tarihi TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                aktif BOOLEAN DEFAULT true
-            )
-        ''')
-        
-        # Varsayılan admin kullanıcısı oluştur
-        cursor.execute('''
-            SELECT COUNT(*) as count FROM yoneticiler WHERE kullanici_adi = 'admin'
-        ''')
-        
-        result = cursor.fetchone()
-        if result and result['count'] == 0:
-            # hash_password fonksiyonu yoksa basit bir hash yapalım
-            import hashlib
-            varsayilan_sifre = "admin123"
-            sifre_hash = hashlib.sha256(varsayilan_sifre.encode()).hexdigest()
-            
-            cursor.execute('''
-                INSERT INTO yoneticiler (kullanici_adi, sifre_hash, tam_isim, yetki_seviyesi)
-                VALUES (%s, %s, %s, %s)
-            ''', ('admin', sifre_hash, 'Sistem Yöneticisi', 'super_admin'))
-            
-            print("✅ Varsayılan admin kullanıcısı oluşturuldu (Kullanıcı: admin, Şifre: admin123)")
-        
-        # Mevcut unique constraint'i kontrol et - GÜVENLİ YÖNTEM
-        cursor.execute('''
-            SELECT COUNT(*) as count
-            FROM information_schema.table_constraints 
-            WHERE table_name = 'tahminler' 
-            AND constraint_type = 'UNIQUE'
-            AND constraint_name = 'tahminler_user_mac_unique'
-        ''')
-        
-        constraint_result = cursor.fetchone()
-        constraint_exists = constraint_result and constraint_result['count'] > 0
-        
-        # Eğer constraint yoksa ekle
-        if not constraint_exists:
-            try:
-                cursor.execute('''
-                    ALTER TABLE tahminler 
-                    ADD CONSTRAINT tahminler_user_mac_unique 
-                    UNIQUE (user_id, mac_id)
-                ''')
-                print("✅ UNIQUE constraint eklendi")
-            except psycopg2.errors.DuplicateObject:
-                # Constraint zaten varsa geç
-                print("ℹ️ UNIQUE constraint zaten mevcut")
-            except Exception as constraint_error:
-                print(f"⚠️ Constraint ekleme hatası (göz ardı edildi): {constraint_error}")
-        else:
-            print("ℹ️ UNIQUE constraint zaten mevcut")
-        
-        conn.commit()
-        print("✅ Veritabanı başarıyla güncellendi")
-        
-    except Exception as e:
-        conn.rollback()
-        print(f"❌ Veritabanı hatası: {e}")
-        raise e
-    finally:
-        conn.close()
+    """Veritabanını başlat - bekleyen şema migration'larını uygula"""
+    run_migrations()
 
 
 def kullanici_kayitli_mi(user_id):
@@ -258,52 +150,130 @@ def get_active_matches():
     conn.close()
     return matches
 
-def check_user_prediction_exists(user_id, mac_id):
-    """Kullanıcının bu maça daha önce tahmin yapıp yapmadığını kontrol et"""
+def load_user_predictions(user_id):
+    """Kullanıcının tahminlerini {mac_id: skor} olarak getir"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
         cursor.execute('''
-            SELECT id, skor_tahmini FROM tahminler 
-            WHERE user_id = %s AND mac_id = %s
-        ''', (user_id, mac_id))
-        
-        existing = cursor.fetchone()
-        return existing
-        
-    except Exception as e:
-        logging.error(f"Tahmin kontrol hatası: {e}")
-        return None
+            SELECT mac_id, skor_tahmini FROM tahminler 
+            WHERE user_id = %s
+        ''', (user_id,))
+        return {row['mac_id']: row['skor_tahmini'] for row in cursor.fetchall()}
     finally:
         conn.close()
 
-def save_prediction(user_id, username, mac_id, mac_adi, skor_tahmini):
-    """Tahmini veritabanına kaydet - TEK TAHMİN KURALI"""
+def load_predictions_for_matches(mac_ids):
+    """Verilen maçlara yapılmış tüm tahminleri tek sorguda getir"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        # Önce mevcut tahmini kontrol et
         cursor.execute('''
-            SELECT id, skor_tahmini FROM tahminler 
-            WHERE user_id = %s AND mac_id = %s
-        ''', (user_id, mac_id))
-        
-        existing = cursor.fetchone()
-        
-        if existing:
-            # ❌ ZATEN TAHMİN VAR - GÜNCELLEMEYİ ENGELLE
-            return "zaten_var", existing['skor_tahmini']
+            SELECT user_id, mac_id, skor_tahmini FROM tahminler 
+            WHERE mac_id = ANY(%s)
+        ''', (list(mac_ids),))
+        return cursor.fetchall()
+    finally:
+        conn.close()
+
+# Aktif maçlar bellekte tutulur, panel değişiklikleri NOTIFY ile tazeler
+match_cache = MatchCache(get_active_matches)
+
+async def get_cached_active_matches():
+    """Aktif maçları önbellekten getir (ilk çağrıda yükler)"""
+    if not match_cache.loaded:
+        await run_db(match_cache.refresh)
+    return match_cache.matches()
+
+async def get_cached_active_match(mac_id):
+    """Tek aktif maçı önbellekten getir"""
+    if not match_cache.loaded:
+        await run_db(match_cache.refresh)
+    return match_cache.get(mac_id)
+
+# Kullanıcı -> {mac_id: skor}; başlangıçta aktif maçlardan tek sorguda doldurulur
+prediction_index = PredictionIndex(load_user_predictions, load_predictions_for_matches)
+
+def _on_matches_changed(version):
+    """Aktif maç kümesi değişince tahmin indeksini yeniden doldur"""
+    try:
+        prediction_index.warm([match['id'] for match in match_cache.matches()])
+    except Exception as e:
+        logging.error(f"Tahmin indeksi doldurulamadı: {e}")
+
+match_cache.add_listener(_on_matches_changed)
+
+def _on_predictions_deleted(mac_id, user_id):
+    """Panelden silinen tahminleri indeksten çıkar; hangileri bilinmiyorsa indeks boşaltılır (tazelemede dolar)"""
+    if mac_id is None:
+        prediction_index.reset()
+    elif user_id is None:
+        prediction_index.forget_match(mac_id)
+    else:
+        prediction_index.forget(user_id, mac_id)
+
+match_cache.add_deletion_listener(_on_predictions_deleted)
+
+async def get_user_prediction_map(user_id):
+    """Kullanıcının tahminleri {mac_id: skor} - önce bellekteki indeksten"""
+    predictions = prediction_index.get(user_id)
+    if predictions is None:
+        predictions = await run_db(prediction_index.load, user_id)
+    return predictions
+
+async def get_existing_prediction(user_id, mac_id):
+    """Kullanıcının bu maça yaptığı tahmin (skor) - yoksa None"""
+    predictions = await get_user_prediction_map(user_id)
+    return predictions.get(mac_id)
+
+def save_prediction(user_id, username, mac_id, skor_tahmini):
+    """Tahmini tek sorguda kaydet - TEK TAHMİN KURALI
+    
+    Dönüş: (durum, skor, mac_adi)
+      - ("kaydedildi", yeni skor, maç adı)
+      - ("zaten_var", mevcut skor, maç adı)
+      - ("mac_yok", None, None) -> maç yok veya aktif değil
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        if is_sqlite():
+            result = _save_prediction_sqlite(cursor, user_id, username, mac_id, skor_tahmini)
         else:
-            # ✅ YENİ TAHMİN EKLEYEBİLİR
+            # Maç kontrolü + ekleme + mevcut tahmin tek round-trip'te; çakışmada hiçbir şey yazılmaz
             cursor.execute('''
-                INSERT INTO tahminler (user_id, username, mac_id, mac_adi, skor_tahmini)
-                VALUES (%s, %s, %s, %s, %s)
-            ''', (user_id, username, mac_id, mac_adi, skor_tahmini))
-            
-            conn.commit()
-            return "kaydedildi", None
+                WITH eklenen AS (
+                    INSERT INTO tahminler (user_id, username, mac_id, mac_adi, skor_tahmini)
+                    SELECT %s, %s, m.id, m.mac_adi, %s
+                    FROM maclar m
+                    WHERE m.id = %s AND m.durum = 'aktif'
+                    ON CONFLICT ON CONSTRAINT tahminler_user_mac_unique DO NOTHING
+                    RETURNING skor_tahmini, mac_adi
+                )
+                SELECT true AS yeni, skor_tahmini, mac_adi FROM eklenen
+                UNION ALL
+                SELECT false AS yeni, t.skor_tahmini, m.mac_adi
+                FROM tahminler t
+                JOIN maclar m ON m.id = t.mac_id
+                WHERE t.user_id = %s AND t.mac_id = %s AND m.durum = 'aktif'
+                  AND NOT EXISTS (SELECT 1 FROM eklenen)
+            ''', (user_id, username, skor_tahmini, mac_id, user_id, mac_id))
+            result = cursor.fetchone()
+            if not result:
+                # Çakışan tahmin bu sorgunun snapshot'ından sonra commit edildiyse SELECT onu görmez
+                result = _existing_prediction(cursor, user_id, mac_id)
+        conn.commit()
+        
+        if not result:
+            return "mac_yok", None, None
+        if result['yeni']:
+            # ✅ YENİ TAHMİN EKLENDİ
+            return "kaydedildi", result['skor_tahmini'], result['mac_adi']
+        # ❌ ZATEN TAHMİN VAR - GÜNCELLEME YAPILMADI
+        return "zaten_var", result['skor_tahmini'], result['mac_adi']
         
     except Exception as e:
         conn.rollback()
@@ -312,6 +282,31 @@ def save_prediction(user_id, username, mac_id, mac_adi, skor_tahmini):
     finally:
         conn.close()
 
+def _save_prediction_sqlite(cursor, user_id, username, mac_id, skor_tahmini):
+    """SQLite'da CTE içinde INSERT yok: eklenmezse mevcut tahmini aynı yazma transaction'ında oku"""
+    cursor.execute('''
+        INSERT INTO tahminler (user_id, username, mac_id, mac_adi, skor_tahmini)
+        SELECT %s, %s, m.id, m.mac_adi, %s
+        FROM maclar m
+        WHERE m.id = %s AND m.durum = 'aktif'
+        ON CONFLICT ON CONSTRAINT tahminler_user_mac_unique DO NOTHING
+        RETURNING true AS yeni, skor_tahmini, mac_adi
+    ''', (user_id, username, skor_tahmini, mac_id))
+    result = cursor.fetchone()
+    if result:
+        return result
+    return _existing_prediction(cursor, user_id, mac_id)
+
+def _existing_prediction(cursor, user_id, mac_id):
+    """Eklenemeyen tahminin mevcut kaydı (maç aktif değilse None)"""
+    cursor.execute('''
+        SELECT false AS yeni, t.skor_tahmini, m.mac_adi
+        FROM tahminler t
+        JOIN maclar m ON m.id = t.mac_id
+        WHERE t.user_id = %s AND t.mac_id = %s AND m.durum = 'aktif'
+    ''', (user_id, mac_id))
+    return cursor.fetchone()
+
 def get_user_predictions(user_id):
     """Kullanıcının tahminlerini getir"""
     conn = get_db_connection()
@@ -330,6 +325,140 @@ def get_user_predictions(user_id):
     conn.close()
     return results
 
+def get_standings(user_id):
+    """İlk sıralar ve kullanıcının kendi satırı (skor girilirken hesaplanan sıralamadan)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        return standings_page(cursor), user_standing(cursor, user_id)
+    finally:
+        conn.close()
+
+# Popüler skor seçenekleri
+SCORE_OPTIONS = [
+    ["0-0", "1-0", "0-1"],
+    ["1-1", "2-0", "0-2"],
+    ["2-1", "1-2", "2-2"],
+    ["3-0", "0-3", "3-1"],
+    ["1-3", "3-2", "2-3"],
+    ["4-0", "0-4", "4-1"],
+    ["1-4", "3-3", "4-2"]
+]
+
+# Özel skor seçenekleri (daha fazla)
+CUSTOM_SCORES = [
+    ["5-0", "0-5", "5-1"],
+    ["1-5", "4-3", "3-4"],
+    ["5-2", "2-5", "4-4"],
+    ["6-0", "0-6", "5-3"],
+    ["3-5", "6-1", "1-6"],
+    ["5-4", "4-5", "5-5"]
+]
+
+# Önbellekte tutulacak en fazla klavye sayısı
+KEYBOARD_CACHE_SIZE = int(os.environ.get('KEYBOARD_CACHE_SIZE', 2048))
+
+def _score_rows(mac_id, options):
+    return [
+        [InlineKeyboardButton(f"⚽ {score}", callback_data=f"score_{mac_id}_{score}") for score in row]
+        for row in options
+    ]
+
+def build_score_keyboard(mac_id):
+    """Maç için skor seçim klavyesi"""
+    keyboard = _score_rows(mac_id, SCORE_OPTIONS)
+    keyboard.append([InlineKeyboardButton("✏️ Özel Skor Gir", callback_data=f"custom_{mac_id}")])
+    keyboard.append([InlineKeyboardButton("🔙 Geri Dön", callback_data="back_to_matches")])
+    return InlineKeyboardMarkup(keyboard)
+
+def build_custom_score_keyboard(mac_id):
+    """Maç için özel skor klavyesi"""
+    keyboard = _score_rows(mac_id, CUSTOM_SCORES)
+    keyboard.append([InlineKeyboardButton("🔙 Geri Dön", callback_data=f"match_{mac_id}")])
+    return InlineKeyboardMarkup(keyboard)
+
+def _match_date_text(match):
+    """Tarih bilgisi varsa buton metnine ekle"""
+    if not match['mac_tarihi']:
+        return ""
+    try:
+        if isinstance(match['mac_tarihi'], str):
+            tarih_obj = datetime.fromisoformat(match['mac_tarihi'].replace('Z', '+00:00'))
+        else:
+            tarih_obj = match['mac_tarihi']
+        return f" ({tarih_obj.strftime('%d.%m %H:%M')})"
+    except:
+        return ""
+
+def build_match_list(matches, tahmin_yapilan_maclar):
+    """Aktif maç listesi klavyesi ve mesajı"""
+    keyboard = []
+    tahmin_yapilabilir_mac_sayisi = 0
+    
+    for match in matches:
+        mac_id = match['id']
+        mac_adi = match['mac_adi']
+        tarih_text = _match_date_text(match)
+        
+        # Tahmin durumunu kontrol et
+        if mac_id in tahmin_yapilan_maclar:
+            # Zaten tahmin yapılmış
+            button_text = f"✅ {mac_adi}{tarih_text} (Tahmin Yapıldı)"
+            keyboard.append([InlineKeyboardButton(button_text, callback_data=f"already_{mac_id}")])
+        else:
+            # Tahmin yapılabilir
+            button_text = f"⚽ {mac_adi}{tarih_text}"
+            keyboard.append([InlineKeyboardButton(button_text, callback_data=f"match_{mac_id}")])
+            tahmin_yapilabilir_mac_sayisi += 1
+    
+    message_text = f"""
+🎯 **Aktif Maçlar** ({len(matches)} adet)
+
+⚽ **Tahmin yapılabilir:** {tahmin_yapilabilir_mac_sayisi} maç
+✅ **Tahmin yapıldı:** {len(matches) - tahmin_yapilabilir_mac_sayisi} maç
+
+⚠️ **KURAL:** Her maç için sadece **BİR KEZ** tahmin yapabilirsiniz!
+
+Tahmin yapmak istediğiniz maçı seçin:
+    """
+    
+    return InlineKeyboardMarkup(keyboard), message_text
+
+class KeyboardFactory:
+    """Inline klavyeleri bir kez oluşturup aktif maç sürümüne göre önbellekte tutar"""
+    
+    def __init__(self, max_entries=KEYBOARD_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._cache = {}
+        self._version = None
+    
+    def _get(self, key, build):
+        # Maç seti değiştiyse tüm klavyeler geçersiz
+        if match_cache.version != self._version:
+            self._cache.clear()
+            self._version = match_cache.version
+        
+        value = self._cache.get(key)
+        if value is None:
+            if len(self._cache) >= self.max_entries:
+                self._cache.clear()
+            value = self._cache[key] = build()
+        return value
+    
+    def score_keyboard(self, mac_id):
+        return self._get(('score', mac_id), lambda: build_score_keyboard(mac_id))
+    
+    def custom_score_keyboard(self, mac_id):
+        return self._get(('custom', mac_id), lambda: build_custom_score_keyboard(mac_id))
+    
+    def match_list(self, matches, tahmin_yapilan_maclar):
+        """(klavye, mesaj) - kullanıcının tahmin yaptığı aktif maç kümesine göre paylaşılır"""
+        tahminli = frozenset(match['id'] for match in matches if match['id'] in tahmin_yapilan_maclar)
+        return self._get(('list', tahminli), lambda: build_match_list(matches, tahminli))
+
+keyboards = KeyboardFactory()
+
 async def handle_site_username(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Site kullanıcı adını işle"""
     if not context.user_data.get('waiting_for_site_username'):
@@ -370,7 +499,7 @@ async def handle_site_username(update: Update, context: ContextTypes.DEFAULT_TYP
     
     try:
         # Kullanıcıyı kaydet
-        kullanici_kaydet(user_id, telegram_username, site_username)
+        await run_db(kullanici_kaydet, user_id, telegram_username, site_username)
         context.user_data['waiting_for_site_username'] = False
         
         await update.message.reply_text(
@@ -407,6 +536,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 📋 **Hızlı Sistem - Tek Tıkla Tahmin:**
 /tahmin - Aktif maçları görüntüle ve hızlıca tahmin yap
 /tahminlerim - Geçmiş tahminlerinizi görün
+/siralama - Puan sıralamasını görün
 /yardim - Kullanım kılavuzu
 
 ✅ **Nasıl Çalışır:**
@@ -429,7 +559,7 @@ async def tahmin_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     telegram_username = update.effective_user.username or update.effective_user.first_name
     
     # Kullanıcı kayıtlı mı kontrol et
-    if not kullanici_kayitli_mi(user_id):
+    if not await run_db(kullanici_kayitli_mi, user_id):
         await update.message.reply_text(
             "🎯 **Hoş Geldiniz!**\n\n"
             "İlk tahminizi yapmadan önce **site kullanıcı adınızı** kaydetmeniz gerekiyor.\n\n"
@@ -445,7 +575,7 @@ async def tahmin_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     # Normal tahmin menüsüne devam et
-    matches = get_active_matches()
+    matches = await get_cached_active_matches()
     
     if not matches:
         await update.message.reply_text(
@@ -458,59 +588,10 @@ async def tahmin_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     # Kullanıcının tahmin yaptığı maçları kontrol et
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT mac_id FROM tahminler 
-        WHERE user_id = %s
-    ''', (user_id,))
+    tahmin_yapilan_maclar = await get_user_prediction_map(user_id)
     
-    tahmin_yapilan_maclar = [row['mac_id'] for row in cursor.fetchall()]
-    conn.close()
-    
-    # Inline keyboard oluştur
-    keyboard = []
-    tahmin_yapilabilir_mac_sayisi = 0
-    
-    for match in matches:
-        mac_id = match['id']
-        mac_adi = match['mac_adi']
-        
-        # Tarih bilgisi varsa ekle
-        tarih_text = ""
-        if match['mac_tarihi']:
-            try:
-                if isinstance(match['mac_tarihi'], str):
-                    tarih_obj = datetime.fromisoformat(match['mac_tarihi'].replace('Z', '+00:00'))
-                else:
-                    tarih_obj = match['mac_tarihi']
-                tarih_text = f" ({tarih_obj.strftime('%d.%m %H:%M')})"
-            except:
-                pass
-        
-        # Tahmin durumunu kontrol et
-        if mac_id in tahmin_yapilan_maclar:
-            # Zaten tahmin yapılmış
-            button_text = f"✅ {mac_adi}{tarih_text} (Tahmin Yapıldı)"
-            keyboard.append([InlineKeyboardButton(button_text, callback_data=f"already_{mac_id}")])
-        else:
-            # Tahmin yapılabilir
-            button_text = f"⚽ {mac_adi}{tarih_text}"
-            keyboard.append([InlineKeyboardButton(button_text, callback_data=f"match_{mac_id}")])
-            tahmin_yapilabilir_mac_sayisi += 1
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    message_text = f"""
-🎯 **Aktif Maçlar** ({len(matches)} adet)
-
-⚽ **Tahmin yapılabilir:** {tahmin_yapilabilir_mac_sayisi} maç
-✅ **Tahmin yapıldı:** {len(matches) - tahmin_yapilabilir_mac_sayisi} maç
-
-⚠️ **KURAL:** Her maç için sadece **BİR KEZ** tahmin yapabilirsiniz!
-
-Tahmin yapmak istediğiniz maçı seçin:
-    """
+    # Inline keyboard (önbellekten)
+    reply_markup, message_text = keyboards.match_list(matches, tahmin_yapilan_maclar)
     
     await update.message.reply_text(
         message_text,
@@ -537,12 +618,12 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         mac_id = int(query.data.split("_")[1])
         
         # Mevcut tahmini göster
-        existing = check_user_prediction_exists(user_id, mac_id)
+        existing = await get_existing_prediction(user_id, mac_id)
         
         if existing:
             try:
                 await query.answer(
-                    f"⚠️ Bu maça zaten tahmin yaptınız: {existing['skor_tahmini']}\n"
+                    f"⚠️ Bu maça zaten tahmin yaptınız: {existing}\n"
                     f"Her maç için sadece BİR tahmin yapabilirsiniz!", 
                     show_alert=True
                 )
@@ -552,7 +633,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 try:
                     await context.bot.send_message(
                         chat_id=update.effective_chat.id,
-                        text=f"⚠️ Bu maça zaten tahmin yaptınız: {existing['skor_tahmini']}\nHer maç için sadece BİR tahmin yapabilirsiniz!",
+                        text=f"⚠️ Bu maça zaten tahmin yaptınız: {existing}\nHer maç için sadece BİR tahmin yapabilirsiniz!",
                         parse_mode='Markdown'
                     )
                 except:
@@ -570,12 +651,12 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         mac_id = int(query.data.split("_")[1])
         
         # Önce kullanıcının bu maça tahmin yapıp yapmadığını kontrol et
-        existing = check_user_prediction_exists(user_id, mac_id)
+        existing = await get_existing_prediction(user_id, mac_id)
         
         if existing:
             try:
                 await query.answer(
-                    f"⚠️ Bu maça zaten tahmin yaptınız: {existing['skor_tahmini']}\n"
+                    f"⚠️ Bu maça zaten tahmin yaptınız: {existing}\n"
                     f"Her maç için sadece BİR tahmin yapabilirsiniz!", 
                     show_alert=True
                 )
@@ -585,7 +666,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 try:
                     await context.bot.send_message(
                         chat_id=update.effective_chat.id,
-                        text=f"⚠️ Bu maça zaten tahmin yaptınız: {existing['skor_tahmini']}\nHer maç için sadece BİR tahmin yapabilirsiniz!",
+                        text=f"⚠️ Bu maça zaten tahmin yaptınız: {existing}\nHer maç için sadece BİR tahmin yapabilirsiniz!",
                         parse_mode='Markdown'
                     )
                 except:
@@ -593,11 +674,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
         
         # Maç bilgisini getir
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM maclar WHERE id = %s AND durum = %s', (mac_id, 'aktif'))
-        match = cursor.fetchone()
-        conn.close()
+        match = await get_cached_active_match(mac_id)
         
         if not match:
             try:
@@ -606,33 +683,8 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 logging.warning(f"Mesaj düzenleme hatası: {e}")
             return
         
-        # Popüler skor seçenekleri
-        score_options = [
-            ["0-0", "1-0", "0-1"],
-            ["1-1", "2-0", "0-2"],
-            ["2-1", "1-2", "2-2"],
-            ["3-0", "0-3", "3-1"],
-            ["1-3", "3-2", "2-3"],
-            ["4-0", "0-4", "4-1"],
-            ["1-4", "3-3", "4-2"]
-        ]
-        
-        # Keyboard oluştur
-        keyboard = []
-        for row in score_options:
-            keyboard_row = []
-            for score in row:
-                keyboard_row.append(InlineKeyboardButton(
-                    f"⚽ {score}", 
-                    callback_data=f"score_{mac_id}_{score}"
-                ))
-            keyboard.append(keyboard_row)
-        
-        # Özel skor girme seçeneği
-        keyboard.append([InlineKeyboardButton("✏️ Özel Skor Gir", callback_data=f"custom_{mac_id}")])
-        keyboard.append([InlineKeyboardButton("🔙 Geri Dön", callback_data="back_to_matches")])
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        # Skor klavyesi (maç başına bir kez oluşturulur)
+        reply_markup = keyboards.score_keyboard(mac_id)
         
         message_text = f"""
 🏆 **Seçilen Maç:** {match['mac_adi']}
@@ -665,15 +717,10 @@ Seçiminizi dikkatli yapın, değiştiremezsiniz.
         parts = query.data.split("_")
         mac_id = int(parts[1])
         skor_tahmini = parts[2]
+        mac_adi = f"#{mac_id}"
         
-        # Maç bilgisini getir
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT mac_adi, durum FROM maclar WHERE id = %s', (mac_id,))
-        match = cursor.fetchone()
-        conn.close()
-        
-        if not match or match['durum'] != 'aktif':
+        # Önbellekte aktif değilse veritabanına hiç gitme
+        if not await get_cached_active_match(mac_id):
             try:
                 await query.edit_message_text("❌ Maç bulunamadı veya artık aktif değil!")
             except:
@@ -681,8 +728,18 @@ Seçiminizi dikkatli yapın, değiştiremezsiniz.
             return
         
         try:
-            # Tahmini kaydet - Tek tahmin kuralı
-            action, existing_prediction = save_prediction(user_id, username, mac_id, match['mac_adi'], skor_tahmini)
+            # Tahmini kaydet - Tek tahmin kuralı (maç kontrolü dahil tek sorgu)
+            action, existing_prediction, kayitli_mac_adi = await run_db(save_prediction, user_id, username, mac_id, skor_tahmini)
+            
+            if action == "mac_yok":
+                try:
+                    await query.edit_message_text("❌ Maç bulunamadı veya artık aktif değil!")
+                except:
+                    pass
+                return
+            
+            mac_adi = kayitli_mac_adi
+            prediction_index.record(user_id, mac_id, existing_prediction)
             
             if action == "zaten_var":
                 # Zaten tahmin var
@@ -710,19 +767,19 @@ Seçiminizi dikkatli yapın, değiştiremezsiniz.
                 except:
                     pass
                 
-                await send_log(context, f"🚫 **TEKRAR TAHMİN GİRİŞİMİ**\n👤 Kullanıcı: @{username}\n🏆 Maç: {match['mac_adi']}\n⚽ Mevcut Tahmin: {existing_prediction}\n❌ Denenen: {skor_tahmini}")
+                await send_log(context, f"🚫 **TEKRAR TAHMİN GİRİŞİMİ**\n👤 Kullanıcı: @{username}\n🏆 Maç: {mac_adi}\n⚽ Mevcut Tahmin: {existing_prediction}\n❌ Denenen: {skor_tahmini}")
                 
             elif action == "kaydedildi":
                 # Başarıyla kaydedildi
                 try:
-                    await query.answer(f"✅ Tahmin kaydedildi! {match['mac_adi']}: {skor_tahmini}", show_alert=True)
+                    await query.answer(f"✅ Tahmin kaydedildi! {mac_adi}: {skor_tahmini}", show_alert=True)
                 except Exception as e:
                     logging.warning(f"Alert gösterme hatası: {e}")
                     # Alternatif mesaj
                     try:
                         await context.bot.send_message(
                             chat_id=update.effective_chat.id,
-                            text=f"✅ Tahmin kaydedildi! {match['mac_adi']}: {skor_tahmini}",
+                            text=f"✅ Tahmin kaydedildi! {mac_adi}: {skor_tahmini}",
                             parse_mode='Markdown'
                         )
                     except:
@@ -735,7 +792,7 @@ Seçiminizi dikkatli yapın, değiştiremezsiniz.
                     pass
                 
                 # Başarılı tahmin logla
-                await send_log(context, f"✅ **YENİ TAHMİN KAYDEDİLDİ**\n👤 Kullanıcı: @{username}\n🏆 Maç: {match['mac_adi']}\n⚽ Tahmin: {skor_tahmini}")
+                await send_log(context, f"✅ **YENİ TAHMİN KAYDEDİLDİ**\n👤 Kullanıcı: @{username}\n🏆 Maç: {mac_adi}\n⚽ Tahmin: {skor_tahmini}")
             
         except Exception as e:
             try:
@@ -750,19 +807,19 @@ Seçiminizi dikkatli yapın, değiştiremezsiniz.
                     )
                 except:
                     pass
-            await send_log(context, f"🚨 **TAHMİN KAYDETME HATASI**\n👤 Kullanıcı: @{username}\n🏆 Maç: {match['mac_adi']}\n❌ Hata: {str(e)}")
+            await send_log(context, f"🚨 **TAHMİN KAYDETME HATASI**\n👤 Kullanıcı: @{username}\n🏆 Maç: {mac_adi}\n❌ Hata: {str(e)}")
     
     elif query.data.startswith("custom_"):
         # Özel skor girme
         mac_id = int(query.data.split("_")[1])
         
         # Önce kullanıcının bu maça tahmin yapıp yapmadığını kontrol et
-        existing = check_user_prediction_exists(user_id, mac_id)
+        existing = await get_existing_prediction(user_id, mac_id)
         
         if existing:
             try:
                 await query.answer(
-                    f"⚠️ Bu maça zaten tahmin yaptınız: {existing['skor_tahmini']}\n"
+                    f"⚠️ Bu maça zaten tahmin yaptınız: {existing}\n"
                     f"Her maç için sadece BİR tahmin yapabilirsiniz!", 
                     show_alert=True
                 )
@@ -771,11 +828,7 @@ Seçiminizi dikkatli yapın, değiştiremezsiniz.
             return
         
         # Maç bilgisini getir
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT mac_adi FROM maclar WHERE id = %s AND durum = %s', (mac_id, 'aktif'))
-        match = cursor.fetchone()
-        conn.close()
+        match = await get_cached_active_match(mac_id)
         
         if not match:
             try:
@@ -784,29 +837,8 @@ Seçiminizi dikkatli yapın, değiştiremezsiniz.
                 pass
             return
         
-        # Özel skor seçenekleri (daha fazla)
-        custom_scores = [
-            ["5-0", "0-5", "5-1"],
-            ["1-5", "4-3", "3-4"],
-            ["5-2", "2-5", "4-4"],
-            ["6-0", "0-6", "5-3"],
-            ["3-5", "6-1", "1-6"],
-            ["5-4", "4-5", "5-5"]
-        ]
-        
-        keyboard = []
-        for row in custom_scores:
-            keyboard_row = []
-            for score in row:
-                keyboard_row.append(InlineKeyboardButton(
-                    f"⚽ {score}", 
-                    callback_data=f"score_{mac_id}_{score}"
-                ))
-            keyboard.append(keyboard_row)
-        
-        keyboard.append([InlineKeyboardButton("🔙 Geri Dön", callback_data=f"match_{mac_id}")])
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        # Özel skor klavyesi (maç başına bir kez oluşturulur)
+        reply_markup = keyboards.custom_score_keyboard(mac_id)
         
         message_text = f"""
 🏆 **Maç:** {match['mac_adi']}
@@ -826,7 +858,7 @@ Seçiminizi dikkatli yapın, değiştiremezsiniz.
     elif query.data == "back_to_matches":
         # Ana menüye dön - Aynı şekilde try-except ile koruma
         user_id = update.effective_user.id
-        matches = get_active_matches()
+        matches = await get_cached_active_matches()
         
         if not matches:
             try:
@@ -840,59 +872,10 @@ Seçiminizi dikkatli yapın, değiştiremezsiniz.
             return
         
         # Kullanıcının tahmin yaptığı maçları kontrol et
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT mac_id FROM tahminler 
-            WHERE user_id = %s
-        ''', (user_id,))
+        tahmin_yapilan_maclar = await get_user_prediction_map(user_id)
         
-        tahmin_yapilan_maclar = [row['mac_id'] for row in cursor.fetchall()]
-        conn.close()
-        
-        # Inline keyboard oluştur
-        keyboard = []
-        tahmin_yapilabilir_mac_sayisi = 0
-        
-        for match in matches:
-            mac_id = match['id']
-            mac_adi = match['mac_adi']
-            
-            # Tarih bilgisi varsa ekle
-            tarih_text = ""
-            if match['mac_tarihi']:
-                try:
-                    if isinstance(match['mac_tarihi'], str):
-                        tarih_obj = datetime.fromisoformat(match['mac_tarihi'].replace('Z', '+00:00'))
-                    else:
-                        tarih_obj = match['mac_tarihi']
-                    tarih_text = f" ({tarih_obj.strftime('%d.%m %H:%M')})"
-                except:
-                    pass
-            
-            # Tahmin durumunu kontrol et
-            if mac_id in tahmin_yapilan_maclar:
-                # Zaten tahmin yapılmış
-                button_text = f"✅ {mac_adi}{tarih_text} (Tahmin Yapıldı)"
-                keyboard.append([InlineKeyboardButton(button_text, callback_data=f"already_{mac_id}")])
-            else:
-                # Tahmin yapılabilir
-                button_text = f"⚽ {mac_adi}{tarih_text}"
-                keyboard.append([InlineKeyboardButton(button_text, callback_data=f"match_{mac_id}")])
-                tahmin_yapilabilir_mac_sayisi += 1
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        message_text = f"""
-🎯 **Aktif Maçlar** ({len(matches)} adet)
-
-⚽ **Tahmin yapılabilir:** {tahmin_yapilabilir_mac_sayisi} maç
-✅ **Tahmin yapıldı:** {len(matches) - tahmin_yapilabilir_mac_sayisi} maç
-
-⚠️ **KURAL:** Her maç için sadece **BİR KEZ** tahmin yapabilirsiniz!
-
-Tahmin yapmak istediğiniz maçı seçin:
-        """
+        # Inline keyboard (önbellekten)
+        reply_markup, message_text = keyboards.match_list(matches, tahmin_yapilan_maclar)
         
         try:
             await query.edit_message_text(message_text, reply_markup=reply_markup, parse_mode='Markdown')
@@ -906,7 +889,7 @@ async def tahminlerim(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     username = update.effective_user.username or update.effective_user.first_name
     
-    predictions = get_user_predictions(user_id)
+    predictions = await run_db(get_user_predictions, user_id)
     
     if not predictions:
         await update.message.reply_text(
@@ -921,7 +904,7 @@ async def tahminlerim(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     # Site kullanıcı adını getir
-    site_username = get_site_username(user_id)
+    site_username = await run_db(get_site_username, user_id)
     site_info = f" ({site_username})" if site_username else ""
     
     message = f"📊 **@{username}{site_info} - Son Tahminleriniz:**\n\n"
@@ -966,6 +949,46 @@ async def tahminlerim(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(message, parse_mode='Markdown')
     await send_log(context, f"📊 **TAHMİN LİSTESİ GÖRÜNTÜLENDI**\n👤 Kullanıcı: @{username}\n🎯 Site: {site_username}\n📈 Toplam Tahmin: {len(predictions)}")
 
+# Sıralamada ilk üç için madalya
+SIRALAMA_MADALYALARI = {1: "🥇", 2: "🥈", 3: "🥉"}
+
+@check_group_permission
+async def siralama(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Puan sıralaması ve kullanıcının kendi sırası"""
+    user_id = update.effective_user.id
+    username = update.effective_user.username or update.effective_user.first_name
+    
+    ilk_siralar, kendi = await run_db(get_standings, user_id)
+    
+    if not ilk_siralar:
+        await update.message.reply_text(
+            "🏆 **Henüz sıralama yok!**\n\n"
+            "Maç sonuçları girildikçe puanlar burada görünecek.\n"
+            "🚀 **Tahmin için:** /tahmin",
+            parse_mode='Markdown'
+        )
+        await send_log(context, f"🏆 **SIRALAMA SORGUSU**\n👤 Kullanıcı: @{username}\n📊 Sonuç: Sıralama boş")
+        return
+    
+    message = "🏆 **Puan Sıralaması**\n\n"
+    
+    for satir in ilk_siralar:
+        rozet = SIRALAMA_MADALYALARI.get(satir['sira'], f"**{satir['sira']}.**")
+        # Kullanıcı adları _ * ` [ içerebilir; kaçırılmazsa Markdown mesajı reddedilir
+        isim = escape_markdown(satir['site_username'] or satir['username'] or 'Bilinmeyen', version=1)
+        message += f"{rozet} {isim} - **{satir['puan']}** puan\n"
+    
+    if kendi:
+        message += f"\n👤 **Sizin sıranız:** {kendi['sira']}. ({kendi['puan']} puan, {kendi['tam_skor']} tam skor)\n"
+    else:
+        message += "\n👤 Henüz puanlanmış tahmininiz yok.\n"
+    
+    message += (f"\n🎯 **Puanlama:** Tam skor {POINTS_EXACT_SCORE} | "
+                f"Gol farkı {POINTS_GOAL_DIFFERENCE} | Doğru sonuç {POINTS_OUTCOME}")
+    
+    await update.message.reply_text(message, parse_mode='Markdown')
+    await send_log(context, f"🏆 **SIRALAMA GÖRÜNTÜLENDİ**\n👤 Kullanıcı: @{username}\n📈 Sıra: {kendi['sira'] if kendi else '-'}")
+
 @check_group_permission
 async def yardim(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Yardım komutu"""
@@ -975,6 +998,7 @@ async def yardim(update: Update, context: ContextTypes.DEFAULT_TYPE):
 🚀 **Süper Hızlı Kullanım:**
 • `/tahmin` - Maçları gör ve hızlıca tahmin yap
 • `/tahminlerim` - Geçmiş tahminleri görüntüle
+• `/siralama` - Puan sıralaması ve kendi sıran
 • `/yardim` - Bu yardım menüsü
 
 ⚽ **3 Adımda Tahmin:**
@@ -1013,27 +1037,121 @@ Karışıklık yok, herkes kendi tahminini yapar.
     await update.message.reply_text(help_text, parse_mode='Markdown')
     await send_log(context, f"❓ **YARDIM KOMUTU**\n👤 Kullanıcı: @{update.effective_user.username or update.effective_user.first_name}")
 
-def main():
-    """Ana fonksiyon"""
-    init_database()
-    
-    TOKEN = os.environ.get('BOT_TOKEN', "8230185811:AAHJI59TpDIw1q4xKrvZyxhnjr5ZTCxkhJI")
+async def post_init(app: Application):
+    """Başlangıçta maç önbelleğini doldur ve değişiklik dinleyicisini başlat"""
+    start_metrics_server(BOT_METRICS_PORT)
+    slow_query_recorder.start()
+    await run_db(match_cache.refresh)
+    match_cache.start_listener(get_listen_dsn())
+    stats_reconciler.start()
+    await log_shipper.start(app.bot)
+
+async def post_stop(app: Application):
+    """Bot kapanmadan önce kuyruktaki logları gönder"""
+    await log_shipper.stop()
+
+async def post_shutdown(app: Application):
+    """Kapanışta veritabanı kaynaklarını serbest bırak"""
+    match_cache.stop_listener()
+    stats_reconciler.stop()
+    slow_query_recorder.stop()
+    shutdown_db_executor()
+    close_pool()
+
+class InstrumentedRequest(BaseRequest):
+    """Telegram API çağrılarının süresini ölçen transport sarmalayıcısı"""
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    @property
+    def read_timeout(self):
+        return self.inner.read_timeout
+
+    async def initialize(self):
+        await self.inner.initialize()
+
+    async def shutdown(self):
+        await self.inner.shutdown()
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        start = time.perf_counter()
+        sonuc = 'hata'
+        try:
+            code, payload = await self.inner.do_request(
+                url, method, request_data=request_data, read_timeout=read_timeout,
+                write_timeout=write_timeout, connect_timeout=connect_timeout, pool_timeout=pool_timeout
+            )
+            sonuc = str(code)
+            return code, payload
+        finally:
+            TELEGRAM_API_SECONDS.observe(time.perf_counter() - start, metod=url.rsplit('/', 1)[-1], sonuc=sonuc)
+
+def callback_branch(update, context):
+    """button_handler metrik etiketi - callback verisinin öneki"""
+    data = update.callback_query.data if update.callback_query else ''
+    if data == 'back_to_matches':
+        return {'dal': 'back_to_matches'}
+    prefix = (data or '').split('_', 1)[0]
+    return {'dal': prefix if prefix in ('already', 'match', 'score', 'custom') else 'diger'}
+
+def instrumented(name, handler, label_func=None):
+    """Handler süresini bot_handler_seconds histogramına kaydet"""
+    return timed_async(HANDLER_SECONDS, label_func=label_func or (lambda update, context: {'dal': ''}),
+                       handler=name)(handler)
+
+def create_application(token, request=None, concurrent_updates=BOT_CONCURRENT_UPDATES):
+    """Handler'ları kayıtlı Application oluştur"""
+    builder = (
+        Application.builder()
+        .token(token)
+        .concurrent_updates(concurrent_updates)
+        .post_init(post_init)
+        .post_stop(post_stop)
+        .post_shutdown(post_shutdown)
+    )
+    if request is not None:
+        # Test/benchmark için özel transport
+        request = InstrumentedRequest(request)
+        builder = builder.request(request).get_updates_request(request)
+    else:
+        # PTB varsayılanları ile aynı havuz boyutları, süre ölçümü ile
+        builder = (
+            builder.request(InstrumentedRequest(HTTPXRequest(connection_pool_size=256)))
+            .get_updates_request(InstrumentedRequest(HTTPXRequest(connection_pool_size=1)))
+        )
     
-    app = Application.builder().token(TOKEN).build()
+    app = builder.build()
     
     # Handler'ları ekle
-    app.add_handler(CommandHandler("start", start))
-    app.add_handler(CommandHandler("tahmin", tahmin_menu))
-    app.add_handler(CommandHandler("tahminlerim", tahminlerim))
-    app.add_handler(CommandHandler("yardim", yardim))
+    app.add_handler(CommandHandler("start", instrumented('start', start)))
+    app.add_handler(CommandHandler("tahmin", instrumented('tahmin_menu', tahmin_menu)))
+    app.add_handler(CommandHandler("tahminlerim", instrumented('tahminlerim', tahminlerim)))
+    app.add_handler(CommandHandler("siralama", instrumented('siralama', siralama)))
+    app.add_handler(CommandHandler("yardim", instrumented('yardim', yardim)))
     
-    # Callback query handler (butonlar için)
-    app.add_handler(CallbackQueryHandler(button_handler))
+    # Callback query handler (butonlar için) - her dal ayrı ölçülür
+    app.add_handler(CallbackQueryHandler(instrumented('button_handler', button_handler, callback_branch)))
     
     # Message handler (site kullanıcı adı için) - YENİ!
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, instrumented('handle_message', handle_message)))
+    
+    return app
+
+def main():
+    """Ana fonksiyon"""
+    init_database()
+    
+    TOKEN = os.environ.get('BOT_TOKEN', "8230185811:AAHJI59TpDIw1q4xKrvZyxhnjr5ZTCxkhJI")
+    
+    app = create_application(TOKEN)
     
-    app.run_polling()
+    if BOT_MODE == 'webhook':
+        from webhook import run_webhook
+        asyncio.run(run_webhook(app))
+    else:
+        app.run_polling()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,299 @@
+import logging
+import os
+import select
+import threading
+from collections import OrderedDict
+import psycopg2
+import psycopg2.extensions
+from database import MATCH_CHANNEL, PREDICTION_CHANNEL
+
+# NOTIFY kaçırılırsa bile en geç bu süre sonunda tazele (saniye)
+MATCH_CACHE_REFRESH = float(os.environ.get('MATCH_CACHE_REFRESH', 60))
+
+# SQLite'da maç değişikliği bildirimlerinin yoklanma aralığı (saniye)
+MATCH_CACHE_POLL_INTERVAL = float(os.environ.get('MATCH_CACHE_POLL_INTERVAL', 1))
+
+# Bellekte tutulacak en fazla kullanıcı sayısı
+PREDICTION_INDEX_SIZE = int(os.environ.get('PREDICTION_INDEX_SIZE', 50000))
+
+
+def parse_deleted_predictions(payload):
+    """Silme bildirimi -> (mac_id, user_id); user_id None ise maçın tümü. Okunamazsa None"""
+    try:
+        mac_id, user_id = payload.split(':')
+        return int(mac_id), int(user_id) if user_id else None
+    except (AttributeError, ValueError):
+        return None
+
+
+class MatchCache:
+    """Aktif maçların bellek içi kopyası - panel değişiklikleri NOTIFY ile tazeler"""
+
+    def __init__(self, loader, refresh_interval=MATCH_CACHE_REFRESH):
+        self._loader = loader
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._matches = []
+        self._by_id = {}
+        self._listeners = []
+        self._deletion_listeners = []
+        self._listener_thread = None
+        self._stop = threading.Event()
+        self.version = 0
+        self.loaded = False
+
+    def set_matches(self, matches):
+        """Aktif maç listesini değiştir ve sürümü artır"""
+        matches = [dict(match) for match in matches]
+        with self._lock:
+            self._matches = matches
+            self._by_id = {match['id']: match for match in matches}
+            self.version += 1
+            self.loaded = True
+            version = self.version
+
+        for callback in list(self._listeners):
+            try:
+                callback(version)
+            except Exception as e:
+                logging.error(f"Maç önbelleği dinleyici hatası: {e}")
+
+    def refresh(self):
+        """Aktif maçları veritabanından yeniden yükle"""
+        self.set_matches(self._loader())
+
+    def matches(self):
+        """Aktif maçlar (sıralı)"""
+        return self._matches
+
+    def get(self, mac_id):
+        """Aktif maç - yoksa None"""
+        return self._by_id.get(mac_id)
+
+    def add_listener(self, callback):
+        """Her tazelemede callback(version) çağrılır"""
+        self._listeners.append(callback)
+
+    def add_deletion_listener(self, callback):
+        """Panelden tahmin silindiğinde callback(mac_id, user_id) çağrılır
+
+        user_id None ise maçın tüm tahminleri, mac_id de None ise hangileri bilinmiyor (bildirim kaçmış olabilir).
+        """
+        self._deletion_listeners.append(callback)
+
+    def _predictions_deleted(self, payload):
+        silinen = parse_deleted_predictions(payload) if payload is not None else None
+        for callback in list(self._deletion_listeners):
+            try:
+                callback(*(silinen or (None, None)))
+            except Exception as e:
+                logging.error(f"Tahmin silme dinleyici hatası: {e}")
+
+    def start_listener(self, dsn):
+        """LISTEN bağlantısını arka planda başlat"""
+        if self._listener_thread and self._listener_thread.is_alive():
+            return
+        self._stop.clear()
+        # Gömülü SQLite'da LISTEN yok - bildirim sürümü yoklanır
+        target = self._poll_loop if dsn.startswith('sqlite:') else self._listen_loop
+        self._listener_thread = threading.Thread(
+            target=target, args=(dsn,), name='match-cache-listener', daemon=True
+        )
+        self._listener_thread.start()
+
+    def stop_listener(self):
+        self._stop.set()
+
+    def _listen_loop(self, dsn):
+        backoff = 1
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {MATCH_CHANNEL}')
+                    cursor.execute(f'LISTEN {PREDICTION_CHANNEL}')
+                logging.info(f"Maç önbelleği '{MATCH_CHANNEL}' ve '{PREDICTION_CHANNEL}' kanallarını dinliyor")
+
+                # Bağlantı koptuysa kaçan bildirimler olabilir
+                self._predictions_deleted(None)
+                self.refresh()
+                backoff = 1
+
+                while not self._stop.is_set():
+                    ready, _, _ = select.select([conn], [], [], self.refresh_interval)
+                    if ready:
+                        conn.poll()
+                        if not conn.notifies:
+                            continue
+                        notifies = list(conn.notifies)
+                        conn.notifies.clear()
+                        for notify in notifies:
+                            if notify.channel == PREDICTION_CHANNEL:
+                                self._predictions_deleted(notify.payload)
+                        # Ard arda gelen maç bildirimlerini tek tazelemede birleştir
+                        if not any(notify.channel == MATCH_CHANNEL for notify in notifies):
+                            continue
+                    self.refresh()
+
+            except Exception as e:
+                logging.warning(f"Maç önbelleği dinleyici hatası, {backoff} sn sonra tekrar denenecek: {e}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 60)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+
+    def _poll_loop(self, dsn):
+        from sqlite_backend import wait_for_notify
+
+        kanallar = (MATCH_CHANNEL, PREDICTION_CHANNEL)
+        durum = None
+        while not self._stop.is_set():
+            try:
+                yeni = wait_for_notify(kanallar, durum, self.refresh_interval, self._stop,
+                                       MATCH_CACHE_POLL_INTERVAL)
+                if self._stop.is_set():
+                    return
+                if durum is None:
+                    # İlk turda sürümler bilinmiyor - her şey yeniden yüklenir
+                    self._predictions_deleted(None)
+                    self.refresh()
+                else:
+                    onceki, surum = durum[PREDICTION_CHANNEL][0], yeni[PREDICTION_CHANNEL][0]
+                    # Tabloda sadece son bildirimin verisi var; arada başka silme olduysa indeks sıfırlanır
+                    sifirla = surum not in (onceki, onceki + 1)
+                    if surum != onceki:
+                        self._predictions_deleted(None if sifirla else yeni[PREDICTION_CHANNEL][1])
+                    # Maç değişikliği, indeks sıfırlama ya da zaman aşımı - tazele
+                    if yeni[MATCH_CHANNEL] != durum[MATCH_CHANNEL] or sifirla or surum == onceki:
+                        self.refresh()
+                durum = yeni
+            except Exception as e:
+                logging.warning(f"Maç önbelleği yoklama hatası: {e}")
+                self._stop.wait(self.refresh_interval)
+
+
+class PredictionIndex:
+    """Kullanıcı -> {mac_id: skor} sınırlı (LRU) tahmin indeksi"""
+
+    def __init__(self, user_loader, bulk_loader, max_users=PREDICTION_INDEX_SIZE):
+        self._user_loader = user_loader
+        self._bulk_loader = bulk_loader
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._users = OrderedDict()
+        # True iken indekste olmayan kullanıcının aktif maçlarda tahmini yok demektir
+        self._complete = False
+        self._warm_ids = None
+        self._warming_writes = None
+
+    def _evict(self):
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+            self._complete = False
+
+    def get(self, user_id):
+        """Kullanıcının tahminleri - indekste yoksa None"""
+        with self._lock:
+            predictions = self._users.get(user_id)
+            if predictions is not None:
+                self._users.move_to_end(user_id)
+                return predictions
+            if self._complete:
+                predictions = self._users[user_id] = {}
+                self._evict()
+                return predictions
+            return None
+
+    def load(self, user_id):
+        """Kullanıcıyı veritabanından yükle (indekste yoksa çağrılır)"""
+        loaded = dict(self._user_loader(user_id))
+        with self._lock:
+            # Yükleme sırasında gelen yazımları koru
+            loaded.update(self._users.get(user_id, {}))
+            self._users[user_id] = loaded
+            self._users.move_to_end(user_id)
+            self._evict()
+        return loaded
+
+    def record(self, user_id, mac_id, skor):
+        """Kaydedilen tahmini indekse yaz (write-through)"""
+        with self._lock:
+            if self._warming_writes is not None:
+                self._warming_writes.append((user_id, mac_id, skor))
+            predictions = self._users.get(user_id)
+            if predictions is not None:
+                predictions[mac_id] = skor
+            elif self._complete:
+                self._users[user_id] = {mac_id: skor}
+                self._evict()
+
+    def forget(self, user_id, mac_id):
+        """Veritabanında artık olmayan tahmini indeksten çıkar"""
+        with self._lock:
+            if self._warming_writes is not None:
+                self._warming_writes.append((user_id, mac_id, None))
+            predictions = self._users.get(user_id)
+            if predictions is not None:
+                predictions.pop(mac_id, None)
+
+    def forget_match(self, mac_id):
+        """Maçın tüm tahminlerini indeksten çıkar"""
+        with self._lock:
+            if self._warming_writes is not None:
+                self._warming_writes.append((None, mac_id, None))
+            for predictions in self._users.values():
+                predictions.pop(mac_id, None)
+
+    def reset(self):
+        """İndeksi boşalt - sonraki warm() aktif maçları yeniden yükler"""
+        with self._lock:
+            self._users = OrderedDict()
+            self._complete = False
+            self._warm_ids = None
+
+    def warm(self, mac_ids):
+        """Aktif maçların tüm tahminlerini tek sorguda yükle"""
+        mac_ids = sorted(mac_ids)
+        if mac_ids == self._warm_ids:
+            return
+
+        with self._lock:
+            self._warming_writes = []
+        try:
+            rows = self._bulk_loader(mac_ids) if mac_ids else []
+        except Exception:
+            with self._lock:
+                self._warming_writes = None
+            raise
+
+        users = OrderedDict()
+        for row in rows:
+            users.setdefault(row['user_id'], {})[row['mac_id']] = row['skor_tahmini']
+
+        with self._lock:
+            for user_id, mac_id, skor in self._warming_writes:
+                if user_id is None:
+                    for predictions in users.values():
+                        predictions.pop(mac_id, None)
+                elif skor is None:
+                    users.get(user_id, {}).pop(mac_id, None)
+                else:
+                    users.setdefault(user_id, {})[mac_id] = skor
+            self._warming_writes = None
+            self._users = users
+            self._complete = True
+            self._evict()
+            self._warm_ids = mac_ids
+
+        logging.info(f"Tahmin indeksi dolduruldu: {len(users)} kullanıcı, {len(rows)} tahmin")
+
+    def stats(self):
+        with self._lock:
+            return {'users': len(self._users), 'complete': self._complete}
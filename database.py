@@ -0,0 +1,510 @@
+import asyncio
+import functools
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+from dotenv import load_dotenv
+from metrics import GaugeFunc, Histogram
+
+load_dotenv()
+
+# Havuz ayarları (environment üzerinden değiştirilebilir)
+DB_POOL_MIN = int(os.environ.get('DB_POOL_MIN', 1))
+DB_POOL_MAX = int(os.environ.get('DB_POOL_MAX', 10))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+DB_POOL_MAX_LIFETIME = float(os.environ.get('DB_POOL_MAX_LIFETIME', 1800))
+DB_POOL_HEALTH_CHECK_IDLE = float(os.environ.get('DB_POOL_HEALTH_CHECK_IDLE', 30))
+
+
+# Bu süreyi (ms) aşan sorgular yavaş sorgu kaydına iletilir (slow_queries.py)
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))
+
+_slow_query_listener = None
+
+
+def set_slow_query_listener(listener):
+    """listener(cursor, sorgu, parametreler, süre_sn) - None verilirse kapatılır"""
+    global _slow_query_listener
+    _slow_query_listener = listener
+
+
+# Profil alınan isteklerde thread başına sorgu sayısı/süresi
+_query_tracking = threading.local()
+
+
+def track_queries():
+    """Bu thread'deki sorguları saymaya başla -> {'sorgu': adet, 'sure': saniye} (canlı güncellenir)"""
+    stats = {'sorgu': 0, 'sure': 0.0}
+    _query_tracking.stats = stats
+    return stats
+
+
+def untrack_queries():
+    _query_tracking.stats = None
+
+
+DB_QUERY_SECONDS = Histogram('db_query_seconds', 'Veritabanı sorgu süresi', ('islem', 'tablo'))
+DB_POOL_WAIT_SECONDS = Histogram('db_pool_wait_seconds', 'Havuzdan bağlantı alma süresi')
+
+_TABLE_RE = re.compile(r'\b(?:FROM|INTO|UPDATE|JOIN|TABLE)\s+([A-Za-z_][A-Za-z0-9_.]*)', re.IGNORECASE)
+_VERB_TABLE_RE = {
+    'insert': re.compile(r'\bINSERT\s+INTO\s+([A-Za-z_][A-Za-z0-9_.]*)', re.IGNORECASE),
+    'update': re.compile(r'\bUPDATE\s+([A-Za-z_][A-Za-z0-9_.]*)', re.IGNORECASE),
+    'delete': re.compile(r'\bDELETE\s+FROM\s+([A-Za-z_][A-Za-z0-9_.]*)', re.IGNORECASE),
+}
+
+
+@functools.lru_cache(maxsize=1024)
+def query_labels(query):
+    """Sorgu metni -> (işlem, ana tablo) - metrik etiketleri sınırlı sayıda kalır"""
+    words = query.split(None, 1)
+    islem = words[0].lower() if words else ''
+    if islem == 'with':
+        # CTE'li sorgularda asıl işlem sonda gelir
+        islem = next((verb for verb, pattern in _VERB_TABLE_RE.items() if pattern.search(query)), 'select')
+    pattern = _VERB_TABLE_RE.get(islem, _TABLE_RE)
+    match = pattern.search(query)
+    return islem, match.group(1).lower() if match else ''
+
+
+class TimedCursor(psycopg2.extras.RealDictCursor):
+    """Her sorgunun süresini ölçen cursor - metrik + eşiği aşanlar yavaş sorgu kaydına"""
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            self._observe(query, vars, start)
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            self._observe(query, None, start)
+
+    def _observe(self, query, vars, start):
+        observe_query(self, query, vars, start)
+
+
+def observe_query(cursor, query, vars, start):
+    """Sorgu süresini kaydet - metrik, profil sayacı ve eşiği aşanlar için yavaş sorgu kaydı"""
+    elapsed = time.perf_counter() - start
+    islem, tablo = query_labels(query) if isinstance(query, str) else ('diger', '')
+    DB_QUERY_SECONDS.observe(elapsed, islem=islem, tablo=tablo)
+
+    tracked = getattr(_query_tracking, 'stats', None)
+    if tracked is not None:
+        tracked['sorgu'] += 1
+        tracked['sure'] += elapsed
+
+    listener = _slow_query_listener
+    # Named cursor'larda execute sadece DECLARE'dir, asıl süre fetch'te geçer
+    if listener is not None and elapsed * 1000 >= SLOW_QUERY_MS and cursor.name is None:
+        try:
+            listener(cursor, query, vars, elapsed)
+        except Exception as e:
+            logging.warning(f"Yavaş sorgu kaydedilemedi: {e}")
+
+
+class PoolTimeout(Exception):
+    """Havuzdan belirtilen sürede bağlantı alınamadı"""
+
+
+class ConnectionPool:
+    """Sınırlı ve thread-safe PostgreSQL bağlantı havuzu"""
+
+    def __init__(self, dsn, minconn=DB_POOL_MIN, maxconn=DB_POOL_MAX, timeout=DB_POOL_TIMEOUT,
+                 max_lifetime=DB_POOL_MAX_LIFETIME, health_check_idle=DB_POOL_HEALTH_CHECK_IDLE,
+                 **connect_kwargs):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError(f"Geçersiz havuz boyutu: min={minconn}, max={maxconn}")
+
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_idle = health_check_idle
+        self.connect_kwargs = connect_kwargs
+
+        self._cond = threading.Condition()
+        self._idle = []        # (conn, oluşturulma, son kullanım)
+        self._created = {}     # id(conn) -> oluşturulma zamanı
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+        self._warmed = False
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn, **self.connect_kwargs)
+        self._created[id(conn)] = time.monotonic()
+        return conn
+
+    def _discard(self, conn):
+        """Bağlantıyı kapat ve havuz sayacından düş (kilit dışında çağrılır)"""
+        self._created.pop(id(conn), None)
+        try:
+            if not conn.closed:
+                conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _expired(self, conn, now):
+        created = self._created.get(id(conn), now)
+        return self.max_lifetime > 0 and now - created >= self.max_lifetime
+
+    def _healthy(self, conn):
+        """Uzun süre boşta kalan bağlantıyı SELECT 1 ile kontrol et"""
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except Exception as e:
+            logging.warning(f"Havuz bağlantısı sağlıksız, yenileniyor: {e}")
+            return False
+
+    def _warm_up(self):
+        """İlk kullanımda minimum sayıda bağlantıyı hazır et"""
+        self._warmed = True
+        for _ in range(self.minconn):
+            with self._cond:
+                if self._size >= self.minconn:
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            self.putconn(conn)
+
+    def getconn(self):
+        """Havuzdan bağlantı ödünç al"""
+        if not self._warmed:
+            self._warm_up()
+
+        deadline = time.monotonic() + self.timeout
+        while True:
+            entry = None
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeout("Bağlantı havuzu kapatıldı")
+
+                while not self._idle and self._size >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(
+                            f"{self.timeout:g} saniye içinde veritabanı bağlantısı alınamadı "
+                            f"(havuz: {self._size}/{self.maxconn})"
+                        )
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+                if self._idle:
+                    entry = self._idle.pop()
+                else:
+                    self._size += 1
+
+            if entry is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+
+            conn, _, last_used = entry
+            now = time.monotonic()
+            if conn.closed or self._expired(conn, now):
+                self._discard(conn)
+                continue
+            if now - last_used >= self.health_check_idle and not self._healthy(conn):
+                self._discard(conn)
+                continue
+            return conn
+
+    def putconn(self, conn):
+        """Bağlantıyı havuza iade et"""
+        if conn.closed or self._closed:
+            self._discard(conn)
+            return
+
+        try:
+            # Yarım kalan transaction'ları geri al, bağlantıyı temiz bırak
+            if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            if conn.autocommit:
+                conn.autocommit = False
+        except Exception:
+            self._discard(conn)
+            return
+
+        if self._expired(conn, time.monotonic()):
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, self._created.get(id(conn)), time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        """Tüm boştaki bağlantıları kapat ve havuzu kapat"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn, _, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        """Havuz kullanım bilgisi"""
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'waiting': self._waiting,
+                'max': self.maxconn,
+            }
+
+
+class PooledConnection:
+    """Havuzdan alınan bağlantı - close() bağlantıyı kapatmak yerine havuza iade eder"""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        conn = self.__dict__.get('_conn')
+        if conn is None:
+            raise psycopg2.InterfaceError("connection already returned to pool")
+        return getattr(conn, name)
+
+    def __setattr__(self, name, value):
+        if name in ('_pool', '_conn'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._conn, name, value)
+
+    @property
+    def closed(self):
+        return self._conn is None or self._conn.closed
+
+    def close(self):
+        conn = self.__dict__.get('_conn')
+        if conn is not None:
+            object.__setattr__(self, '_conn', None)
+            self._pool.putconn(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._conn.commit()
+            else:
+                self._conn.rollback()
+        finally:
+            self.close()
+
+    def __del__(self):
+        # close() unutulan yollarda bağlantı havuzdan sızmasın
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class PostgresBackend:
+    """PostgreSQL (psycopg2) - varsayılan depolama arka ucu"""
+    name = 'postgres'
+
+    def __init__(self, url):
+        self.url = url
+
+    def create_pool(self):
+        return ConnectionPool(self.url, cursor_factory=TimedCursor)
+
+    def execute_values(self, cursor, sql, argslist, template=None, page_size=100, fetch=False):
+        return psycopg2.extras.execute_values(
+            cursor, sql, argslist, template=template, page_size=page_size, fetch=fetch
+        )
+
+    def notify(self, cursor, channel, payload):
+        cursor.execute('SELECT pg_notify(%s, %s)', (channel, payload))
+
+    def try_lock(self, cursor, lock_id):
+        """Oturum kilidi - başkası tutuyorsa beklemeden False (unlock ile bırakılır)"""
+        cursor.execute('SELECT pg_try_advisory_lock(%s) as kilit', (lock_id,))
+        return cursor.fetchone()['kilit']
+
+    def lock(self, cursor, lock_id):
+        """Oturum kilidi (autocommit bağlantıda, unlock ile bırakılır)"""
+        cursor.execute('SELECT pg_advisory_lock(%s)', (lock_id,))
+
+    def unlock(self, cursor, lock_id):
+        cursor.execute('SELECT pg_advisory_unlock(%s)', (lock_id,))
+
+    def table_exists(self, cursor, table):
+        cursor.execute('SELECT to_regclass(%s) IS NOT NULL AS var', (table,))
+        return cursor.fetchone()['var']
+
+
+_backend = None
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_backend():
+    """DATABASE_URL'e göre depolama arka ucu - sqlite:///dosya.db gömülü SQLite, diğerleri PostgreSQL"""
+    global _backend
+
+    if _backend is None:
+        database_url = os.environ.get('DATABASE_URL')
+        if not database_url:
+            raise Exception("DATABASE_URL environment variable is required!")
+        if database_url.startswith('sqlite:'):
+            from sqlite_backend import SQLiteBackend
+            _backend = SQLiteBackend(database_url)
+        else:
+            _backend = PostgresBackend(database_url)
+    return _backend
+
+
+def is_sqlite():
+    """Gömülü SQLite arka ucu mu (PostgreSQL'e özgü sorguların alternatifi için)"""
+    return get_backend().name == 'sqlite'
+
+
+def get_pool():
+    """Süreç başına tek havuz (gunicorn fork'larında yeniden oluşturulur)"""
+    global _pool, _pool_pid
+
+    if _pool is not None and _pool_pid == os.getpid():
+        return _pool
+
+    backend = get_backend()
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = backend.create_pool()
+            _pool_pid = os.getpid()
+    return _pool
+
+
+def get_db_connection():
+    """Veritabanı bağlantısı (havuzdan)"""
+    pool = get_pool()
+    with DB_POOL_WAIT_SECONDS.time():
+        conn = pool.getconn()
+    return PooledConnection(pool, conn)
+
+
+def _pool_gauges():
+    pool = _pool
+    if pool is None or _pool_pid != os.getpid():
+        return {}
+    return {(key,): value for key, value in pool.stats().items()}
+
+
+GaugeFunc('db_pool_connections', 'Bağlantı havuzu durumu', _pool_gauges, ('durum',))
+
+
+def get_listen_dsn():
+    """LISTEN için bağlantı adresi (transaction pooler LISTEN desteklemez, doğrudan adres verilebilir)"""
+    return os.environ.get('DATABASE_LISTEN_URL') or os.environ.get('DATABASE_URL')
+
+
+# Aktif maç listesi değiştiğinde yayınlanan kanal
+MATCH_CHANNEL = 'maclar_degisti'
+
+
+def notify_matches_changed(cursor, mac_id=None):
+    """Maç değişikliğini bota bildir (commit ile birlikte iletilir)"""
+    get_backend().notify(cursor, MATCH_CHANNEL, str(mac_id or ''))
+
+
+# Panelden tahmin silindiğinde yayınlanan kanal - veri "mac_id:user_id" (user_id boşsa maçın tümü)
+PREDICTION_CHANNEL = 'tahminler_silindi'
+
+
+def notify_predictions_deleted(cursor, mac_id, user_id=None):
+    """Silinen tahminleri bota bildir, bellekteki indeks bu kayıtları unutur (commit ile iletilir)"""
+    get_backend().notify(cursor, PREDICTION_CHANNEL, f"{mac_id}:{'' if user_id is None else user_id}")
+
+
+def execute_values(cursor, sql, argslist, template=None, page_size=100, fetch=False):
+    """Çok satırlı INSERT (VALUES %s) - psycopg2.extras.execute_values ile aynı imza"""
+    return get_backend().execute_values(cursor, sql, argslist, template, page_size, fetch)
+
+
+def try_advisory_lock(cursor, lock_id):
+    """Tekil iş kilidi (transaction'dan bağımsız) - alınamazsa False"""
+    return get_backend().try_lock(cursor, lock_id)
+
+
+def advisory_unlock(cursor, lock_id):
+    get_backend().unlock(cursor, lock_id)
+
+
+def close_pool():
+    """Havuzu kapat (kapanışta çağrılır) - sonraki bağlantı DATABASE_URL'i yeniden okur"""
+    global _pool, _backend
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+        _backend = None
+
+
+# Async handler'lar için sınırlı thread havuzu (havuz boyutunu aşmaz)
+DB_EXECUTOR_WORKERS = int(os.environ.get('DB_EXECUTOR_WORKERS', DB_POOL_MAX))
+
+_executor = None
+_executor_pid = None
+
+
+def get_db_executor():
+    """Veritabanı işleri için ayrılmış executor"""
+    global _executor, _executor_pid
+
+    with _pool_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix='db')
+            _executor_pid = os.getpid()
+    return _executor
+
+
+async def run_db(func, *args, **kwargs):
+    """Senkron veritabanı fonksiyonunu event loop'u bloklamadan çalıştır"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_db_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_db_executor():
+    """Executor'ı kapat (kapanışta çağrılır)"""
+    global _executor
+    with _pool_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
@@ -0,0 +1,297 @@
+import argparse
+import io
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+from database import get_db_connection, is_sqlite
+from migrations import run_migrations
+from points import rebuild_standings
+from stats import fill_counters
+
+# COPY'ye her okumada verilen satır sayısı
+COPY_CHUNK_ROWS = 5000
+
+TAKIMLAR = (
+    'Galatasaray', 'Fenerbahçe', 'Beşiktaş', 'Trabzonspor', 'Başakşehir', 'Samsunspor',
+    'Göztepe', 'Eyüpspor', 'Kasımpaşa', 'Antalyaspor', 'Konyaspor', 'Alanyaspor',
+    'Rizespor', 'Gaziantep FK', 'Kayserispor', 'Kocaelispor', 'Gençlerbirliği', 'Karagümrük',
+)
+
+ISIMLER = ('ahmet', 'mehmet', 'mustafa', 'ali', 'hasan', 'huseyin', 'emre', 'burak', 'can',
+           'murat', 'ayse', 'fatma', 'zeynep', 'elif', 'merve', 'kerem', 'onur', 'baris')
+
+# Gerçek tahmin dağılımına yakın ağırlıklar - 1-0 ve 1-1 en popüler
+SKOR_AGIRLIKLARI = (
+    ('1-0', 14), ('1-1', 13), ('2-1', 12), ('2-0', 9), ('0-0', 7), ('0-1', 7), ('1-2', 7),
+    ('2-2', 5), ('3-1', 5), ('3-0', 4), ('0-2', 4), ('1-3', 3), ('3-2', 3), ('2-3', 2),
+    ('4-0', 1), ('4-1', 1), ('0-3', 1), ('3-3', 1), ('4-2', 1),
+)
+
+# Maç bittiğinde gerçek skor da aynı dağılımdan çekilir
+SKORLAR = [skor for skor, _ in SKOR_AGIRLIKLARI]
+SKOR_KUMULATIF = list(itertools.accumulate(agirlik for _, agirlik in SKOR_AGIRLIKLARI))
+
+
+class _CopyStream(io.TextIOBase):
+    """Parça üretecini COPY'ye dosya gibi okutan akış (veri bellekte birikmez)"""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._buffer = ''
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, ''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return str(value)
+
+
+def copy_rows(cursor, table, columns, rows):
+    """Satırları COPY FROM STDIN (text biçimi) ile yükle -> satır sayısı"""
+    count = 0
+
+    def chunks():
+        nonlocal count
+        rows_iter = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows_iter, COPY_CHUNK_ROWS))
+            if not batch:
+                return
+            count += len(batch)
+            yield ''.join('\t'.join(_copy_value(v) for v in row) + '\n' for row in batch)
+
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT text)",
+        _CopyStream(chunks())
+    )
+    return count
+
+
+def generate_matches(rng, count, first_id, now, active_ratio, days):
+    """Geçmişe yayılmış bitmiş maçlar + önümüzdeki günlerde aktif maçlar"""
+    matches = []
+    active_count = max(1, round(count * active_ratio)) if count else 0
+    for i in range(count):
+        mac_id = first_id + i
+        takim1, takim2 = rng.sample(TAKIMLAR, 2)
+        if i >= count - active_count:
+            mac_tarihi = now + timedelta(hours=rng.randint(2, 14 * 24))
+            durum, gercek_skor = 'aktif', None
+        else:
+            mac_tarihi = now - timedelta(days=days * (count - i) / count, hours=rng.randint(0, 23))
+            durum = 'iptal' if rng.random() < 0.01 else 'bitti'
+            gercek_skor = rng.choices(SKORLAR, cum_weights=SKOR_KUMULATIF)[0] if durum == 'bitti' else None
+        matches.append({
+            'id': mac_id,
+            'mac_adi': f"{takim1}-{takim2} #{mac_id}",
+            'takim1': takim1,
+            'takim2': takim2,
+            'mac_tarihi': mac_tarihi.replace(minute=0, second=0, microsecond=0),
+            'durum': durum,
+            'gercek_skor': gercek_skor,
+        })
+    return matches
+
+
+def prediction_counts(rng, matches, total, users):
+    """Tahminleri maçlara Pareto ağırlığıyla dağıt (derbiler çok, küçük maçlar az tahmin alır)"""
+    weights = [rng.paretovariate(1.2) for _ in matches]
+    toplam_agirlik = sum(weights)
+    return [min(users, round(total * w / toplam_agirlik)) for w in weights]
+
+
+def _username(user_index):
+    return f"{ISIMLER[user_index % len(ISIMLER)]}{user_index}"
+
+
+def prediction_rows(rng, matches, counts, first_user_id, users, now, user_spread):
+    """(user_id, username, mac_id, mac_adi, skor, tarih) - aktif kullanıcılar çok maçta görünür"""
+    for match, k in zip(matches, counts):
+        # Kullanıcılar aktiflik sırasında; maç, listenin başındaki user_spread*k kişiden seçer
+        havuz = min(users, max(k, int(k * user_spread)))
+        skorlar = rng.choices(SKORLAR, cum_weights=SKOR_KUMULATIF, k=k)
+        for user_index, skor in zip(rng.sample(range(havuz), k), skorlar):
+            # Tahminlerin çoğu maça yakın saatlerde gelir
+            tarih = match['mac_tarihi'] - timedelta(minutes=min(rng.expovariate(1 / 360), 7 * 24 * 60))
+            yield (first_user_id + user_index, _username(user_index), match['id'], match['mac_adi'],
+                   skor, min(tarih, now))
+
+
+def legacy_rows(rng, count, first_user_id, users, now, days):
+    """mac_id'siz eski kayıtlar - adı artık hiçbir maçla eşleşmeyen (silinmiş) maçlar"""
+    silinmis = [f"{a}-{b} (eski)" for a, b in itertools.permutations(TAKIMLAR[:8], 2)]
+    for _ in range(count):
+        user_index = rng.randrange(users)
+        tarih = now - timedelta(days=days + rng.random() * 90)
+        yield (first_user_id + user_index, _username(user_index), None, rng.choice(silinmis),
+               rng.choices(SKORLAR, cum_weights=SKOR_KUMULATIF)[0], tarih)
+
+
+def generate_dataset(matches, users, predictions, seed, legacy_ratio=0.01, active_ratio=0.02,
+                     user_spread=3.0, days=365, truncate=False):
+    """Sentetik veriyi tek transaction'da COPY ile yükle -> rapor"""
+    rng = random.Random(seed)
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    rapor = {}
+    sureler = {}
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        if truncate:
+            cursor.execute('''
+                TRUNCATE tahmin_puanlari, siralama, cekilisler, kazananlar, tahminler, kullanicilar, maclar
+                RESTART IDENTITY
+            ''')
+
+        # Yükleme boyunca satır başı sayaç trigger'ları çalışmaz, sayaçlar sonda tek seferde yazılır
+        for table in ('maclar', 'tahminler', 'kazananlar'):
+            cursor.execute(f'ALTER TABLE {table} DISABLE TRIGGER USER')
+
+        cursor.execute('SELECT COALESCE(MAX(id), 0) + 1 as ilk FROM maclar')
+        first_mac_id = cursor.fetchone()['ilk']
+        cursor.execute('''
+            SELECT GREATEST(
+                (SELECT COALESCE(MAX(user_id), 0) FROM kullanicilar),
+                (SELECT COALESCE(MAX(user_id), 0) FROM tahminler)
+            ) + 1 as ilk
+        ''')
+        first_user_id = cursor.fetchone()['ilk']
+
+        start = time.perf_counter()
+        mac_listesi = generate_matches(rng, matches, first_mac_id, now, active_ratio, days)
+        rapor['maclar'] = copy_rows(
+            cursor, 'maclar',
+            ('id', 'mac_adi', 'takim1', 'takim2', 'mac_tarihi', 'durum', 'gercek_skor', 'olusturma_tarihi'),
+            ((m['id'], m['mac_adi'], m['takim1'], m['takim2'], m['mac_tarihi'], m['durum'],
+              m['gercek_skor'], m['mac_tarihi'] - timedelta(days=7)) for m in mac_listesi)
+        )
+        cursor.execute("SELECT setval(pg_get_serial_sequence('maclar', 'id'), (SELECT MAX(id) FROM maclar))")
+
+        rapor['kullanicilar'] = copy_rows(
+            cursor, 'kullanicilar', ('user_id', 'telegram_username', 'site_username', 'kayit_tarihi'),
+            ((first_user_id + i, _username(i), f"site_{_username(i)}",
+              now - timedelta(days=days + 30) + timedelta(seconds=rng.random() * (days + 30) * 86400))
+             for i in range(users))
+        )
+        sureler['maclar+kullanicilar'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        eski_sayi = round(predictions * legacy_ratio)
+        counts = prediction_counts(rng, mac_listesi, predictions - eski_sayi, users)
+        columns = ('user_id', 'username', 'mac_id', 'mac_adi', 'skor_tahmini', 'tarih')
+        rapor['tahminler'] = copy_rows(
+            cursor, 'tahminler', columns,
+            prediction_rows(rng, mac_listesi, counts, first_user_id, users, now, user_spread)
+        )
+
+        rapor['eski_tahminler'] = 0
+        if eski_sayi:
+            # Yeni satırlar mac_id'siz eklenemez; eski kayıtlar yüklenip kural NOT VALID olarak geri konur
+            cursor.execute('ALTER TABLE tahminler DROP CONSTRAINT IF EXISTS tahminler_mac_id_not_null')
+            rapor['eski_tahminler'] = copy_rows(
+                cursor, 'tahminler', columns,
+                legacy_rows(rng, eski_sayi, first_user_id, users, now, days)
+            )
+            cursor.execute('''
+                ALTER TABLE tahminler
+                ADD CONSTRAINT tahminler_mac_id_not_null
+                CHECK (mac_id IS NOT NULL) NOT VALID
+            ''')
+        sureler['tahminler'] = time.perf_counter() - start
+
+        # Kazananlar tahminlerden tek sorguda türetilir (bitmiş maçlarda skoru tutanlar)
+        start = time.perf_counter()
+        cursor.execute('''
+            INSERT INTO kazananlar (mac_id, user_id, username, dogru_tahmin, cekilis_durumu, kazanma_tarihi)
+            SELECT t.mac_id, t.user_id, t.username, t.skor_tahmini, 'otomatik', m.mac_tarihi + interval '2 hours'
+            FROM tahminler t
+            JOIN maclar m ON m.id = t.mac_id
+            WHERE m.id >= %s AND m.durum = 'bitti' AND t.skor_tahmini = m.gercek_skor
+        ''', (first_mac_id,))
+        rapor['kazananlar'] = cursor.rowcount
+
+        for table in ('maclar', 'tahminler', 'kazananlar'):
+            cursor.execute(f'ALTER TABLE {table} ENABLE TRIGGER USER')
+        fill_counters(cursor)
+        sureler['kazananlar+sayaclar'] = time.perf_counter() - start
+
+        # Bitmiş maçlar skorlu yüklenir - puanlar ve sıralama baştan hesaplanır
+        start = time.perf_counter()
+        rapor['siralama'] = rebuild_standings(cursor)
+        sureler['siralama'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        conn.commit()
+        sureler['commit'] = time.perf_counter() - start
+
+        # Planlayıcı yeni boyutları görsün
+        start = time.perf_counter()
+        cursor.execute('ANALYZE maclar, kullanicilar, tahminler, kazananlar, tahmin_puanlari, siralama')
+        conn.commit()
+        sureler['analyze'] = time.perf_counter() - start
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return rapor, sureler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ölçek testi için sentetik veri üret (COPY ile yükler)')
+    parser.add_argument('--maclar', type=int, default=2000, help='Maç sayısı')
+    parser.add_argument('--kullanicilar', type=int, default=200000, help='Kullanıcı sayısı')
+    parser.add_argument('--tahminler', type=int, default=1000000, help='Toplam tahmin sayısı')
+    parser.add_argument('--tohum', type=int, default=42, help='Rastgelelik tohumu (aynı tohum aynı veri)')
+    parser.add_argument('--eski-oran', type=float, default=0.01, help='mac_id olmayan eski tahmin oranı')
+    parser.add_argument('--aktif-oran', type=float, default=0.02, help='Aktif (gelecekteki) maç oranı')
+    parser.add_argument('--yayilim', type=float, default=3.0,
+                        help='Kullanıcı çarpıklığı: maç başına aday kullanıcı = yayılım x tahmin sayısı')
+    parser.add_argument('--gun', type=int, default=365, help='Bitmiş maçların yayıldığı gün sayısı')
+    parser.add_argument('--truncate', action='store_true',
+                        help='Önce maç, kullanıcı, tahmin, kazanan, çekiliş ve sıralama tablolarını boşalt')
+    args = parser.parse_args()
+    if is_sqlite():
+        # COPY ve trigger kapatma PostgreSQL'e özgü
+        parser.error("sentetik veri yükleme PostgreSQL gerektirir (DATABASE_URL sqlite:// olmamalı)")
+
+    run_migrations()
+
+    print(f"🎲 Tohum {args.tohum}: {args.maclar} maç, {args.kullanicilar} kullanıcı, {args.tahminler} tahmin"
+          + (" (tablolar boşaltılacak)" if args.truncate else ""))
+    start = time.perf_counter()
+    rapor, sureler = generate_dataset(
+        args.maclar, args.kullanicilar, args.tahminler, args.tohum,
+        legacy_ratio=args.eski_oran, active_ratio=args.aktif_oran, user_spread=args.yayilim,
+        days=args.gun, truncate=args.truncate
+    )
+    for adim, sure in sureler.items():
+        print(f"  {adim:<22} {sure:>8.1f} sn")
+    print(f"✅ {rapor['maclar']} maç, {rapor['kullanicilar']} kullanıcı, {rapor['tahminler']} tahmin "
+          f"(+{rapor['eski_tahminler']} eski), {rapor['kazananlar']} kazanan, "
+          f"{rapor['siralama']} kullanıcı sıralamada "
+          f"- {time.perf_counter() - start:.1f} sn")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+import os
+import uuid
+from datetime import date, datetime
+from database import get_db_connection
+
+# Sunucu tarafı cursor'dan her seferde çekilecek satır sayısı
+EXPORT_FETCH_SIZE = int(os.environ.get('EXPORT_FETCH_SIZE', 2000))
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def stream_query(query, params, fmt, fetch_size=EXPORT_FETCH_SIZE):
+    """Sorgu sonucunu named cursor'dan parça parça CSV/NDJSON olarak üret (sabit bellek)"""
+    if fmt == 'csv':
+        # Excel'in UTF-8 olarak açması için BOM - ilk bayt hemen gönderilir
+        yield '\ufeff'
+
+    conn = get_db_connection()
+    try:
+        # Named cursor: satırlar sunucuda kalır, fetchmany ile parça parça gelir
+        cursor = conn.cursor(name=f'export_{uuid.uuid4().hex}')
+        cursor.itersize = fetch_size
+        cursor.execute(query, params)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if fmt == 'csv' else None
+        header_written = False
+
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+
+            if writer is not None and not header_written:
+                writer.writerow([column.name for column in cursor.description])
+                header_written = True
+
+            if not rows:
+                break
+
+            for row in rows:
+                if writer is not None:
+                    writer.writerow([
+                        value.isoformat() if isinstance(value, (datetime, date)) else value
+                        for value in row.values()
+                    ])
+                else:
+                    buffer.write(json.dumps(row, ensure_ascii=False, default=_json_default))
+                    buffer.write('\n')
+
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        if header_written and buffer.tell():
+            yield buffer.getvalue()
+
+        cursor.close()
+    finally:
+        # İstemci bağlantıyı koparsa da (GeneratorExit) bağlantı havuza döner
+        conn.rollback()
+        conn.close()
@@ -0,0 +1,199 @@
+import argparse
+import csv
+import io
+import json
+from datetime import datetime
+from database import execute_values, get_db_connection, is_sqlite, notify_matches_changed
+
+# Kabul edilen maç tarihi biçimleri
+DATE_FORMATS = ('%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S',
+                '%d.%m.%Y %H:%M', '%Y-%m-%d', '%d.%m.%Y')
+
+# maclar tablosundaki sütun uzunlukları
+TAKIM_MAX_LENGTH = 100
+MAC_ADI_MAX_LENGTH = 200
+
+
+class FixtureError(Exception):
+    """Dosya okunamadı (biçim hatası)"""
+
+
+def parse_fixtures(data, fmt):
+    """CSV veya JSON içeriğini satır listesine çevir -> [(satır no, dict)]"""
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig')
+
+    if fmt == 'json':
+        try:
+            rows = json.loads(data)
+        except ValueError as e:
+            raise FixtureError(f"Geçersiz JSON: {e}")
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise FixtureError("JSON bir nesne listesi olmalı")
+        return list(enumerate(rows, start=1))
+
+    if fmt == 'csv':
+        reader = csv.DictReader(io.StringIO(data))
+        if not reader.fieldnames or not {'takim1', 'takim2'} <= {f.strip() for f in reader.fieldnames}:
+            raise FixtureError("CSV başlığı en az 'takim1,takim2' içermeli (isteğe bağlı: mac_tarihi)")
+        # Başlık 1. satır, veriler 2. satırdan başlar
+        return [
+            (i, {(k or '').strip(): v for k, v in row.items()})
+            for i, row in enumerate(reader, start=2)
+        ]
+
+    raise FixtureError(f"Desteklenmeyen format: {fmt}")
+
+
+def _parse_date(value):
+    value = (value or '').strip()
+    if not value:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"tarih anlaşılamadı: {value}")
+
+
+def validate_fixtures(rows):
+    """Satırları doğrula -> (geçerli satırlar, [(satır no, hata)])"""
+    valid = []
+    errors = []
+    seen = {}
+
+    for satir, row in rows:
+        takim1 = str(row.get('takim1') or '').strip()
+        takim2 = str(row.get('takim2') or '').strip()
+
+        if not takim1 or not takim2:
+            errors.append((satir, "takim1 ve takim2 zorunlu"))
+            continue
+        if takim1 == takim2:
+            errors.append((satir, "takımlar aynı olamaz"))
+            continue
+        if len(takim1) > TAKIM_MAX_LENGTH or len(takim2) > TAKIM_MAX_LENGTH:
+            errors.append((satir, f"takım adı en fazla {TAKIM_MAX_LENGTH} karakter olabilir"))
+            continue
+
+        # mac_ekle ile aynı isimlendirme
+        mac_adi = f"{takim1}-{takim2}"
+        if len(mac_adi) > MAC_ADI_MAX_LENGTH:
+            errors.append((satir, f"maç adı en fazla {MAC_ADI_MAX_LENGTH} karakter olabilir"))
+            continue
+        if mac_adi in seen:
+            errors.append((satir, f"{mac_adi} dosyada tekrar ediyor ({seen[mac_adi]}. satır)"))
+            continue
+
+        try:
+            mac_tarihi = _parse_date(row.get('mac_tarihi'))
+        except ValueError as e:
+            errors.append((satir, str(e)))
+            continue
+
+        seen[mac_adi] = satir
+        valid.append({
+            'satir': satir,
+            'mac_adi': mac_adi,
+            'takim1': takim1,
+            'takim2': takim2,
+            'mac_tarihi': mac_tarihi,
+        })
+
+    return valid, errors
+
+
+def import_fixtures(fixtures, update_existing=False, dry_run=False):
+    """Geçerli satırları tek transaction'da toplu ekle -> rapor
+
+    update_existing=False iken mac_adi zaten varsa satır atlanır ve çakışma olarak raporlanır,
+    True iken mevcut maçın tarihi güncellenir.
+    """
+    rapor = {'eklenen': [], 'guncellenen': [], 'cakisan': []}
+    if not fixtures:
+        return rapor
+
+    # SQLite'da xmax yok: güncellenecek maçlar eklemeden önce belirlenir
+    sqlite = is_sqlite()
+    if update_existing:
+        conflict_sql = f'''
+            ON CONFLICT (mac_adi) DO UPDATE SET mac_tarihi = EXCLUDED.mac_tarihi
+            RETURNING mac_adi, {'true' if sqlite else '(xmax = 0)'} AS yeni
+        '''
+    else:
+        conflict_sql = 'ON CONFLICT (mac_adi) DO NOTHING RETURNING mac_adi, true AS yeni'
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        mevcut = None
+        if update_existing and sqlite:
+            cursor.execute(
+                'SELECT mac_adi FROM maclar WHERE mac_adi = ANY(%s) FOR UPDATE',
+                ([f['mac_adi'] for f in fixtures],)
+            )
+            mevcut = {row['mac_adi'] for row in cursor.fetchall()}
+
+        # Çok satırlı INSERT - binlerce maç birkaç sorguda
+        sonuc = execute_values(
+            cursor,
+            'INSERT INTO maclar (mac_adi, takim1, takim2, mac_tarihi) VALUES %s ' + conflict_sql,
+            [(f['mac_adi'], f['takim1'], f['takim2'], f['mac_tarihi']) for f in fixtures],
+            page_size=1000,
+            fetch=True
+        )
+        yazilan = {row['mac_adi']: row['yeni'] for row in sonuc}
+        if mevcut is not None:
+            yazilan = {mac_adi: mac_adi not in mevcut for mac_adi in yazilan}
+
+        for f in fixtures:
+            if f['mac_adi'] not in yazilan:
+                rapor['cakisan'].append((f['satir'], f['mac_adi']))
+            elif yazilan[f['mac_adi']]:
+                rapor['eklenen'].append((f['satir'], f['mac_adi']))
+            else:
+                rapor['guncellenen'].append((f['satir'], f['mac_adi']))
+
+        if dry_run:
+            conn.rollback()
+        else:
+            if yazilan:
+                notify_matches_changed(cursor)
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return rapor
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Toplu maç (fikstür) içe aktarma')
+    parser.add_argument('dosya', help='CSV veya JSON dosyası')
+    parser.add_argument('--format', choices=('csv', 'json'), help='Varsayılan: dosya uzantısı')
+    parser.add_argument('--guncelle', action='store_true', help='Var olan maçların tarihini güncelle')
+    parser.add_argument('--dry-run', action='store_true', help='Yazma, sadece raporla')
+    args = parser.parse_args()
+
+    fmt = args.format or ('json' if args.dosya.lower().endswith('.json') else 'csv')
+    with open(args.dosya, 'rb') as f:
+        rows = parse_fixtures(f.read(), fmt)
+
+    fixtures, errors = validate_fixtures(rows)
+    for satir, hata in errors:
+        print(f"❌ {satir}. satır: {hata}")
+
+    rapor = import_fixtures(fixtures, update_existing=args.guncelle, dry_run=args.dry_run)
+    for satir, mac_adi in rapor['cakisan']:
+        print(f"⚠️ {satir}. satır: {mac_adi} zaten var, atlandı")
+
+    print(f"✅ {len(rapor['eklenen'])} eklendi, {len(rapor['guncellenen'])} güncellendi, "
+          f"{len(rapor['cakisan'])} çakışma, {len(errors)} hatalı satır"
+          + (" (dry-run, kaydedilmedi)" if args.dry_run else ""))
+
+
+if __name__ == '__main__':
+    main()
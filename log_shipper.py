@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import os
+from datetime import datetime
+from telegram.error import BadRequest, RetryAfter
+
+# Log kuyruğu ve toplu gönderim ayarları
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 1000))
+LOG_FLUSH_INTERVAL = float(os.environ.get('LOG_FLUSH_INTERVAL', 3))
+
+# Telegram mesaj uzunluğu sınırı
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+DIGEST_SEPARATOR = "\n\n➖➖➖➖➖\n\n"
+
+
+class LogShipper:
+    """Log kanalı mesajlarını kuyruğa alıp periyodik özet (digest) mesajlarıyla gönderir"""
+
+    def __init__(self, chat_id, queue_size=LOG_QUEUE_SIZE, flush_interval=LOG_FLUSH_INTERVAL):
+        self.chat_id = chat_id
+        self.flush_interval = flush_interval
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self._bot = None
+        self._task = None
+        self._pending_drops = 0
+        self._inflight = []
+        self._flush_lock = asyncio.Lock()
+
+        # Sayaçlar
+        self.enqueued = 0
+        self.dropped = 0
+        self.sent_messages = 0
+        self.sent_events = 0
+        self.failed_events = 0
+
+    def enqueue(self, message):
+        """Olayı beklemeden kuyruğa ekle - kuyruk doluysa at ve say"""
+        entry = f"{message}\n⏰ {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}"
+        try:
+            self.queue.put_nowait(entry)
+            self.enqueued += 1
+        except asyncio.QueueFull:
+            self.dropped += 1
+            self._pending_drops += 1
+
+    async def start(self, bot):
+        """Arka plan gönderim görevini başlat"""
+        self._bot = bot
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name='log-shipper')
+
+    async def stop(self):
+        """Görevi durdur ve kuyrukta kalanları gönder"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            # İlk olayı bekle, ardından aralık boyunca gelenleri biriktir
+            self._inflight.append(await self.queue.get())
+            await asyncio.sleep(self.flush_interval)
+            # Kapanışta yarıda kesilmesin, stop() bu gönderimin bitmesini bekler
+            await asyncio.shield(self.flush())
+
+    def _drain(self):
+        entries, self._inflight = self._inflight, []
+        while True:
+            try:
+                entries.append(self.queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return entries
+
+    def build_digests(self, entries, dropped=0):
+        """Olayları 4096 karakter sınırını aşmayan özet mesajlarına böl -> [(metin, olay sayısı)]"""
+        footer = f"\n\n⚠️ Kuyruk dolduğu için {dropped} log atıldı" if dropped else ""
+        limit = TELEGRAM_MESSAGE_LIMIT - len(footer)
+
+        digests = []
+        current = []
+        length = 0
+        # Başlık uzunluğu için üst sınır ("... (9999 olay)")
+        header = "🤖 **BOT LOG** (9999 olay)\n\n"
+        for entry in entries:
+            max_entry = limit - len(header)
+            if len(entry) > max_entry:
+                entry = entry[:max_entry - 1] + "…"
+
+            added = len(entry) + (len(DIGEST_SEPARATOR) if current else 0)
+            if current and len(header) + length + added > limit:
+                digests.append(current)
+                current = []
+                length = 0
+                added = len(entry)
+            current.append(entry)
+            length += added
+
+        if current:
+            digests.append(current)
+
+        messages = [
+            (f"🤖 **BOT LOG** ({len(chunk)} olay)\n\n" + DIGEST_SEPARATOR.join(chunk), len(chunk))
+            for chunk in digests
+        ]
+        if messages and footer:
+            text, count = messages[-1]
+            messages[-1] = (text + footer, count)
+        elif footer:
+            messages.append((f"🤖 **BOT LOG**{footer}", 0))
+        return messages
+
+    async def flush(self):
+        """Kuyruktakileri hemen gönder"""
+        async with self._flush_lock:
+            entries = self._drain()
+            dropped, self._pending_drops = self._pending_drops, 0
+            if not entries and not dropped:
+                return
+
+            for text, count in self.build_digests(entries, dropped):
+                if await self._send(text):
+                    self.sent_messages += 1
+                    self.sent_events += count
+                else:
+                    self.failed_events += count
+
+    async def _send(self, text):
+        if self._bot is None:
+            return False
+
+        parse_mode = 'Markdown'
+        for _ in range(3):
+            try:
+                await self._bot.send_message(chat_id=self.chat_id, text=text, parse_mode=parse_mode)
+                return True
+            except RetryAfter as e:
+                # Flood limiti - bekle ve tekrar dene
+                await asyncio.sleep(e.retry_after)
+            except BadRequest as e:
+                if parse_mode is None:
+                    logging.error(f"Log gönderilemedi: {e}")
+                    return False
+                # Birleşik Markdown bozulduysa düz metin olarak gönder
+                parse_mode = None
+            except Exception as e:
+                logging.error(f"Log gönderilemedi: {e}")
+                return False
+        return False
+
+    def stats(self):
+        return {
+            'queued': self.queue.qsize(),
+            'enqueued': self.enqueued,
+            'dropped': self.dropped,
+            'sent_messages': self.sent_messages,
+            'sent_events': self.sent_events,
+            'failed_events': self.failed_events,
+        }
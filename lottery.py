@@ -0,0 +1,189 @@
+import argparse
+import hashlib
+import json
+import secrets
+from database import get_db_connection, is_sqlite
+
+# Maç çekilişine katılabilen kazanan durumları
+UYGUN_DURUMLAR = ('otomatik', 'beklemede')
+
+
+class NotEnoughCandidates(Exception):
+    """Aday sayısı istenen kazanan sayısından az"""
+
+    def __init__(self, mevcut, istenen):
+        super().__init__(f"Yeterli kazanan yok! Mevcut: {mevcut}, İstenen: {istenen}")
+        self.mevcut = mevcut
+        self.istenen = istenen
+
+
+def new_seed():
+    return secrets.token_hex(16)
+
+
+def _draw_order(tohum, ids):
+    """md5(tohum:id) sırası - veritabanındaki ORDER BY md5(...) ile birebir aynı"""
+    return sorted(ids, key=lambda i: hashlib.md5(f'{tohum}:{i}'.encode()).hexdigest())
+
+
+def _draw(cursor, mac_id, kazanan_sayisi, tohum, yapan, where_sql, params):
+    """Adayları veritabanında md5(tohum:id) sırasına göre örnekle ve cekilisler'e kaydet"""
+    if kazanan_sayisi < 1:
+        raise ValueError("Kazanan sayısı en az 1 olmalı")
+    tohum = tohum or new_seed()
+    params = dict(params, mac_id=mac_id, tohum=tohum, k=kazanan_sayisi, yapan=yapan)
+
+    if is_sqlite():
+        cekilis = _insert_draw_sqlite(cursor, where_sql, params)
+    else:
+        # Sadece k satır ve aday id listesi döner; tüm kazanan satırları Python'a taşınmaz
+        cursor.execute(f'''
+            WITH adaylar AS (
+                SELECT k.id
+                FROM kazananlar k
+                JOIN maclar m ON k.mac_id = m.id
+                WHERE {where_sql}
+            ), secilen AS (
+                SELECT id FROM adaylar
+                ORDER BY md5(%(tohum)s || ':' || id)
+                LIMIT %(k)s
+            )
+            INSERT INTO cekilisler (mac_id, tohum, kazanan_sayisi, aday_sayisi, aday_ids, secilen_ids, yapan)
+            SELECT %(mac_id)s, %(tohum)s, %(k)s,
+                   (SELECT COUNT(*) FROM adaylar),
+                   COALESCE((SELECT array_agg(id ORDER BY id) FROM adaylar), '{{}}'),
+                   COALESCE((SELECT array_agg(id ORDER BY md5(%(tohum)s || ':' || id)) FROM secilen), '{{}}'),
+                   %(yapan)s
+            RETURNING id, aday_sayisi, secilen_ids
+        ''', params)
+        cekilis = cursor.fetchone()
+
+    if cekilis['aday_sayisi'] < kazanan_sayisi:
+        raise NotEnoughCandidates(cekilis['aday_sayisi'], kazanan_sayisi)
+
+    cursor.execute('''
+        SELECT k.id, k.user_id, k.username, k.dogru_tahmin, m.mac_adi, m.gercek_skor
+        FROM kazananlar k
+        JOIN maclar m ON k.mac_id = m.id
+        WHERE k.id = ANY(%s)
+    ''', (cekilis['secilen_ids'],))
+    sira = {kazanan_id: i for i, kazanan_id in enumerate(cekilis['secilen_ids'])}
+
+    return {
+        'id': cekilis['id'],
+        'tohum': tohum,
+        'aday_sayisi': cekilis['aday_sayisi'],
+        'secilenler': sorted(cursor.fetchall(), key=lambda row: sira[row['id']]),
+    }
+
+
+def _insert_draw_sqlite(cursor, where_sql, params):
+    """SQLite'da dizi tipi yok: adaylar Python'da sıralanır, id listeleri JSON olarak saklanır"""
+    cursor.execute(f'''
+        SELECT k.id
+        FROM kazananlar k
+        JOIN maclar m ON k.mac_id = m.id
+        WHERE {where_sql}
+        ORDER BY k.id
+    ''', params)
+    aday_ids = [row['id'] for row in cursor.fetchall()]
+    secilen_ids = _draw_order(params['tohum'], aday_ids)[:params['k']]
+
+    cursor.execute('''
+        INSERT INTO cekilisler (mac_id, tohum, kazanan_sayisi, aday_sayisi, aday_ids, secilen_ids, yapan)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        RETURNING id
+    ''', (params['mac_id'], params['tohum'], params['k'], len(aday_ids), aday_ids, secilen_ids, params['yapan']))
+    return {'id': cursor.fetchone()['id'], 'aday_sayisi': len(aday_ids), 'secilen_ids': secilen_ids}
+
+
+def draw_match(cursor, mac_id, kazanan_sayisi, tohum=None, yapan=None):
+    """Maç çekilişi - seçilenler 'kazandi', diğer uygun adaylar 'kaybetti' olur (commit çağırana ait)"""
+    # Aynı maçta eşzamanlı iki çekiliş aynı adayları kullanmasın
+    cursor.execute('SELECT id FROM maclar WHERE id = %s FOR UPDATE', (mac_id,))
+
+    cekilis = _draw(
+        cursor, mac_id, kazanan_sayisi, tohum, yapan,
+        'k.mac_id = %(filtre_mac_id)s AND k.cekilis_durumu = ANY(%(durumlar)s)',
+        {'filtre_mac_id': mac_id, 'durumlar': list(UYGUN_DURUMLAR)}
+    )
+
+    cursor.execute('''
+        UPDATE kazananlar
+        SET cekilis_durumu = CASE WHEN id = ANY(%s) THEN 'kazandi' ELSE 'kaybetti' END
+        WHERE mac_id = %s AND cekilis_durumu = ANY(%s)
+    ''', ([k['id'] for k in cekilis['secilenler']], mac_id, list(UYGUN_DURUMLAR)))
+
+    return cekilis
+
+
+def draw_general(cursor, kazanan_sayisi, tohum=None, yapan=None):
+    """Tüm kazananlar arasından genel çekiliş - çekiliş durumları değişmez (commit çağırana ait)"""
+    return _draw(cursor, None, kazanan_sayisi, tohum, yapan, 'true', {})
+
+
+def verify_draw(cursor, cekilis_id):
+    """Kayıtlı tohum ve adaylarla çekilişi yeniden hesapla -> (kayıt, sonuç aynı mı)"""
+    if is_sqlite():
+        cursor.execute('SELECT * FROM cekilisler WHERE id = %s', (cekilis_id,))
+        cekilis = cursor.fetchone()
+        if not cekilis:
+            return None, False
+        cekilis['aday_ids'] = json.loads(cekilis['aday_ids'])
+        cekilis['secilen_ids'] = json.loads(cekilis['secilen_ids'])
+        cekilis['yeniden'] = _draw_order(cekilis['tohum'], cekilis['aday_ids'])[:cekilis['kazanan_sayisi']]
+        return cekilis, cekilis['yeniden'] == cekilis['secilen_ids']
+
+    cursor.execute('''
+        SELECT c.*,
+               ARRAY(
+                   SELECT id FROM unnest(c.aday_ids) AS id
+                   ORDER BY md5(c.tohum || ':' || id)
+                   LIMIT c.kazanan_sayisi
+               ) AS yeniden
+        FROM cekilisler c
+        WHERE c.id = %s
+    ''', (cekilis_id,))
+    cekilis = cursor.fetchone()
+    if not cekilis:
+        return None, False
+    return cekilis, cekilis['yeniden'] == cekilis['secilen_ids']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Çekiliş kayıtlarını denetle')
+    subparsers = parser.add_subparsers(dest='komut', required=True)
+    p = subparsers.add_parser('dogrula', help='Çekilişi tohumla yeniden hesapla')
+    p.add_argument('cekilis_id', type=int)
+    p = subparsers.add_parser('listele', help='Son çekilişler')
+    p.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        if args.komut == 'dogrula':
+            cekilis, ayni = verify_draw(cursor, args.cekilis_id)
+            if cekilis is None:
+                print(f"❌ {args.cekilis_id} numaralı çekiliş bulunamadı")
+                raise SystemExit(1)
+            print(f"🎲 #{cekilis['id']} tohum={cekilis['tohum']} aday={cekilis['aday_sayisi']} "
+                  f"seçilen={cekilis['secilen_ids']}")
+            print("✅ Sonuç tohumla birebir üretildi" if ayni else "❌ Sonuç tohumla eşleşmiyor!")
+            raise SystemExit(0 if ayni else 1)
+
+        cursor.execute('''
+            SELECT id, mac_id, tohum, kazanan_sayisi, aday_sayisi, yapan, tarih
+            FROM cekilisler ORDER BY id DESC LIMIT %s
+        ''', (args.limit,))
+        for c in cursor.fetchall():
+            kapsam = f"maç {c['mac_id']}" if c['mac_id'] else 'genel'
+            print(f"#{c['id']:<6} {c['tarih']:%d.%m.%Y %H:%M}  {kapsam:<12} "
+                  f"{c['kazanan_sayisi']}/{c['aday_sayisi']}  tohum={c['tohum']}  {c['yapan'] or ''}")
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+import bisect
+import functools
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Metrik sunucusu sadece yerel adreste dinler (Prometheus aynı makineden çeker)
+METRICS_ADDR = os.environ.get('METRICS_ADDR', '127.0.0.1')
+
+# Aynı port doluysa (ör. gunicorn worker'ları) sıradaki portlar denenir
+METRICS_PORT_RANGE = int(os.environ.get('METRICS_PORT_RANGE', 16))
+
+# Saniye cinsinden varsayılan gecikme kovaları
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} etiketleri {self.labelnames} olmalı: {labels}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    """Sadece artan sayaç"""
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            values = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}' for key, v in values]
+
+
+class GaugeFunc(_Metric):
+    """Değeri okuma anında fonksiyondan alınan gösterge -> {etiket değerleri: değer}"""
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, func, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.func = func
+
+    def collect(self):
+        try:
+            values = self.func() or {}
+        except Exception as e:
+            logging.warning(f"{self.name} okunamadı: {e}")
+            return []
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}'
+                for key, v in values.items()]
+
+
+class Histogram(_Metric):
+    """Kovalı gecikme histogramı (kayıt başına bir kilit + bisect - üretimde açık kalabilir)"""
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # etiketler -> [kova sayıları..., +Inf, toplam, adet]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def time(self, **labels):
+        """with histogram.time(etiket=...): bloğun süresini kaydet"""
+        return _Timer(self, labels)
+
+    def collect(self):
+        with self._lock:
+            series = [(key, list(values)) for key, values in self._series.items()]
+        lines = []
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values):
+                cumulative += count
+                le = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(values[-2])}')
+            lines.append(f'{self.name}_count{labels} {values[-1]}')
+        return lines
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class Registry:
+    """Süreçteki tüm metrikler"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"{metric.name} zaten kayıtlı")
+            self._metrics[metric.name] = metric
+
+    def render(self):
+        """Prometheus text biçimi (0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            samples = metric.collect()
+            if samples:
+                lines.extend(metric.header())
+                lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+PROCESS_START = time.time()
+GaugeFunc('process_start_time_seconds', 'Sürecin başlama zamanı (unix)', lambda: {(): PROCESS_START})
+
+
+def timed_async(histogram, label_func=None, **labels):
+    """Async handler'ın süresini kaydeden decorator - label_func(*args) ek etiketleri döndürür"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                extra = label_func(*args) if label_func else {}
+                histogram.observe(time.perf_counter() - start, **labels, **extra)
+        return wrapper
+    return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, addr=METRICS_ADDR):
+    """/metrics'i arka plan thread'inde sun -> dinlenen port (port 0/boş ise kapalı, None)"""
+    if not port:
+        return None
+    for candidate in range(port, port + METRICS_PORT_RANGE):
+        try:
+            server = ThreadingHTTPServer((addr, candidate), _MetricsHandler)
+        except OSError:
+            continue
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+        logging.info(f"Metrikler http://{addr}:{candidate}/metrics adresinde")
+        return candidate
+    logging.warning(f"Metrik sunucusu başlatılamadı: {port}-{port + METRICS_PORT_RANGE - 1} portları dolu")
+    return None
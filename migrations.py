@@ -0,0 +1,944 @@
+import hashlib
+import logging
+from database import get_backend, get_db_connection
+from points import rebuild_standings
+from stats import fill_counters
+
+# Uygulanan şema sürümlerinin tutulduğu tablo
+SCHEMA_TABLE = 'sema_surumleri'
+
+# Bot ve panel aynı anda başlarsa migration'lar tek seferde çalışsın
+MIGRATION_LOCK_ID = 72061001
+
+# Arka uç başına migration listesi - iki şema da aynı sürüm numaralarını izler
+MIGRATIONS = {'postgres': [], 'sqlite': []}
+
+
+def migration(version, name, transactional=True, backend='postgres'):
+    """Migration kaydı - transactional=False olanlar autocommit çalışır (CONCURRENTLY için)"""
+    def decorator(func):
+        MIGRATIONS[backend].append((version, name, transactional, func))
+        MIGRATIONS[backend].sort(key=lambda m: m[0])
+        return func
+    return decorator
+
+
+def backend_migrations():
+    """Aktif arka ucun migration'ları"""
+    return MIGRATIONS[get_backend().name]
+
+
+def create_index_concurrently(cursor, name, definition):
+    """Tabloyu kilitlemeden index oluştur (yarım kalmış INVALID index'i önce kaldırır)"""
+    cursor.execute('''
+        SELECT i.indisvalid
+        FROM pg_class c
+        JOIN pg_index i ON i.indexrelid = c.oid
+        WHERE c.relname = %s
+    ''', (name,))
+    existing = cursor.fetchone()
+    if existing and not existing['indisvalid']:
+        cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+    cursor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}')
+
+
+def _varsayilan_admin(cursor):
+    """Hiç 'admin' yoksa varsayılan yöneticiyi oluştur"""
+    cursor.execute('''
+        SELECT COUNT(*) as count FROM yoneticiler WHERE kullanici_adi = 'admin'
+    ''')
+
+    result = cursor.fetchone()
+    if result and result['count'] == 0:
+        varsayilan_sifre = "admin123"
+        sifre_hash = hashlib.sha256(varsayilan_sifre.encode()).hexdigest()
+
+        cursor.execute('''
+            INSERT INTO yoneticiler (kullanici_adi, sifre_hash, tam_isim, yetki_seviyesi)
+            VALUES (%s, %s, %s, %s)
+        ''', ('admin', sifre_hash, 'Sistem Yöneticisi', 'super_admin'))
+
+        print("✅ Varsayılan admin kullanıcısı oluşturuldu (Kullanıcı: admin, Şifre: admin123)")
+
+
+@migration(1, 'temel şema')
+def _m001_temel_sema(cursor):
+    # Maçlar tablosu
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS maclar (
+            id SERIAL PRIMARY KEY,
+            mac_adi VARCHAR(200) NOT NULL UNIQUE,
+            takim1 VARCHAR(100) NOT NULL,
+            takim2 VARCHAR(100) NOT NULL,
+            mac_tarihi TIMESTAMP,
+            durum VARCHAR(20) DEFAULT 'aktif',
+            gercek_skor VARCHAR(20),
+            olusturma_tarihi TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Kullanıcılar tablosu
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS kullanicilar (
+            user_id BIGINT PRIMARY KEY,
+            telegram_username VARCHAR(100),
+            site_username VARCHAR(50) NOT NULL,
+            kayit_tarihi TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Tahminler tablosu
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tahminler (
+            id SERIAL PRIMARY KEY,
+            user_id BIGINT NOT NULL,
+            username VARCHAR(100),
+            mac_id INTEGER REFERENCES maclar(id),
+            mac_adi VARCHAR(200),
+            skor_tahmini VARCHAR(20),
+            tarih TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Kazananlar tablosu
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS kazananlar (
+            id SERIAL PRIMARY KEY,
+            mac_id INTEGER REFERENCES maclar(id),
+            user_id BIGINT,
+            username VARCHAR(100),
+            dogru_tahmin VARCHAR(20),
+            cekilis_durumu VARCHAR(20) DEFAULT 'otomatik',
+            kazanma_tarihi TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # YÖNETİCİLER TABLOSU
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS yoneticiler (
+            id SERIAL PRIMARY KEY,
+            kullanici_adi VARCHAR(50) UNIQUE NOT NULL,
+            sifre_hash VARCHAR(255) NOT NULL,
+            tam_isim VARCHAR(100),
+            yetki_seviyesi VARCHAR(20) DEFAULT 'admin',
+            son_giris TIMESTAMP,
+            olusturma_tarihi TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            aktif BOOLEAN DEFAULT true
+        )
+    ''')
+
+    # Varsayılan admin kullanıcısı oluştur
+    _varsayilan_admin(cursor)
+
+    # Tek tahmin kuralı için unique constraint
+    cursor.execute('''
+        SELECT COUNT(*) as count FROM pg_constraint
+        WHERE conname = 'tahminler_user_mac_unique'
+    ''')
+
+    if cursor.fetchone()['count'] == 0:
+        cursor.execute('SAVEPOINT unique_constraint')
+        try:
+            cursor.execute('''
+                ALTER TABLE tahminler
+                ADD CONSTRAINT tahminler_user_mac_unique
+                UNIQUE (user_id, mac_id)
+            ''')
+            cursor.execute('RELEASE SAVEPOINT unique_constraint')
+            print("✅ UNIQUE constraint eklendi")
+        except Exception as constraint_error:
+            cursor.execute('ROLLBACK TO SAVEPOINT unique_constraint')
+            print(f"⚠️ Constraint ekleme hatası (göz ardı edildi): {constraint_error}")
+
+
+@migration(2, 'sık kullanılan sorgular için index\'ler', transactional=False)
+def _m002_sicak_indexler(cursor):
+    # tahminler WHERE mac_id = ... AND skor_tahmini = ... (kazanan belirleme)
+    create_index_concurrently(cursor, 'idx_tahminler_mac_skor', 'ON tahminler (mac_id, skor_tahmini)')
+    # tahminler WHERE user_id = ... ORDER BY tarih DESC (/tahminlerim)
+    create_index_concurrently(cursor, 'idx_tahminler_user_tarih', 'ON tahminler (user_id, tarih DESC)')
+    # kazananlar WHERE mac_id = ... AND cekilis_durumu IN (...) (çekiliş)
+    create_index_concurrently(cursor, 'idx_kazananlar_mac_durum', 'ON kazananlar (mac_id, cekilis_durumu)')
+    # maclar WHERE durum = 'aktif' ORDER BY mac_tarihi (aktif maç listesi)
+    create_index_concurrently(
+        cursor, 'idx_maclar_aktif_tarih',
+        "ON maclar (mac_tarihi, olusturma_tarihi) WHERE durum = 'aktif'"
+    )
+
+
+# Aynı kullanıcının aynı maça ikinci kaydı bağlanamaz (user_id, mac_id tekil):
+# maça bağlı kaydı ya da daha eski bağlanmamış kaydı olan eski satırlar silinir
+ESKI_TEKRAR_TAHMINLERI_SIL = '''
+    DELETE FROM tahminler
+    WHERE id IN (
+        SELECT t.id
+        FROM tahminler t
+        JOIN maclar m ON m.mac_adi = t.mac_adi
+        WHERE t.mac_id IS NULL
+          AND (EXISTS (SELECT 1 FROM tahminler d WHERE d.user_id = t.user_id AND d.mac_id = m.id)
+               OR EXISTS (SELECT 1 FROM tahminler d
+                          WHERE d.user_id = t.user_id AND d.mac_id IS NULL
+                            AND d.mac_adi = t.mac_adi AND d.id < t.id))
+    )
+'''
+
+
+def _eski_tekrarlari_sil(cursor):
+    cursor.execute(ESKI_TEKRAR_TAHMINLERI_SIL)
+    if cursor.rowcount:
+        print(f"⚠️ {cursor.rowcount} tekrarlanan eski tahmin silindi (kullanıcının maça bağlı kaydı korundu)")
+
+
+@migration(3, 'tahminler.mac_id geri doldurma')
+def _m003_mac_id_doldur(cursor):
+    _eski_tekrarlari_sil(cursor)
+
+    # Eski kayıtlar sadece mac_adi ile bağlıydı - id'ye çevir
+    cursor.execute('''
+        UPDATE tahminler t
+        SET mac_id = m.id
+        FROM maclar m
+        WHERE t.mac_id IS NULL AND t.mac_adi = m.mac_adi
+    ''')
+    print(f"✅ {cursor.rowcount} tahmin maç id'sine bağlandı")
+
+    # Yeni kayıtlar mac_id olmadan eklenemez (eski satırlar tabloyu kilitlemeden kontrol edilmez)
+    cursor.execute('''
+        SELECT COUNT(*) as count FROM pg_constraint
+        WHERE conname = 'tahminler_mac_id_not_null'
+    ''')
+    if cursor.fetchone()['count'] == 0:
+        cursor.execute('''
+            ALTER TABLE tahminler
+            ADD CONSTRAINT tahminler_mac_id_not_null
+            CHECK (mac_id IS NOT NULL) NOT VALID
+        ''')
+
+    cursor.execute('SELECT COUNT(*) as count FROM tahminler WHERE mac_id IS NULL')
+    sahipsiz = cursor.fetchone()['count']
+    if sahipsiz == 0:
+        cursor.execute('ALTER TABLE tahminler VALIDATE CONSTRAINT tahminler_mac_id_not_null')
+    else:
+        # Maçı silinmiş/adı eşleşmeyen kayıtlar - panelde zaten hiçbir maça bağlanamıyordu
+        print(f"⚠️ {sahipsiz} tahmin hiçbir maçla eşleşmedi, constraint NOT VALID bırakıldı")
+
+
+@migration(4, '/tahminler keyset sayfalama index\'i', transactional=False)
+def _m004_tahmin_tarih_index(cursor):
+    # ORDER BY tarih DESC, id DESC ve (tarih, id) < (...) imleç koşulu
+    create_index_concurrently(cursor, 'idx_tahminler_tarih_id', 'ON tahminler (tarih DESC, id DESC)')
+
+
+@migration(5, 'istatistik sayaçları')
+def _m005_istatistik_sayaclari(cursor):
+    # Sık güncellenen tek satır kilit darboğazı olmasın diye her sayaç 16 parçaya bölünür
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS istatistik_sayaclari (
+            anahtar VARCHAR(50) NOT NULL,
+            parca SMALLINT NOT NULL,
+            deger BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (anahtar, parca)
+        )
+    ''')
+
+    # COUNT(DISTINCT user_id) yerine kullanıcı başına tahmin sayısı
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS kullanici_tahmin_sayilari (
+            user_id BIGINT PRIMARY KEY,
+            tahmin_sayisi INTEGER NOT NULL
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE OR REPLACE FUNCTION istatistik_sayac_ekle(p_anahtar VARCHAR, p_fark BIGINT)
+        RETURNS void AS $$
+        BEGIN
+            IF p_fark = 0 THEN
+                RETURN;
+            END IF;
+            INSERT INTO istatistik_sayaclari AS s (anahtar, parca, deger)
+            VALUES (p_anahtar, pg_backend_pid() % 16, p_fark)
+            ON CONFLICT (anahtar, parca) DO UPDATE SET deger = s.deger + EXCLUDED.deger;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+
+    # Tahminler: satır başına değil, ifade başına (transition table) çalışır
+    cursor.execute('''
+        CREATE OR REPLACE FUNCTION tahminler_istatistik_ekle() RETURNS trigger AS $$
+        DECLARE
+            eklenen BIGINT;
+            yeni_kullanici BIGINT;
+        BEGIN
+            SELECT COUNT(*) INTO eklenen FROM yeni_tahminler;
+            IF eklenen = 0 THEN
+                RETURN NULL;
+            END IF;
+
+            WITH sayilar AS (
+                INSERT INTO kullanici_tahmin_sayilari AS k (user_id, tahmin_sayisi)
+                SELECT user_id, COUNT(*) FROM yeni_tahminler GROUP BY user_id ORDER BY user_id
+                ON CONFLICT (user_id) DO UPDATE SET tahmin_sayisi = k.tahmin_sayisi + EXCLUDED.tahmin_sayisi
+                RETURNING (xmax = 0) AS yeni
+            )
+            SELECT COUNT(*) FILTER (WHERE yeni) INTO yeni_kullanici FROM sayilar;
+
+            PERFORM istatistik_sayac_ekle('toplam_tahminler', eklenen);
+            PERFORM istatistik_sayac_ekle('toplam_kullanicilar', yeni_kullanici);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+
+    cursor.execute('''
+        CREATE OR REPLACE FUNCTION tahminler_istatistik_sil() RETURNS trigger AS $$
+        DECLARE
+            silinen BIGINT;
+            biten_kullanici BIGINT;
+        BEGIN
+            SELECT COUNT(*) INTO silinen FROM eski_tahminler;
+            IF silinen = 0 THEN
+                RETURN NULL;
+            END IF;
+
+            UPDATE kullanici_tahmin_sayilari k
+            SET tahmin_sayisi = k.tahmin_sayisi - s.sayi
+            FROM (SELECT user_id, COUNT(*) AS sayi FROM eski_tahminler GROUP BY user_id) s
+            WHERE k.user_id = s.user_id;
+
+            WITH bitenler AS (
+                DELETE FROM kullanici_tahmin_sayilari
+                WHERE tahmin_sayisi <= 0
+                AND user_id IN (SELECT user_id FROM eski_tahminler)
+                RETURNING user_id
+            )
+            SELECT COUNT(*) INTO biten_kullanici FROM bitenler;
+
+            PERFORM istatistik_sayac_ekle('toplam_tahminler', -silinen);
+            PERFORM istatistik_sayac_ekle('toplam_kullanicilar', -biten_kullanici);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+
+    cursor.execute('''
+        CREATE OR REPLACE FUNCTION maclar_istatistik() RETURNS trigger AS $$
+        DECLARE
+            fark BIGINT := 0;
+        BEGIN
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.durum = 'aktif' THEN
+                fark := fark + 1;
+            END IF;
+            IF TG_OP IN ('DELETE', 'UPDATE') AND OLD.durum = 'aktif' THEN
+                fark := fark - 1;
+            END IF;
+            PERFORM istatistik_sayac_ekle('aktif_maclar', fark);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+
+    cursor.execute('''
+        CREATE OR REPLACE FUNCTION kazananlar_istatistik() RETURNS trigger AS $$
+        DECLARE
+            fark BIGINT;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT COUNT(*) INTO fark FROM yeni_kazananlar;
+            ELSE
+                SELECT -COUNT(*) INTO fark FROM eski_kazananlar;
+            END IF;
+            PERFORM istatistik_sayac_ekle('toplam_kazananlar', fark);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+
+    # user_id güncellemesi uygulamada yok; olursa periyodik uzlaştırma düzeltir
+    cursor.execute('''
+        DROP TRIGGER IF EXISTS tahminler_istatistik_ekle ON tahminler;
+        CREATE TRIGGER tahminler_istatistik_ekle
+            AFTER INSERT ON tahminler
+            REFERENCING NEW TABLE AS yeni_tahminler
+            FOR EACH STATEMENT EXECUTE FUNCTION tahminler_istatistik_ekle();
+
+        DROP TRIGGER IF EXISTS tahminler_istatistik_sil ON tahminler;
+        CREATE TRIGGER tahminler_istatistik_sil
+            AFTER DELETE ON tahminler
+            REFERENCING OLD TABLE AS eski_tahminler
+            FOR EACH STATEMENT EXECUTE FUNCTION tahminler_istatistik_sil();
+
+        DROP TRIGGER IF EXISTS maclar_istatistik ON maclar;
+        CREATE TRIGGER maclar_istatistik
+            AFTER INSERT OR DELETE OR UPDATE OF durum ON maclar
+            FOR EACH ROW EXECUTE FUNCTION maclar_istatistik();
+
+        DROP TRIGGER IF EXISTS kazananlar_istatistik_ekle ON kazananlar;
+        CREATE TRIGGER kazananlar_istatistik_ekle
+            AFTER INSERT ON kazananlar
+            REFERENCING NEW TABLE AS yeni_kazananlar
+            FOR EACH STATEMENT EXECUTE FUNCTION kazananlar_istatistik();
+
+        DROP TRIGGER IF EXISTS kazananlar_istatistik_sil ON kazananlar;
+        CREATE TRIGGER kazananlar_istatistik_sil
+            AFTER DELETE ON kazananlar
+            REFERENCING OLD TABLE AS eski_kazananlar
+            FOR EACH STATEMENT EXECUTE FUNCTION kazananlar_istatistik();
+    ''')
+
+    # İlk değerler - trigger'lar ile aynı transaction'da, yazmalar beklerken
+    cursor.execute('LOCK TABLE maclar, tahminler, kazananlar IN SHARE MODE')
+    fill_counters(cursor)
+
+
+@migration(6, 'kazananlar (mac_id, user_id) tekilliği')
+def _m006_kazanan_tekilligi(cursor):
+    # Eski döngü aynı kullanıcıyı birden fazla yazabiliyordu - ilk kaydı tut
+    cursor.execute('''
+        DELETE FROM kazananlar k
+        USING kazananlar d
+        WHERE k.mac_id = d.mac_id AND k.user_id = d.user_id AND k.id > d.id
+    ''')
+    if cursor.rowcount:
+        print(f"✅ {cursor.rowcount} tekrarlanan kazanan kaydı silindi")
+
+    cursor.execute('''
+        SELECT COUNT(*) as count FROM pg_constraint
+        WHERE conname = 'kazananlar_mac_user_unique'
+    ''')
+    if cursor.fetchone()['count'] == 0:
+        cursor.execute('''
+            ALTER TABLE kazananlar
+            ADD CONSTRAINT kazananlar_mac_user_unique
+            UNIQUE (mac_id, user_id)
+        ''')
+
+
+@migration(7, 'çekiliş kayıtları')
+def _m007_cekilisler(cursor):
+    # Tohum ve aday listesi ile her çekiliş sonradan yeniden hesaplanabilir
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cekilisler (
+            id SERIAL PRIMARY KEY,
+            mac_id INTEGER,  -- NULL: genel çekiliş (maç silinse de kayıt kalır)
+            tohum VARCHAR(64) NOT NULL,
+            kazanan_sayisi INTEGER NOT NULL,
+            aday_sayisi INTEGER NOT NULL,
+            aday_ids INTEGER[] NOT NULL,
+            secilen_ids INTEGER[] NOT NULL,
+            yapan VARCHAR(50),
+            tarih TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_cekilisler_mac ON cekilisler (mac_id, tarih DESC)')
+
+
+@migration(8, 'yavaş sorgu kayıtları')
+@migration(8, 'yavaş sorgu kayıtları', backend='sqlite')
+def _m008_yavas_sorgular(cursor):
+    # Parmak izi başına toplu istatistik + son yavaş örnek ve EXPLAIN çıktısı
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS yavas_sorgular (
+            parmak_izi VARCHAR(32) PRIMARY KEY,
+            sorgu TEXT NOT NULL,
+            ornek TEXT,
+            islem VARCHAR(20),
+            kaynak VARCHAR(20),
+            sayi BIGINT NOT NULL DEFAULT 0,
+            toplam_ms DOUBLE PRECISION NOT NULL DEFAULT 0,
+            en_uzun_ms DOUBLE PRECISION NOT NULL DEFAULT 0,
+            ilk_gorulme TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            son_gorulme TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            plan TEXT,
+            plan_analiz BOOLEAN,
+            plan_ms DOUBLE PRECISION,
+            plan_tarihi TIMESTAMP
+        )
+    ''')
+
+
+@migration(9, 'istek profilleri')
+def _m009_profiller(cursor):
+    # Süre dağılımı + çağrı ağacı metni; ham pstats verisi indirilip snakeviz vb. ile açılabilir
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS profiller (
+            id SERIAL PRIMARY KEY,
+            rota VARCHAR(200),
+            yol TEXT,
+            yapan VARCHAR(50),
+            durum INTEGER,
+            toplam_ms DOUBLE PRECISION,
+            db_ms DOUBLE PRECISION,
+            db_sorgu INTEGER,
+            sablon_ms DOUBLE PRECISION,
+            python_ms DOUBLE PRECISION,
+            agac TEXT,
+            tablo TEXT,
+            ham BYTEA,
+            tarih TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+# SQLite şeması: aynı sürümler, gömülü veritabanının söz dizimiyle.
+# Eski sürümün tahminler.db dosyası da bu migration'larla güncellenir (tablolar korunur).
+
+@migration(1, 'temel şema', backend='sqlite')
+def _m001_temel_sema_sqlite(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS maclar (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            mac_adi VARCHAR(200) NOT NULL,
+            takim1 VARCHAR(100) NOT NULL,
+            takim2 VARCHAR(100) NOT NULL,
+            mac_tarihi TIMESTAMP,
+            durum VARCHAR(20) DEFAULT 'aktif',
+            gercek_skor VARCHAR(20),
+            olusturma_tarihi TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS kullanicilar (
+            user_id INTEGER PRIMARY KEY,
+            telegram_username VARCHAR(100),
+            site_username VARCHAR(50) NOT NULL,
+            kayit_tarihi TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tahminler (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            username VARCHAR(100),
+            mac_id INTEGER REFERENCES maclar(id),
+            mac_adi VARCHAR(200),
+            skor_tahmini VARCHAR(20),
+            tarih TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS kazananlar (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            mac_id INTEGER REFERENCES maclar(id),
+            user_id INTEGER,
+            username VARCHAR(100),
+            dogru_tahmin VARCHAR(20),
+            cekilis_durumu VARCHAR(20) DEFAULT 'otomatik',
+            kazanma_tarihi TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS yoneticiler (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kullanici_adi VARCHAR(50) UNIQUE NOT NULL,
+            sifre_hash VARCHAR(255) NOT NULL,
+            tam_isim VARCHAR(100),
+            yetki_seviyesi VARCHAR(20) DEFAULT 'admin',
+            son_giris TIMESTAMP,
+            olusturma_tarihi TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            aktif BOOLEAN DEFAULT true
+        )
+    ''')
+
+    # LISTEN/NOTIFY yerine: kanal başına sürüm, dinleyiciler yoklar
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bildirimler (
+            kanal VARCHAR(50) PRIMARY KEY,
+            surum INTEGER NOT NULL DEFAULT 0,
+            son_veri TEXT
+        )
+    ''')
+
+    _varsayilan_admin(cursor)
+
+    # Tekillikler unique index olarak (ON CONFLICT ON CONSTRAINT adları bu index'lere çözülür)
+    for name, definition in (
+        ('maclar_mac_adi_key', 'ON maclar (mac_adi)'),
+        ('tahminler_user_mac_unique', 'ON tahminler (user_id, mac_id)'),
+    ):
+        try:
+            cursor.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS {name} {definition}')
+        except Exception as e:
+            # Eski veride tekrar eden kayıtlar olabilir - PostgreSQL şemasındaki gibi göz ardı edilir
+            print(f"⚠️ {name} eklenemedi (göz ardı edildi): {e}")
+
+
+@migration(2, 'sık kullanılan sorgular için index\'ler', backend='sqlite')
+def _m002_sicak_indexler_sqlite(cursor):
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tahminler_mac_skor ON tahminler (mac_id, skor_tahmini)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tahminler_user_tarih ON tahminler (user_id, tarih DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_kazananlar_mac_durum ON kazananlar (mac_id, cekilis_durumu)')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_maclar_aktif_tarih
+        ON maclar (mac_tarihi, olusturma_tarihi) WHERE durum = 'aktif'
+    ''')
+
+
+@migration(3, 'tahminler.mac_id geri doldurma', backend='sqlite')
+def _m003_mac_id_doldur_sqlite(cursor):
+    _eski_tekrarlari_sil(cursor)
+
+    cursor.execute('''
+        UPDATE tahminler AS t
+        SET mac_id = m.id
+        FROM maclar m
+        WHERE t.mac_id IS NULL AND t.mac_adi = m.mac_adi
+    ''')
+    print(f"✅ {cursor.rowcount} tahmin maç id'sine bağlandı")
+
+    # ALTER TABLE ile CHECK eklenemez - yeni kayıtlar için trigger (eski satırlar kontrol edilmez)
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS tahminler_mac_id_not_null
+        BEFORE INSERT ON tahminler
+        WHEN NEW.mac_id IS NULL
+        BEGIN
+            SELECT RAISE(ABORT, 'tahminler.mac_id boş olamaz');
+        END
+    ''')
+
+
+@migration(4, '/tahminler keyset sayfalama index\'i', backend='sqlite')
+def _m004_tahmin_tarih_index_sqlite(cursor):
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tahminler_tarih_id ON tahminler (tarih DESC, id DESC)')
+
+
+def _sayac_ekle_sql(anahtar, fark):
+    """SQLite trigger gövdesi için sayaç artırma (tek yazar olduğundan parça 0 yeterli)"""
+    return f'''
+        INSERT INTO istatistik_sayaclari (anahtar, parca, deger) VALUES ('{anahtar}', 0, {fark})
+        ON CONFLICT (anahtar, parca) DO UPDATE SET deger = deger + excluded.deger;
+    '''
+
+
+@migration(5, 'istatistik sayaçları', backend='sqlite')
+def _m005_istatistik_sayaclari_sqlite(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS istatistik_sayaclari (
+            anahtar VARCHAR(50) NOT NULL,
+            parca SMALLINT NOT NULL,
+            deger BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (anahtar, parca)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS kullanici_tahmin_sayilari (
+            user_id INTEGER PRIMARY KEY,
+            tahmin_sayisi INTEGER NOT NULL
+        )
+    ''')
+
+    # SQLite'da ifade başına trigger yok - satır başına, aynı sayaçları günceller
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS tahminler_istatistik_ekle
+        AFTER INSERT ON tahminler
+        BEGIN
+            INSERT INTO istatistik_sayaclari (anahtar, parca, deger)
+            SELECT 'toplam_kullanicilar', 0, 1
+            WHERE NOT EXISTS (SELECT 1 FROM kullanici_tahmin_sayilari WHERE user_id = NEW.user_id)
+            ON CONFLICT (anahtar, parca) DO UPDATE SET deger = deger + excluded.deger;
+            INSERT INTO kullanici_tahmin_sayilari (user_id, tahmin_sayisi) VALUES (NEW.user_id, 1)
+            ON CONFLICT (user_id) DO UPDATE SET tahmin_sayisi = tahmin_sayisi + 1;
+            {_sayac_ekle_sql('toplam_tahminler', 1)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS tahminler_istatistik_sil
+        AFTER DELETE ON tahminler
+        BEGIN
+            UPDATE kullanici_tahmin_sayilari SET tahmin_sayisi = tahmin_sayisi - 1 WHERE user_id = OLD.user_id;
+            INSERT INTO istatistik_sayaclari (anahtar, parca, deger)
+            SELECT 'toplam_kullanicilar', 0, -1
+            WHERE EXISTS (
+                SELECT 1 FROM kullanici_tahmin_sayilari WHERE user_id = OLD.user_id AND tahmin_sayisi <= 0
+            )
+            ON CONFLICT (anahtar, parca) DO UPDATE SET deger = deger + excluded.deger;
+            DELETE FROM kullanici_tahmin_sayilari WHERE user_id = OLD.user_id AND tahmin_sayisi <= 0;
+            {_sayac_ekle_sql('toplam_tahminler', -1)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS maclar_istatistik_ekle
+        AFTER INSERT ON maclar WHEN NEW.durum = 'aktif'
+        BEGIN {_sayac_ekle_sql('aktif_maclar', 1)} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS maclar_istatistik_sil
+        AFTER DELETE ON maclar WHEN OLD.durum = 'aktif'
+        BEGIN {_sayac_ekle_sql('aktif_maclar', -1)} END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS maclar_istatistik_durum
+        AFTER UPDATE OF durum ON maclar
+        WHEN (NEW.durum = 'aktif') <> (OLD.durum = 'aktif')
+        BEGIN
+            INSERT INTO istatistik_sayaclari (anahtar, parca, deger)
+            VALUES ('aktif_maclar', 0, CASE WHEN NEW.durum = 'aktif' THEN 1 ELSE -1 END)
+            ON CONFLICT (anahtar, parca) DO UPDATE SET deger = deger + excluded.deger;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS kazananlar_istatistik_ekle
+        AFTER INSERT ON kazananlar
+        BEGIN {_sayac_ekle_sql('toplam_kazananlar', 1)} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS kazananlar_istatistik_sil
+        AFTER DELETE ON kazananlar
+        BEGIN {_sayac_ekle_sql('toplam_kazananlar', -1)} END
+    ''')
+
+    fill_counters(cursor)
+
+
+@migration(6, 'kazananlar (mac_id, user_id) tekilliği', backend='sqlite')
+def _m006_kazanan_tekilligi_sqlite(cursor):
+    cursor.execute('''
+        DELETE FROM kazananlar
+        WHERE EXISTS (
+            SELECT 1 FROM kazananlar d
+            WHERE d.mac_id = kazananlar.mac_id AND d.user_id = kazananlar.user_id AND d.id < kazananlar.id
+        )
+    ''')
+    if cursor.rowcount:
+        print(f"✅ {cursor.rowcount} tekrarlanan kazanan kaydı silindi")
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS kazananlar_mac_user_unique ON kazananlar (mac_id, user_id)
+    ''')
+
+
+@migration(7, 'çekiliş kayıtları', backend='sqlite')
+def _m007_cekilisler_sqlite(cursor):
+    # Dizi tipi yok - aday ve seçilen id'ler JSON listesi olarak saklanır
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cekilisler (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            mac_id INTEGER,
+            tohum VARCHAR(64) NOT NULL,
+            kazanan_sayisi INTEGER NOT NULL,
+            aday_sayisi INTEGER NOT NULL,
+            aday_ids TEXT NOT NULL,
+            secilen_ids TEXT NOT NULL,
+            yapan VARCHAR(50),
+            tarih TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_cekilisler_mac ON cekilisler (mac_id, tarih DESC)')
+
+
+@migration(9, 'istek profilleri', backend='sqlite')
+def _m009_profiller_sqlite(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS profiller (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            rota VARCHAR(200),
+            yol TEXT,
+            yapan VARCHAR(50),
+            durum INTEGER,
+            toplam_ms DOUBLE PRECISION,
+            db_ms DOUBLE PRECISION,
+            db_sorgu INTEGER,
+            sablon_ms DOUBLE PRECISION,
+            python_ms DOUBLE PRECISION,
+            agac TEXT,
+            tablo TEXT,
+            ham BLOB,
+            tarih TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+@migration(10, 'puanlar ve sıralama')
+@migration(10, 'puanlar ve sıralama', backend='sqlite')
+def _m010_siralama(cursor):
+    # Maç başına verilen puan: skor değişince sadece bu maçın farkı sıralamaya uygulanır
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tahmin_puanlari (
+            mac_id INTEGER NOT NULL REFERENCES maclar(id),
+            user_id BIGINT NOT NULL,
+            puan INTEGER NOT NULL,
+            sonuc VARCHAR(20) NOT NULL,
+            PRIMARY KEY (mac_id, user_id)
+        )
+    ''')
+
+    # Kullanıcı başına toplam ve önceden hesaplanmış sıra
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS siralama (
+            user_id BIGINT PRIMARY KEY,
+            username VARCHAR(100),
+            puan INTEGER NOT NULL DEFAULT 0,
+            tam_skor INTEGER NOT NULL DEFAULT 0,
+            gol_farki INTEGER NOT NULL DEFAULT 0,
+            dogru_sonuc INTEGER NOT NULL DEFAULT 0,
+            mac_sayisi INTEGER NOT NULL DEFAULT 0,
+            sira INTEGER,
+            guncelleme TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_siralama_sira ON siralama (sira, user_id)')
+
+    sayi = rebuild_standings(cursor)
+    print(f"✅ Sıralama geçmiş maçlardan hesaplandı ({sayi} kullanıcı)")
+
+
+# Tarihi olmayan eski tahminler maçın eklenme tarihini alır
+TARIHSIZ_TAHMINLERI_DOLDUR = '''
+    UPDATE tahminler
+    SET tarih = COALESCE(
+        (SELECT m.olusturma_tarihi FROM maclar m WHERE m.id = tahminler.mac_id),
+        CURRENT_TIMESTAMP
+    )
+    WHERE tarih IS NULL
+'''
+
+
+@migration(11, 'tahminler.tarih NOT NULL')
+def _m011_tahmin_tarihi_zorunlu(cursor):
+    # /tahminler imleci (tarih, id) üzerinde; NULL tarihli satırlar sayfalamadan düşüyordu
+    cursor.execute(TARIHSIZ_TAHMINLERI_DOLDUR)
+    if cursor.rowcount:
+        print(f"✅ {cursor.rowcount} tarihsiz tahmine tarih verildi")
+    cursor.execute('ALTER TABLE tahminler ALTER COLUMN tarih SET NOT NULL')
+
+
+@migration(11, 'tahminler.tarih NOT NULL', backend='sqlite')
+def _m011_tahmin_tarihi_zorunlu_sqlite(cursor):
+    cursor.execute(TARIHSIZ_TAHMINLERI_DOLDUR)
+    if cursor.rowcount:
+        print(f"✅ {cursor.rowcount} tarihsiz tahmine tarih verildi")
+    # SQLite kolonu sonradan NOT NULL yapamaz - aynı kural trigger ile
+    for olay in ('INSERT', 'UPDATE OF tarih'):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS tahminler_tarih_zorunlu_{olay.split()[0].lower()}
+            BEFORE {olay} ON tahminler
+            WHEN NEW.tarih IS NULL
+            BEGIN
+                SELECT RAISE(ABORT, 'NOT NULL constraint failed: tahminler.tarih');
+            END
+        ''')
+
+
+@migration(12, 'sıralama puan index\'i', transactional=False)
+def _m012_siralama_puan_index(cursor):
+    # Puan değişince kaydırılan sıra bandı ve kullanıcının yeni sırası (puan, tam_skor) aralığından okunur
+    create_index_concurrently(cursor, 'idx_siralama_puan', 'ON siralama (puan, tam_skor)')
+
+
+@migration(12, 'sıralama puan index\'i', backend='sqlite')
+def _m012_siralama_puan_index_sqlite(cursor):
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_siralama_puan ON siralama (puan, tam_skor)')
+
+
+def latest_version():
+    migrations = backend_migrations()
+    return migrations[-1][0] if migrations else 0
+
+
+def current_version(cursor):
+    """Veritabanındaki şema sürümü (tablo yoksa 0)"""
+    if not get_backend().table_exists(cursor, SCHEMA_TABLE):
+        return 0
+    cursor.execute(f'SELECT COALESCE(MAX(surum), 0) AS surum FROM {SCHEMA_TABLE}')
+    return cursor.fetchone()['surum']
+
+
+def run_migrations():
+    """Bekleyen migration'ları uygula - şema güncelse tek sorguyla döner"""
+    backend = get_backend()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        # Hızlı yol: şema güncel
+        if current_version(cursor) >= latest_version():
+            conn.rollback()
+            return 0
+
+        conn.rollback()
+        conn.autocommit = True
+        backend.lock(cursor, MIGRATION_LOCK_ID)
+        try:
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {SCHEMA_TABLE} (
+                    surum INTEGER PRIMARY KEY,
+                    aciklama VARCHAR(200) NOT NULL,
+                    uygulanma_tarihi TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute(f'SELECT surum FROM {SCHEMA_TABLE}')
+            applied = {row['surum'] for row in cursor.fetchall()}
+
+            count = 0
+            for version, name, transactional, func in backend_migrations():
+                if version in applied:
+                    continue
+
+                print(f"🔧 Migration {version} uygulanıyor: {name}")
+                if transactional:
+                    conn.autocommit = False
+                    try:
+                        func(cursor)
+                        cursor.execute(
+                            f'INSERT INTO {SCHEMA_TABLE} (surum, aciklama) VALUES (%s, %s)',
+                            (version, name)
+                        )
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+                    finally:
+                        conn.autocommit = True
+                else:
+                    # CONCURRENTLY transaction içinde çalışmaz; adımlar tekrar çalıştırılabilir olmalı
+                    func(cursor)
+                    cursor.execute(
+                        f'INSERT INTO {SCHEMA_TABLE} (surum, aciklama) VALUES (%s, %s)',
+                        (version, name)
+                    )
+                count += 1
+
+            print(f"✅ Veritabanı şeması güncel (sürüm {latest_version()})")
+            return count
+        finally:
+            backend.unlock(cursor, MIGRATION_LOCK_ID)
+
+    except Exception as e:
+        logging.error(f"Migration hatası: {e}")
+        print(f"❌ Veritabanı hatası: {e}")
+        raise e
+    finally:
+        conn.close()
+
+
+def show_status():
+    """Uygulanan ve bekleyen migration'ları listele"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        applied = {}
+        if current_version(cursor) > 0:
+            cursor.execute(f'SELECT surum, uygulanma_tarihi FROM {SCHEMA_TABLE}')
+            applied = {row['surum']: row['uygulanma_tarihi'] for row in cursor.fetchall()}
+        conn.rollback()
+    finally:
+        conn.close()
+
+    for version, name, transactional, _ in backend_migrations():
+        if version in applied:
+            print(f"✅ {version:03d} {name} ({applied[version]:%d.%m.%Y %H:%M})")
+        else:
+            print(f"⏳ {version:03d} {name}")
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'durum':
+        show_status()
+    else:
+        applied = run_migrations()
+        print(f"ℹ️ {applied} migration uygulandı")
@@ -0,0 +1,51 @@
+import os
+import threading
+import time
+
+# Panel sayım/istatistik önbelleği süresi (saniye)
+PANEL_CACHE_TTL = float(os.environ.get('PANEL_CACHE_TTL', 30))
+
+
+class TTLCache:
+    """Süreli, thread-safe basit önbellek (gunicorn worker başına bir kopya)"""
+
+    def __init__(self, ttl=PANEL_CACHE_TTL, max_items=1024):
+        self.ttl = ttl
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._items = {}
+
+    def get(self, key):
+        """Süresi dolmamış değer - yoksa None"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            if len(self._items) >= self.max_items and key not in self._items:
+                # En erken dolacak kaydı at
+                oldest = min(self._items, key=lambda k: self._items[k][0])
+                del self._items[oldest]
+            self._items[key] = (time.monotonic() + self.ttl, value)
+
+    def get_or_load(self, key, loader):
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key=None):
+        """Tek kaydı veya (key verilmezse) tümünü sil"""
+        with self._lock:
+            if key is None:
+                self._items.clear()
+            else:
+                self._items.pop(key, None)
@@ -0,0 +1,266 @@
+# Puan motoru - skor girildiğinde sadece o maçın tahminleri puanlanır, fark sıralama tablosuna eklenir
+import os
+import re
+from database import execute_values
+
+# Puan ağırlıkları: tahmin tuttuğu en yüksek kademenin puanını alır.
+# Değiştirildiğinde geçmiş puanlar için: python points.py
+POINTS_EXACT_SCORE = int(os.environ.get('POINTS_EXACT_SCORE', 5))
+POINTS_GOAL_DIFFERENCE = int(os.environ.get('POINTS_GOAL_DIFFERENCE', 3))
+POINTS_OUTCOME = int(os.environ.get('POINTS_OUTCOME', 2))
+
+# Bot ve panelde bir seferde gösterilen sıra sayısı
+STANDINGS_PAGE_SIZE = int(os.environ.get('STANDINGS_PAGE_SIZE', 10))
+
+# Bir güncellemede bundan fazla kullanıcının puanı değişirse sıralar bant kaydırmak yerine baştan hesaplanır
+STANDINGS_BAND_LIMIT = int(os.environ.get('STANDINGS_BAND_LIMIT', 200))
+
+# Sıralama tablosunda sonuç kademesi başına sayaç kolonu
+SONUC_KOLONLARI = ('tam_skor', 'gol_farki', 'dogru_sonuc')
+
+_SCORE_RE = re.compile(r'^\s*(\d+)\s*[-:]\s*(\d+)\s*$')
+
+STANDINGS_SELECT = '''
+    SELECT s.sira, s.user_id, s.username, k.site_username, s.puan,
+           s.tam_skor, s.gol_farki, s.dogru_sonuc, s.mac_sayisi
+    FROM siralama s
+    LEFT JOIN kullanicilar k ON k.user_id = s.user_id
+'''
+
+
+def parse_score(skor):
+    """'2-1' -> (2, 1); okunamazsa None"""
+    match = _SCORE_RE.match(skor or '')
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def score_prediction(tahmin, gercek):
+    """Tahmini gerçek skorla karşılaştır -> (puan, sonuç)"""
+    if tahmin is None or gercek is None:
+        return 0, 'yanlis'
+    if tahmin == gercek:
+        return POINTS_EXACT_SCORE, 'tam_skor'
+    tahmin_fark = tahmin[0] - tahmin[1]
+    gercek_fark = gercek[0] - gercek[1]
+    if tahmin_fark == gercek_fark:
+        return POINTS_GOAL_DIFFERENCE, 'gol_farki'
+    if (tahmin_fark > 0) - (tahmin_fark < 0) == (gercek_fark > 0) - (gercek_fark < 0):
+        return POINTS_OUTCOME, 'dogru_sonuc'
+    return 0, 'yanlis'
+
+
+def _user_filter(user_ids):
+    """İsteğe bağlı kullanıcı süzgeci -> (sql, parametreler)"""
+    if user_ids is None:
+        return '', ()
+    return ' AND user_id = ANY(%s)', (list(user_ids),)
+
+
+def _match_points(cursor, mac_id, gercek_skor, user_ids=None):
+    """Maçın tahminlerini puanla -> {user_id: (username, puan, sonuç)}"""
+    gercek = parse_score(gercek_skor)
+    if gercek is None:
+        return {}
+
+    filtre, params = _user_filter(user_ids)
+    cursor.execute('''
+        SELECT user_id, username, skor_tahmini
+        FROM tahminler
+        WHERE mac_id = %s''' + filtre + '''
+        ORDER BY tarih, id
+    ''', (mac_id, *params))
+    puanlar = {}
+    for row in cursor.fetchall():
+        # Kullanıcının birden fazla kaydı varsa ilki sayılır (kazananlar ile aynı kural)
+        if row['user_id'] not in puanlar:
+            puan, sonuc = score_prediction(parse_score(row['skor_tahmini']), gercek)
+            puanlar[row['user_id']] = (row['username'], puan, sonuc)
+    return puanlar
+
+
+def _topla(toplamlar, user_id, username, puan, sonuc, isaret=1):
+    """Kullanıcının [username, puan, tam_skor, gol_farki, dogru_sonuc, mac_sayisi] toplamına ekle"""
+    satir = toplamlar.setdefault(user_id, [None, 0, 0, 0, 0, 0])
+    satir[0] = satir[0] or username
+    satir[1] += isaret * puan
+    if sonuc in SONUC_KOLONLARI:
+        satir[2 + SONUC_KOLONLARI.index(sonuc)] += isaret
+    satir[5] += isaret
+
+
+def update_match_points(cursor, mac_id, gercek_skor, user_ids=None):
+    """Maçın puanlarını yeniden yaz, eski/yeni farkı sıralamaya uygula -> puanlanan tahmin sayısı
+
+    gercek_skor None ise maçın puanları geri alınır. user_ids verilirse sadece o kullanıcıların
+    tahminleri yeniden puanlanır (skoru girilmiş maça tahmin eklenip silindiğinde).
+    Commit çağırana aittir.
+    """
+    # Aynı anda iki maç güncellenirse sıra hesabı sırayla yapılır; okumalar beklemez
+    cursor.execute('LOCK TABLE siralama IN SHARE ROW EXCLUSIVE MODE')
+
+    filtre, params = _user_filter(user_ids)
+    cursor.execute('SELECT user_id, puan, sonuc FROM tahmin_puanlari WHERE mac_id = %s' + filtre,
+                   (mac_id, *params))
+    eski = {row['user_id']: (None, row['puan'], row['sonuc']) for row in cursor.fetchall()}
+    yeni = _match_points(cursor, mac_id, gercek_skor, user_ids)
+
+    if eski:
+        cursor.execute('DELETE FROM tahmin_puanlari WHERE mac_id = %s' + filtre, (mac_id, *params))
+    if yeni:
+        execute_values(cursor, '''
+            INSERT INTO tahmin_puanlari (mac_id, user_id, puan, sonuc) VALUES %s
+        ''', [(mac_id, user_id, puan, sonuc) for user_id, (_, puan, sonuc) in yeni.items()])
+
+    # Kullanıcı başına fark: yeni satır eklenir, eski satır çıkarılır
+    farklar = {}
+    for puanlar, isaret in ((yeni, 1), (eski, -1)):
+        for user_id, (username, puan, sonuc) in puanlar.items():
+            _topla(farklar, user_id, username, puan, sonuc, isaret)
+    degisen = [(user_id, *satir) for user_id, satir in farklar.items() if any(satir[1:])]
+
+    if degisen:
+        degisen_ids = [satir[0] for satir in degisen]
+        cursor.execute('SELECT user_id, puan, tam_skor FROM siralama WHERE user_id = ANY(%s)',
+                       (degisen_ids,))
+        eski_anahtar = {row['user_id']: (row['puan'], row['tam_skor']) for row in cursor.fetchall()}
+
+        rows = execute_values(cursor, '''
+            INSERT INTO siralama AS s (user_id, username, puan, tam_skor, gol_farki, dogru_sonuc, mac_sayisi)
+            VALUES %s
+            ON CONFLICT (user_id) DO UPDATE SET
+                username = COALESCE(EXCLUDED.username, s.username),
+                puan = s.puan + EXCLUDED.puan,
+                tam_skor = s.tam_skor + EXCLUDED.tam_skor,
+                gol_farki = s.gol_farki + EXCLUDED.gol_farki,
+                dogru_sonuc = s.dogru_sonuc + EXCLUDED.dogru_sonuc,
+                mac_sayisi = s.mac_sayisi + EXCLUDED.mac_sayisi,
+                guncelleme = CURRENT_TIMESTAMP
+            RETURNING user_id, puan, tam_skor
+        ''', degisen, fetch=True)
+        yeni_anahtar = {row['user_id']: (row['puan'], row['tam_skor']) for row in rows}
+        cursor.execute('''
+            DELETE FROM siralama WHERE user_id = ANY(%s) AND mac_sayisi <= 0 RETURNING user_id
+        ''', (degisen_ids,))
+        for row in cursor.fetchall():
+            del yeni_anahtar[row['user_id']]
+
+        if len(degisen_ids) > STANDINGS_BAND_LIMIT:
+            rerank(cursor)
+        else:
+            shift_ranks(cursor, eski_anahtar, yeni_anahtar)
+
+    return len(yeni)
+
+
+def rerank(cursor):
+    """Sıraları puan tablosundan yeniden hesapla - sadece sırası değişen satırlar yazılır"""
+    # Eşit puanda çok tam skor bilen önde; ikisi de eşitse aynı sırayı paylaşırlar
+    cursor.execute('''
+        UPDATE siralama SET sira = r.yeni_sira
+        FROM (
+            SELECT user_id, RANK() OVER (ORDER BY puan DESC, tam_skor DESC) AS yeni_sira
+            FROM siralama
+        ) r
+        WHERE siralama.user_id = r.user_id
+          AND (siralama.sira IS NULL OR siralama.sira <> r.yeni_sira)
+    ''')
+    return cursor.rowcount
+
+
+def shift_ranks(cursor, eski, yeni):
+    """Sadece değişen kullanıcıların eski ve yeni puanı arasındaki sıraları kaydır
+
+    eski/yeni: {user_id: (puan, tam_skor)} - birinde olmayan kullanıcı sıralamaya eklenmiş ya da çıkmıştır.
+    """
+    degisen = list(set(eski) | set(yeni))
+    # Sıra = 1 + anahtarı daha büyük kullanıcı sayısı: yükselen kullanıcı [eski, yeni) bandını bir
+    # sıra aşağı iter, düşen [yeni, eski) bandını bir sıra yukarı çeker; bantların etkisi toplanır
+    for user_id in degisen:
+        once, sonra = eski.get(user_id), yeni.get(user_id)
+        if once == sonra:
+            continue
+        if sonra is None or (once is not None and sonra < once):
+            alt, ust, fark = sonra, once, -1
+        else:
+            alt, ust, fark = once, sonra, 1
+        bant, params = ' AND (puan, tam_skor) < (%s, %s)', list(ust)
+        if alt is not None:
+            bant += ' AND (puan, tam_skor) >= (%s, %s)'
+            params.extend(alt)
+        cursor.execute('UPDATE siralama SET sira = sira + %s WHERE NOT (user_id = ANY(%s))' + bant,
+                       (fark, degisen, *params))
+
+    # Değişen kullanıcıların kendi sırası yeni puanından sayılır
+    cursor.execute('''
+        UPDATE siralama SET sira = 1 + (
+            SELECT COUNT(*) FROM siralama s
+            WHERE (s.puan, s.tam_skor) > (siralama.puan, siralama.tam_skor)
+        )
+        WHERE user_id = ANY(%s)
+    ''', (list(yeni),))
+
+
+def rebuild_standings(cursor):
+    """Tüm puanları ve sıralamayı geçmişten yeniden yaz -> sıralamadaki kullanıcı sayısı
+
+    Ağırlıklar değiştiğinde veya ilk kurulumda kullanılır. Commit çağırana aittir.
+    """
+    cursor.execute('LOCK TABLE siralama IN SHARE ROW EXCLUSIVE MODE')
+    cursor.execute('DELETE FROM tahmin_puanlari')
+    cursor.execute('DELETE FROM siralama')
+
+    cursor.execute('SELECT id, gercek_skor FROM maclar WHERE gercek_skor IS NOT NULL ORDER BY id')
+    toplamlar = {}
+    for mac in cursor.fetchall():
+        puanlar = _match_points(cursor, mac['id'], mac['gercek_skor'])
+        if not puanlar:
+            continue
+        execute_values(cursor, '''
+            INSERT INTO tahmin_puanlari (mac_id, user_id, puan, sonuc) VALUES %s
+        ''', [(mac['id'], user_id, puan, sonuc) for user_id, (_, puan, sonuc) in puanlar.items()])
+        for user_id, (username, puan, sonuc) in puanlar.items():
+            _topla(toplamlar, user_id, username, puan, sonuc)
+
+    if toplamlar:
+        execute_values(cursor, '''
+            INSERT INTO siralama (user_id, username, puan, tam_skor, gol_farki, dogru_sonuc, mac_sayisi)
+            VALUES %s
+        ''', [(user_id, *satir) for user_id, satir in toplamlar.items()], page_size=1000)
+        rerank(cursor)
+    return len(toplamlar)
+
+
+def standings_page(cursor, sonra=None, limit=STANDINGS_PAGE_SIZE):
+    """Sıralama sayfası (sira, user_id) index'inden okunur - sonra: önceki sayfanın son satırı"""
+    if sonra is not None:
+        cursor.execute(STANDINGS_SELECT + '''
+            WHERE (s.sira, s.user_id) > (%s, %s)
+            ORDER BY s.sira, s.user_id
+            LIMIT %s
+        ''', (*sonra, limit))
+    else:
+        cursor.execute(STANDINGS_SELECT + ' ORDER BY s.sira, s.user_id LIMIT %s', (limit,))
+    return cursor.fetchall()
+
+
+def user_standing(cursor, user_id):
+    """Kullanıcının sıralama satırı (puanlanmış tahmini yoksa None)"""
+    cursor.execute(STANDINGS_SELECT + ' WHERE s.user_id = %s', (user_id,))
+    return cursor.fetchone()
+
+
+if __name__ == '__main__':
+    # Ağırlıklar değiştiğinde elle çalıştırılır: python points.py
+    from database import get_db_connection
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        sayi = rebuild_standings(cursor)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    print(f"✅ Sıralama yeniden hesaplandı ({sayi} kullanıcı)")
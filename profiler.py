@@ -0,0 +1,129 @@
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import time
+import psycopg2
+from database import get_db_connection, track_queries, untrack_queries
+
+# Saklanan en fazla profil sayısı (eskiler silinir)
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 200))
+
+# Çağrı ağacında gösterilecek en küçük pay ve derinlik
+CALL_TREE_MIN_FRACTION = 0.01
+CALL_TREE_MAX_DEPTH = 25
+
+
+class RequestProfile:
+    """Tek isteği cProfile ile ölç; DB ve şablon süresini ayrıca topla"""
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.sablon_sure = 0.0
+        self._sablon_baslangic = None
+        self._db = None
+        self._start = None
+
+    def start(self):
+        # Başka bir profiler aktifse ValueError - çağıran isteği profilsiz sürdürür
+        self.profiler.enable()
+        self._db = track_queries()
+        self._start = time.perf_counter()
+
+    def template_started(self):
+        self._sablon_baslangic = time.perf_counter()
+
+    def template_finished(self):
+        if self._sablon_baslangic is not None:
+            self.sablon_sure += time.perf_counter() - self._sablon_baslangic
+            self._sablon_baslangic = None
+
+    def stop(self):
+        """Profili bitir -> süre dağılımı (ms) ve pstats verisi"""
+        toplam = time.perf_counter() - self._start
+        self.profiler.disable()
+        untrack_queries()
+        self.profiler.create_stats()
+
+        db = self._db['sure']
+        return {
+            'toplam_ms': toplam * 1000,
+            'db_ms': db * 1000,
+            'db_sorgu': self._db['sorgu'],
+            'sablon_ms': self.sablon_sure * 1000,
+            # Şablon render'ı sırasında yapılan sorgular hem DB hem şablon süresine girer
+            'python_ms': max(toplam - db - self.sablon_sure, 0.0) * 1000,
+            'stats': self.profiler.stats,
+        }
+
+
+def _func_label(func):
+    filename, line, name = func
+    if filename == '~':
+        return name
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+def call_tree(stats, min_fraction=CALL_TREE_MIN_FRACTION, max_depth=CALL_TREE_MAX_DEPTH):
+    """pstats verisinden kümülatif süreli çağrı ağacı (metin)"""
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, (_, nc, _, ct) in callers.items():
+            callees.setdefault(caller, []).append((ct, nc, func))
+
+    roots = [func for func, (_, _, _, _, callers) in stats.items() if not callers]
+    total = sum(stats[func][3] for func in roots) or 1.0
+    lines = []
+
+    def walk(func, ct, nc, depth, path):
+        if ct / total < min_fraction or depth > max_depth:
+            return
+        lines.append(f"{ct * 1000:>10.1f} ms {ct / total:>6.1%} {nc:>7}x  {'  ' * depth}{_func_label(func)}")
+        if func in path:
+            return
+        for child_ct, child_nc, child in sorted(callees.get(func, ()), key=lambda c: c[0], reverse=True):
+            walk(child, child_ct, child_nc, depth + 1, path | {func})
+
+    for func in sorted(roots, key=lambda f: stats[f][3], reverse=True):
+        walk(func, stats[func][3], stats[func][1], 0, frozenset())
+    return '\n'.join(lines)
+
+
+def stats_text(stats, sort='cumulative', limit=60):
+    """pstats'in klasik tablo çıktısı"""
+    buffer = io.StringIO()
+    result = pstats.Stats(stream=buffer)
+    result.stats = stats
+    result.get_top_level_stats()
+    result.strip_dirs().sort_stats(sort).print_stats(limit)
+    return buffer.getvalue()
+
+
+def save_profile(rota, yol, yapan, durum, sonuc):
+    """Profili kaydet -> id (son PROFILE_KEEP kayıt tutulur)"""
+    stats = sonuc['stats']
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            INSERT INTO profiller
+                (rota, yol, yapan, durum, toplam_ms, db_ms, db_sorgu, sablon_ms, python_ms,
+                 agac, tablo, ham)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            RETURNING id
+        ''', (rota, yol, yapan, durum, sonuc['toplam_ms'], sonuc['db_ms'], sonuc['db_sorgu'],
+              sonuc['sablon_ms'], sonuc['python_ms'], call_tree(stats), stats_text(stats),
+              psycopg2.Binary(marshal.dumps(stats))))
+        profil_id = cursor.fetchone()['id']
+        cursor.execute('''
+            DELETE FROM profiller
+            WHERE id <= (SELECT id FROM profiller ORDER BY id DESC LIMIT 1 OFFSET %s)
+        ''', (PROFILE_KEEP,))
+        conn.commit()
+        return profil_id
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
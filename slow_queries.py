@@ -0,0 +1,287 @@
+import argparse
+import hashlib
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+import psycopg2.extensions
+import psycopg2.extras
+from database import execute_values, get_db_connection, is_sqlite, set_slow_query_listener
+
+# Bu süreyi (ms) aşan sorgular için EXPLAIN (ANALYZE, BUFFERS) alınır
+SLOW_QUERY_EXPLAIN_MS = float(os.environ.get('SLOW_QUERY_EXPLAIN_MS', 1000))
+
+# Aynı sorgunun planı en fazla bu aralıkla (saniye) yenilenir
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.environ.get('SLOW_QUERY_EXPLAIN_INTERVAL', 600))
+
+# EXPLAIN ANALYZE sorguyu gerçekten çalıştırır - üst sınır
+SLOW_QUERY_EXPLAIN_TIMEOUT = os.environ.get('SLOW_QUERY_EXPLAIN_TIMEOUT', '30s')
+
+# Tabloda tutulan en pahalı (toplam süre) sorgu sayısı ve saklama süresi
+SLOW_QUERY_TOP_N = int(os.environ.get('SLOW_QUERY_TOP_N', 100))
+SLOW_QUERY_RETENTION_DAYS = int(os.environ.get('SLOW_QUERY_RETENTION_DAYS', 7))
+
+# Kayıtlar arka planda bu aralıkla (saniye) veritabanına yazılır
+SLOW_QUERY_FLUSH_INTERVAL = float(os.environ.get('SLOW_QUERY_FLUSH_INTERVAL', 10))
+
+# Sorgu thread'leri hiç beklemez; kuyruk doluysa kayıt atlanır
+SLOW_QUERY_QUEUE_SIZE = 1000
+EXAMPLE_MAX_LENGTH = 20000
+
+_COMMENT_RE = re.compile(r'--[^\n]*|/\*.*?\*/', re.DOTALL)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_PARAM_RE = re.compile(r'%\(\w+\)s|%s')
+_NUMBER_RE = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_VALUES_RE = re.compile(r'(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+')
+_ARRAY_RE = re.compile(r'ARRAY\[[^\]]*\]', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+_UNSAFE_RE = re.compile(
+    r'\b(insert|update|delete|truncate|for\s+update|for\s+share|nextval|setval|pg_notify|'
+    r'pg_advisory\w*|pg_try_advisory\w*|pg_sleep)\b',
+    re.IGNORECASE
+)
+
+
+def normalize_query(sql):
+    """Sabitleri ve parametreleri '?' yap, listeleri daralt - aynı şekildeki sorgular aynı metne iner"""
+    sql = _COMMENT_RE.sub(' ', sql)
+    sql = _STRING_RE.sub('?', sql)
+    sql = _PARAM_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _ARRAY_RE.sub('ARRAY[?]', sql)
+    sql = _VALUES_RE.sub(r'\1', sql)
+    sql = _LIST_RE.sub('(?)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.md5(normalized.lower().encode('utf-8')).hexdigest()
+
+
+def is_read_only(sql):
+    """EXPLAIN ANALYZE ile güvenle çalıştırılabilir mi (veri/kilit/yan etki yok)"""
+    first = sql.lstrip().split(None, 1)[0].lower() if sql.strip() else ''
+    return first in ('select', 'with') and not _UNSAFE_RE.search(sql)
+
+
+class SlowQueryRecorder:
+    """Yavaş sorguları toplayıp arka planda yavas_sorgular tablosuna yazan ve EXPLAIN alan thread"""
+
+    def __init__(self, kaynak, flush_interval=SLOW_QUERY_FLUSH_INTERVAL):
+        self.kaynak = kaynak
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=SLOW_QUERY_QUEUE_SIZE)
+        self._explained = {}  # parmak izi -> son EXPLAIN (monotonic)
+        self._thread = None
+        self._stop = threading.Event()
+
+    def record(self, cursor, query, vars, seconds):
+        """Sorgu thread'inde çağrılır - sadece örneği hazırlayıp kuyruğa koyar"""
+        if isinstance(query, bytes):
+            query = query.decode('utf-8', 'replace')
+        if vars is not None:
+            ornek = cursor.mogrify(query, vars).decode('utf-8', 'replace')
+        else:
+            ornek = query
+        # executemany şablonunda parametreler yok - EXPLAIN edilemez
+        explainable = (vars is not None or not _PARAM_RE.search(query)) and len(ornek) <= EXAMPLE_MAX_LENGTH
+        try:
+            self._queue.put_nowait((query, ornek, explainable, seconds * 1000, datetime.now()))
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='slow-queries', daemon=True)
+        self._thread.start()
+        set_slow_query_listener(self.record)
+
+    def stop(self):
+        set_slow_query_listener(None)
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._stop.wait(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Yavaş sorgu kaydı yazılamadı: {e}")
+
+    def _drain(self):
+        """Kuyruktaki kayıtları parmak izine göre topla"""
+        pending = {}
+        while True:
+            try:
+                query, ornek, explainable, ms, zaman = self._queue.get_nowait()
+            except queue.Empty:
+                return pending
+            sorgu = normalize_query(query)
+            key = fingerprint(sorgu)
+            item = pending.get(key)
+            if item is None:
+                item = pending[key] = {
+                    'sorgu': sorgu, 'islem': sorgu.split(' ', 1)[0].lower()[:20],
+                    'sayi': 0, 'toplam_ms': 0.0, 'en_uzun_ms': 0.0,
+                    'ilk': zaman, 'son': zaman, 'ornek': ornek, 'explainable': explainable,
+                }
+            item['sayi'] += 1
+            item['toplam_ms'] += ms
+            item['son'] = zaman
+            if ms >= item['en_uzun_ms']:
+                # En yavaş örnek saklanır, EXPLAIN onunla alınır
+                item['en_uzun_ms'] = ms
+                item['ornek'] = ornek
+                item['explainable'] = explainable
+
+    def flush(self):
+        pending = self._drain()
+        if not pending:
+            return
+
+        conn = get_db_connection()
+        try:
+            # Kendi sorguları ölçülmesin diye düz cursor (TimedCursor değil)
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            execute_values(cursor, '''
+                INSERT INTO yavas_sorgular AS y
+                    (parmak_izi, sorgu, ornek, islem, kaynak, sayi, toplam_ms, en_uzun_ms, ilk_gorulme, son_gorulme)
+                VALUES %s
+                ON CONFLICT (parmak_izi) DO UPDATE SET
+                    sayi = y.sayi + EXCLUDED.sayi,
+                    toplam_ms = y.toplam_ms + EXCLUDED.toplam_ms,
+                    ornek = CASE WHEN EXCLUDED.en_uzun_ms >= y.en_uzun_ms THEN EXCLUDED.ornek ELSE y.ornek END,
+                    en_uzun_ms = GREATEST(y.en_uzun_ms, EXCLUDED.en_uzun_ms),
+                    kaynak = EXCLUDED.kaynak,
+                    son_gorulme = EXCLUDED.son_gorulme
+            ''', [
+                (key, item['sorgu'], item['ornek'][:EXAMPLE_MAX_LENGTH], item['islem'], self.kaynak,
+                 item['sayi'], item['toplam_ms'], item['en_uzun_ms'], item['ilk'], item['son'])
+                for key, item in pending.items()
+            ])
+
+            # Sadece toplam süresi en yüksek N sorgu ve son günlerin kayıtları kalır
+            cursor.execute('''
+                DELETE FROM yavas_sorgular
+                WHERE son_gorulme < %s
+                   OR parmak_izi NOT IN (
+                       SELECT parmak_izi FROM yavas_sorgular ORDER BY toplam_ms DESC LIMIT %s
+                   )
+            ''', (datetime.now() - timedelta(days=SLOW_QUERY_RETENTION_DAYS), SLOW_QUERY_TOP_N))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        now = time.monotonic()
+        for key, item in pending.items():
+            if item['en_uzun_ms'] < SLOW_QUERY_EXPLAIN_MS or not item['explainable']:
+                continue
+            if now - self._explained.get(key, -SLOW_QUERY_EXPLAIN_INTERVAL) < SLOW_QUERY_EXPLAIN_INTERVAL:
+                continue
+            self._explained[key] = now
+            self.save_plan(key, item['ornek'])
+
+        # Süresi dolan EXPLAIN zamanları unutulur
+        self._explained = {k: t for k, t in self._explained.items() if now - t < SLOW_QUERY_EXPLAIN_INTERVAL}
+
+    def save_plan(self, key, ornek):
+        """Örnek sorgunun planını al ve kaydet (hata da plan yerine yazılır)"""
+        # SQLite'da ANALYZE karşılığı yok - sadece sorgu planı
+        analyze = is_read_only(ornek) and not is_sqlite()
+        try:
+            plan, plan_ms = explain_statement(ornek, analyze)
+        except Exception as e:
+            plan, plan_ms = f"EXPLAIN alınamadı: {e}", None
+
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            cursor.execute('''
+                UPDATE yavas_sorgular
+                SET plan = %s, plan_analiz = %s, plan_ms = %s, plan_tarihi = CURRENT_TIMESTAMP
+                WHERE parmak_izi = %s
+            ''', (plan, analyze, plan_ms, key))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def explain_statement(sql, analyze):
+    """EXPLAIN (ANALYZE, BUFFERS) - sadece okuma sorgularında; diğerlerinde çalıştırmadan EXPLAIN"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+        if is_sqlite():
+            start = time.perf_counter()
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = '\n'.join(row[3] for row in cursor.fetchall())
+            return plan, (time.perf_counter() - start) * 1000
+
+        cursor.execute('SET LOCAL statement_timeout = %s', (SLOW_QUERY_EXPLAIN_TIMEOUT,))
+        options = '(ANALYZE, BUFFERS)' if analyze else ''
+        start = time.perf_counter()
+        # Örnek zaten parametreleri gömülü metin - ikinci kez biçimlendirilmez
+        cursor.execute(f'EXPLAIN {options} {sql}')
+        plan = '\n'.join(row[0] for row in cursor.fetchall())
+        return plan, (time.perf_counter() - start) * 1000
+    finally:
+        # ANALYZE sorguyu çalıştırdı; hiçbir etkisi kalmasın
+        conn.rollback()
+        conn.close()
+
+
+SIRALAMALAR = {
+    'toplam': 'toplam_ms DESC',
+    'en_uzun': 'en_uzun_ms DESC',
+    'ortalama': 'toplam_ms / GREATEST(sayi, 1) DESC',
+    'son': 'son_gorulme DESC',
+}
+
+
+def list_slow_queries(cursor, siralama='toplam', limit=SLOW_QUERY_TOP_N):
+    """Panel/CLI için kayıtlar (en pahalı önce)"""
+    order_sql = SIRALAMALAR.get(siralama, SIRALAMALAR['toplam'])
+    cursor.execute(f'''
+        SELECT parmak_izi, sorgu, ornek, islem, kaynak, sayi, toplam_ms, en_uzun_ms,
+               toplam_ms / GREATEST(sayi, 1) as ortalama_ms,
+               ilk_gorulme, son_gorulme, plan, plan_analiz, plan_ms, plan_tarihi
+        FROM yavas_sorgular
+        ORDER BY {order_sql}
+        LIMIT %s
+    ''', (limit,))
+    return cursor.fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Yavaş sorgu kayıtları')
+    parser.add_argument('--sirala', choices=tuple(SIRALAMALAR), default='toplam')
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--plan', action='store_true', help='Kayıtlı EXPLAIN çıktılarını da yaz')
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        for row in list_slow_queries(cursor, args.sirala, args.limit):
+            print(f"{row['parmak_izi'][:12]}  {row['sayi']:>7}x  toplam {row['toplam_ms']:>10.0f} ms  "
+                  f"ort {row['ortalama_ms']:>8.1f} ms  max {row['en_uzun_ms']:>8.1f} ms  {row['kaynak'] or ''}")
+            print(f"    {row['sorgu'][:200]}")
+            if args.plan and row['plan']:
+                print('    ' + row['plan'].replace('\n', '\n    '))
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,549 @@
+import functools
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import date, datetime, timezone
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+from database import ConnectionPool, DB_POOL_TIMEOUT, TimedCursor, get_db_connection, observe_query, query_labels
+
+try:
+    import fcntl
+except ImportError:  # Windows - süreçler arası kilit yok
+    fcntl = None
+
+# Gömülü veritabanı ayarları (environment üzerinden değiştirilebilir)
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+SQLITE_CACHE_MB = int(os.environ.get('SQLITE_CACHE_MB', 16))
+SQLITE_MMAP_MB = int(os.environ.get('SQLITE_MMAP_MB', 256))
+
+# Her bağlantıda uygulanır - WAL: okuyucular yazarı, yazar okuyucuları beklemez
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', SQLITE_SYNCHRONOUS),
+    ('busy_timeout', SQLITE_BUSY_TIMEOUT_MS),
+    ('foreign_keys', 'ON'),
+    ('temp_store', 'MEMORY'),
+    ('cache_size', -SQLITE_CACHE_MB * 1024),
+    ('mmap_size', SQLITE_MMAP_MB * 1024 * 1024),
+)
+
+# Süreçteki tüm yazmalar sırayla - SQLite aynı anda tek yazara izin verir,
+# kilitte beklemek busy_timeout döngüsünde beklemekten ucuzdur
+_writer_lock = threading.Lock()
+
+Column = namedtuple('Column', 'name type_code display_size internal_size precision scale null_ok')
+
+
+def _timestamp(value):
+    try:
+        return datetime.fromisoformat(value.decode())
+    except ValueError:
+        return value.decode()
+
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter('TIMESTAMP', _timestamp)
+sqlite3.register_converter('DATETIME', _timestamp)
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter('BOOLEAN', lambda value: bool(int(value)))
+
+
+def _greatest(*values):
+    values = [v for v in values if v is not None]
+    return max(values) if values else None
+
+
+def _least(*values):
+    values = [v for v in values if v is not None]
+    return min(values) if values else None
+
+
+def _now():
+    # CURRENT_TIMESTAMP ile aynı saat dilimi (UTC) ve biçim
+    return datetime.now(timezone.utc).replace(tzinfo=None).isoformat(' ')
+
+
+def _md5(value):
+    return None if value is None else hashlib.md5(str(value).encode('utf-8')).hexdigest()
+
+
+# PostgreSQL lower() karakter karakter küçültür: 'İ' -> 'i' (Python'un lower()'ı 'i̇' iki karakter verir)
+_ILIKE_FOLD = {0x130: 'i'}
+
+
+def _ilike_fold(value):
+    return str(value).translate(_ILIKE_FOLD).lower()
+
+
+@functools.lru_cache(maxsize=256)
+def _like_regex(pattern):
+    """LIKE kalıbı -> regex (% ve _ joker, ters bölü kaçış karakteri - PostgreSQL varsayılanı)"""
+    parts = []
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\' and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        parts.append('.*' if ch == '%' else '.' if ch == '_' else re.escape(ch))
+        i += 1
+    return re.compile(''.join(parts), re.DOTALL)
+
+
+def _ilike(value, pattern):
+    """PostgreSQL ILIKE karşılığı - Türkçe harfler dahil büyük/küçük harf duyarsız"""
+    if value is None or pattern is None:
+        return None
+    return _like_regex(_ilike_fold(pattern)).fullmatch(_ilike_fold(value)) is not None
+
+
+_PLACEHOLDER_RE = re.compile(r'%\((\w+)\)s|%s|%%')
+# Parametre ya da mogrify ile gömülmüş JSON metni (yavaş sorgu EXPLAIN'i)
+_ANY_RE = re.compile(r"=\s*ANY\s*\(\s*(%\(\w+\)s|%s|'(?:[^']|'')*')\s*\)", re.IGNORECASE)
+# sol taraf kolon, sağ taraf parametre ya da mogrify ile gömülmüş metin
+_ILIKE_RE = re.compile(r"([\w.]+)\s+(NOT\s+)?ILIKE\s+(%\(\w+\)s|%s|'(?:[^']|'')*')", re.IGNORECASE)
+_ILIKE_LEFTOVER_RE = re.compile(r'\bILIKE\b(?!\()', re.IGNORECASE)
+_FOR_UPDATE_RE = re.compile(r'\s+FOR\s+(?:UPDATE|SHARE)(?:\s+NOWAIT|\s+SKIP\s+LOCKED)?\b', re.IGNORECASE)
+_CONSTRAINT_RE = re.compile(r'\bON\s+CONFLICT\s+ON\s+CONSTRAINT\s+(\w+)', re.IGNORECASE)
+_WRITE_VERBS = {'insert', 'update', 'delete', 'replace', 'create', 'drop', 'alter'}
+
+
+@functools.lru_cache(maxsize=1024)
+def translate_query(query, has_params):
+    """PostgreSQL sorgusu -> (SQLite sorgusu, tür) - tür: 'read', 'write', 'lock' veya 'noop'"""
+    first = query.lstrip().split(None, 1)[0].lower() if query.strip() else ''
+    if first == 'set':
+        # SET LOCAL statement_timeout/lock_timeout vb. - karşılığı yok
+        return None, 'noop'
+    if first == 'lock':
+        # LOCK TABLE: yazma transaction'ı başlatmak aynı etkiyi verir (yazarlar bekler)
+        return None, 'lock'
+
+    kind = 'write' if first in _WRITE_VERBS or query_labels(query)[0] in _WRITE_VERBS else 'read'
+    sql, locking = _FOR_UPDATE_RE.subn('', query)
+    if locking:
+        kind = 'write'
+
+    # = ANY(liste) -> IN (json_each(...)); liste parametresi JSON olarak bağlanır
+    sql = _ANY_RE.sub(r'IN (SELECT value FROM json_each(\1))', sql)
+    # ILIKE -> ilike(kolon, kalıp): SQLite LIKE'ı ASCII dışı harflerde büyük/küçük harfe duyarlı
+    sql = _ILIKE_RE.sub(lambda m: f"{'NOT ' if m.group(2) else ''}ilike({m.group(1)}, {m.group(3)})", sql)
+    if _ILIKE_LEFTOVER_RE.search(sql):
+        raise psycopg2.NotSupportedError('SQLite: ILIKE sadece "kolon ILIKE değer" biçiminde destekleniyor')
+    if has_params:
+        sql = _PLACEHOLDER_RE.sub(
+            lambda m: f':{m.group(1)}' if m.group(1) else ('?' if m.group(0) == '%s' else '%'), sql
+        )
+    return sql, kind
+
+
+def _adapt(value):
+    if isinstance(value, (list, tuple)):
+        return json.dumps(list(value), default=str)
+    if isinstance(value, psycopg2.extensions.Binary):
+        return bytes(value.adapted)
+    if isinstance(value, dict):
+        return json.dumps(value, default=str)
+    return value
+
+
+def _adapt_params(vars):
+    if vars is None:
+        return ()
+    if isinstance(vars, dict):
+        return {key: _adapt(value) for key, value in vars.items()}
+    return [_adapt(value) for value in vars]
+
+
+def _literal(value):
+    """mogrify için SQL sabiti"""
+    value = _adapt(value)
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, bytes):
+        return f"X'{value.hex()}'"
+    if isinstance(value, (datetime, date)):
+        value = value.isoformat(' ') if isinstance(value, datetime) else value.isoformat()
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _map_error(e):
+    """sqlite3 hatasını psycopg2 karşılığına çevir - çağıranlar tek tür hata yakalar"""
+    if isinstance(e, sqlite3.IntegrityError):
+        return psycopg2.IntegrityError(str(e))
+    if isinstance(e, sqlite3.OperationalError):
+        return psycopg2.OperationalError(str(e))
+    if isinstance(e, sqlite3.ProgrammingError):
+        return psycopg2.ProgrammingError(str(e))
+    return psycopg2.DatabaseError(str(e))
+
+
+class SQLiteCursor:
+    """psycopg2 cursor arayüzü (RealDictCursor/TimedCursor davranışı) - sorguları SQLite'a çevirir"""
+
+    def __init__(self, connection, name=None, dict_rows=True, timed=True):
+        self.connection = connection
+        # SQLite'da sunucu tarafı cursor yok; fetchmany zaten satır satır ilerler
+        self.name = None
+        self.itersize = 2000
+        self.arraysize = 1
+        self._dict_rows = dict_rows
+        self._timed = timed
+        self._cursor = None
+        self._names = None
+        self.description = None
+        self.rowcount = -1
+        self.closed = False
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            self._execute(query, vars)
+        finally:
+            if self._timed:
+                observe_query(self, query, vars, start)
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        try:
+            sql, kind = self.connection._prepare(query, True)
+            if kind != 'read':
+                self.connection._begin_write()
+            try:
+                self._set_cursor(self.connection._db.executemany(sql, [_adapt_params(v) for v in vars_list]))
+            except sqlite3.Error as e:
+                raise _map_error(e) from e
+        finally:
+            if self._timed:
+                observe_query(self, query, None, start)
+
+    def _execute(self, query, vars):
+        if isinstance(query, bytes):
+            query = query.decode('utf-8')
+        sql, kind = self.connection._prepare(query, vars is not None)
+        if kind in ('write', 'lock'):
+            self.connection._begin_write()
+        if sql is None:
+            self._set_cursor(None)
+            return
+
+        if kind == 'write' and self.connection.autocommit:
+            # autocommit'te yazmalar tek tek kilit alır
+            with self.connection._write_lock():
+                self._run(sql, vars)
+        else:
+            self._run(sql, vars)
+
+    def _run(self, sql, vars):
+        try:
+            self._set_cursor(self.connection._db.execute(sql, _adapt_params(vars)))
+        except sqlite3.Error as e:
+            raise _map_error(e) from e
+
+    def _set_cursor(self, cursor):
+        self._cursor = cursor
+        if cursor is None or cursor.description is None:
+            self.description = None
+            self._names = None
+        else:
+            self._names = [d[0] for d in cursor.description]
+            self.description = [Column(name, None, None, None, None, None, None) for name in self._names]
+        self.rowcount = cursor.rowcount if cursor is not None else -1
+
+    def _row(self, row):
+        return dict(zip(self._names, row)) if self._dict_rows else row
+
+    def fetchone(self):
+        if self._cursor is None:
+            return None
+        row = self._cursor.fetchone()
+        return None if row is None else self._row(row)
+
+    def fetchmany(self, size=None):
+        if self._cursor is None:
+            return []
+        return [self._row(row) for row in self._cursor.fetchmany(size or self.arraysize)]
+
+    def fetchall(self):
+        if self._cursor is None:
+            return []
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        while True:
+            rows = self.fetchmany(self.itersize)
+            if not rows:
+                return
+            yield from rows
+
+    def mogrify(self, query, vars=None):
+        """Parametreleri gömülü sorgu metni (yavaş sorgu örnekleri için)"""
+        if vars is None:
+            return query.encode('utf-8')
+        if isinstance(vars, dict):
+            text = _PLACEHOLDER_RE.sub(
+                lambda m: _literal(vars[m.group(1)]) if m.group(1) else m.group(0), query
+            )
+        else:
+            values = iter(vars)
+            text = _PLACEHOLDER_RE.sub(
+                lambda m: _literal(next(values)) if m.group(0) == '%s' else m.group(0), query
+            )
+        return text.replace('%%', '%').encode('utf-8')
+
+    def copy_expert(self, sql, file, size=8192):
+        raise psycopg2.NotSupportedError("COPY SQLite'da desteklenmiyor")
+
+    def close(self):
+        self._cursor = None
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class SQLiteConnection:
+    """psycopg2 bağlantı arayüzü - okumalar transaction'sız, ilk yazma BEGIN IMMEDIATE ile başlar"""
+
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False,
+            detect_types=sqlite3.PARSE_DECLTYPES, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000
+        )
+        for pragma, value in SQLITE_PRAGMAS:
+            self._db.execute(f'PRAGMA {pragma} = {value}')
+        self._db.create_function('now', 0, _now)
+        self._db.create_function('greatest', -1, _greatest, deterministic=True)
+        self._db.create_function('least', -1, _least, deterministic=True)
+        self._db.create_function('md5', 1, _md5, deterministic=True)
+        self._db.create_function('ilike', 2, _ilike, deterministic=True)
+        self._constraints = {}
+        self._writing = False
+        self.autocommit = False
+        self.closed = 0
+
+    def cursor(self, name=None, cursor_factory=None):
+        if cursor_factory is None or issubclass(cursor_factory, TimedCursor):
+            return SQLiteCursor(self, name)
+        # Düz cursor ölçülmez; RealDictCursor dışındakiler tuple satır döndürür
+        return SQLiteCursor(self, name, issubclass(cursor_factory, psycopg2.extras.RealDictCursor), False)
+
+    def _prepare(self, query, has_params):
+        sql, kind = translate_query(query, has_params)
+        if sql is not None and 'CONSTRAINT' in sql.upper():
+            sql = _CONSTRAINT_RE.sub(lambda m: f'ON CONFLICT {self._constraint_columns(m.group(1))}', sql)
+        return sql, kind
+
+    def _constraint_columns(self, name):
+        """ON CONFLICT ON CONSTRAINT ad -> ON CONFLICT (kolonlar) (SQLite'da unique index adı)"""
+        columns = self._constraints.get(name)
+        if columns is None:
+            rows = self._db.execute('SELECT name FROM pragma_index_info(?) ORDER BY seqno', (name,)).fetchall()
+            if not rows:
+                raise psycopg2.ProgrammingError(f'constraint "{name}" does not exist')
+            columns = self._constraints[name] = '(' + ', '.join(row[0] for row in rows) + ')'
+        return columns
+
+    def _write_lock(self):
+        if not _writer_lock.acquire(timeout=DB_POOL_TIMEOUT):
+            raise psycopg2.OperationalError(f"{DB_POOL_TIMEOUT:g} saniye içinde yazma kilidi alınamadı")
+        return _ReleaseOnExit()
+
+    def _begin_write(self):
+        """Yazma transaction'ını başlat (transaction sonuna kadar süreçteki tek yazar bu bağlantı)"""
+        if self._writing or self.autocommit:
+            return
+        self._write_lock()
+        try:
+            self._db.execute('BEGIN IMMEDIATE')
+        except sqlite3.Error as e:
+            _writer_lock.release()
+            raise _map_error(e) from e
+        self._writing = True
+
+    def _end(self, statement):
+        if not self._writing:
+            return
+        try:
+            self._db.execute(statement)
+        except sqlite3.Error as e:
+            raise _map_error(e) from e
+        finally:
+            self._writing = False
+            _writer_lock.release()
+
+    def commit(self):
+        self._end('COMMIT')
+
+    def rollback(self):
+        self._end('ROLLBACK')
+
+    def get_transaction_status(self):
+        if self._writing:
+            return psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        return psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self.rollback()
+        finally:
+            self._db.close()
+            self.closed = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+
+class _ReleaseOnExit:
+    """_write_lock() ile alınan kilidi with bloğu sonunda bırakır (with kullanılmazsa açık kalır)"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _writer_lock.release()
+
+
+class SQLitePool(ConnectionPool):
+    """Aynı havuz mantığı - bağlantılar psycopg2 yerine SQLiteConnection"""
+
+    def _connect(self):
+        conn = SQLiteConnection(self.dsn)
+        self._created[id(conn)] = time.monotonic()
+        return conn
+
+
+def sqlite_path(url):
+    """sqlite:///goreli.db veya sqlite:////mutlak/yol.db -> dosya yolu"""
+    path = url[len('sqlite://'):] if url.startswith('sqlite://') else url[len('sqlite:'):]
+    if path.startswith('/'):
+        path = path[1:]
+    if not path or path == ':memory:':
+        raise ValueError("SQLite için dosya yolu gerekli (ör. sqlite:///tahminler.db)")
+    return path
+
+
+class SQLiteBackend:
+    """Gömülü SQLite (WAL, tek yazar / çok okuyucu) - tek sunuculu kurulumlar ve testler için"""
+    name = 'sqlite'
+
+    def __init__(self, url):
+        self.url = url
+        self.path = sqlite_path(url)
+        self._locks = {}
+
+    def create_pool(self):
+        return SQLitePool(self.path)
+
+    def execute_values(self, cursor, sql, argslist, template=None, page_size=100, fetch=False):
+        """psycopg2.extras.execute_values karşılığı: VALUES %s çok satırlı (?, ...) listesine açılır"""
+        argslist = list(argslist)
+        if not argslist:
+            return [] if fetch else None
+        if template is None:
+            template = '(' + ', '.join(['%s'] * len(argslist[0])) + ')'
+        # SQLite tek sorguda en fazla 32766 parametre alır
+        page_size = max(1, min(page_size, 32000 // max(template.count('%s'), 1)))
+        before, after = sql.split('%s', 1)
+
+        results = []
+        for i in range(0, len(argslist), page_size):
+            page = argslist[i:i + page_size]
+            cursor.execute(
+                before + ', '.join([template] * len(page)) + after,
+                [value for row in page for value in row]
+            )
+            if fetch:
+                results.extend(cursor.fetchall())
+        return results if fetch else None
+
+    def notify(self, cursor, channel, payload):
+        # LISTEN yok; dinleyiciler bildirimler tablosundaki sürümü yoklar (commit ile görünür)
+        cursor.execute('''
+            INSERT INTO bildirimler (kanal, surum, son_veri) VALUES (%s, 1, %s)
+            ON CONFLICT (kanal) DO UPDATE SET surum = surum + 1, son_veri = EXCLUDED.son_veri
+        ''', (channel, payload))
+
+    def try_lock(self, cursor, lock_id):
+        # Dosya kilidi yazar kilidini almaz; kilit tutulurken okumalar ve yazmalar sürer
+        if fcntl is None:
+            return True
+        handle = open(f'{self.path}.{lock_id}.lock', 'w')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            handle.close()
+            return False
+        self._locks[lock_id] = handle
+        return True
+
+    def lock(self, cursor, lock_id):
+        """Süreçler arası kilit (dosya kilidi) - migration gibi tek seferlik işler için"""
+        if fcntl is None:
+            return
+        handle = open(f'{self.path}.{lock_id}.lock', 'w')
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        self._locks[lock_id] = handle
+
+    def unlock(self, cursor, lock_id):
+        handle = self._locks.pop(lock_id, None)
+        if handle is not None:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
+
+    def table_exists(self, cursor, table):
+        cursor.execute("SELECT COUNT(*) AS sayi FROM sqlite_master WHERE type = 'table' AND name = %s", (table,))
+        return cursor.fetchone()['sayi'] > 0
+
+
+def wait_for_notify(channels, since, timeout, stop, interval=1.0):
+    """Kanallardan birinin sürümü since'tekinden farklı olana kadar yokla -> {kanal: (surum, son_veri)}
+
+    since None ise ilk okuma hemen döner; zaman aşımında son okunan durum döner.
+    """
+    deadline = time.monotonic() + timeout
+    durum = since
+    while not stop.is_set():
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            cursor.execute('SELECT kanal, surum, son_veri FROM bildirimler WHERE kanal = ANY(%s)',
+                           (list(channels),))
+            rows = cursor.fetchall()
+        finally:
+            conn.close()
+        durum = dict.fromkeys(channels, (0, None))
+        durum.update({row['kanal']: (row['surum'], row['son_veri']) for row in rows})
+        if since is None or any(durum[kanal][0] != since[kanal][0] for kanal in channels):
+            return durum
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return durum
+        stop.wait(min(interval, remaining))
+    return durum
@@ -0,0 +1,173 @@
+import logging
+import os
+import threading
+from database import advisory_unlock, execute_values, get_db_connection, try_advisory_lock
+
+# Sayaçların tam sayımla düzeltilme aralığı (saniye)
+STATS_RECONCILE_INTERVAL = float(os.environ.get('STATS_RECONCILE_INTERVAL', 3600))
+
+# Aynı anda tek uzlaştırma (bot birden fazla kopya çalışsa bile)
+STATS_LOCK_ID = 72061002
+
+COUNTER_KEYS = ('aktif_maclar', 'toplam_tahminler', 'toplam_kullanicilar', 'toplam_kazananlar')
+
+EXACT_STATS_QUERY = '''
+    SELECT
+        (SELECT COUNT(*) FROM maclar WHERE durum = 'aktif') as aktif_maclar,
+        (SELECT COUNT(*) FROM tahminler) as toplam_tahminler,
+        (SELECT COUNT(DISTINCT user_id) FROM tahminler) as toplam_kullanicilar,
+        (SELECT COUNT(*) FROM kazananlar) as toplam_kazananlar
+'''
+
+# Tam sayım ile sayaç toplamı tek ifadede okunur; ikisi de aynı snapshot'tan gelir
+DRIFT_QUERY = '''
+    SELECT e.anahtar, e.deger - COALESCE(SUM(s.deger), 0) as fark
+    FROM (
+        SELECT 'aktif_maclar' as anahtar, (SELECT COUNT(*) FROM maclar WHERE durum = 'aktif') as deger
+        UNION ALL SELECT 'toplam_tahminler', (SELECT COUNT(*) FROM tahminler)
+        UNION ALL SELECT 'toplam_kullanicilar', (SELECT COUNT(DISTINCT user_id) FROM tahminler)
+        UNION ALL SELECT 'toplam_kazananlar', (SELECT COUNT(*) FROM kazananlar)
+    ) e
+    LEFT JOIN istatistik_sayaclari s ON s.anahtar = e.anahtar
+    GROUP BY e.anahtar, e.deger
+    HAVING e.deger <> COALESCE(SUM(s.deger), 0)
+'''
+
+USER_DRIFT_QUERY = '''
+    SELECT user_id, SUM(sayi) as fark
+    FROM (
+        SELECT user_id, COUNT(*) as sayi FROM tahminler GROUP BY user_id
+        UNION ALL
+        SELECT user_id, -tahmin_sayisi FROM kullanici_tahmin_sayilari
+    ) x
+    GROUP BY user_id
+    HAVING SUM(sayi) <> 0
+'''
+
+
+def get_stats(cursor):
+    """Trigger'larla güncel tutulan sayaçları oku (tablo boyutundan bağımsız)"""
+    cursor.execute('''
+        SELECT anahtar, SUM(deger) as deger
+        FROM istatistik_sayaclari
+        GROUP BY anahtar
+    ''')
+    stats = dict.fromkeys(COUNTER_KEYS, 0)
+    for row in cursor.fetchall():
+        stats[row['anahtar']] = int(row['deger'])
+    return stats
+
+
+def fill_counters(cursor):
+    """Sayaçları tam sayımdan yeniden yaz - çağıran transaction tabloları kilitlemiş olmalı"""
+    cursor.execute('''
+        DELETE FROM kullanici_tahmin_sayilari
+        WHERE NOT EXISTS (SELECT 1 FROM tahminler t WHERE t.user_id = kullanici_tahmin_sayilari.user_id)
+    ''')
+    cursor.execute('''
+        INSERT INTO kullanici_tahmin_sayilari AS k (user_id, tahmin_sayisi)
+        SELECT user_id, COUNT(*) FROM tahminler GROUP BY user_id
+        ON CONFLICT (user_id) DO UPDATE SET tahmin_sayisi = EXCLUDED.tahmin_sayisi
+        WHERE k.tahmin_sayisi <> EXCLUDED.tahmin_sayisi
+    ''')
+
+    cursor.execute(EXACT_STATS_QUERY)
+    exact = cursor.fetchone()
+
+    cursor.execute('DELETE FROM istatistik_sayaclari')
+    for key in COUNTER_KEYS:
+        cursor.execute('''
+            INSERT INTO istatistik_sayaclari (anahtar, parca, deger) VALUES (%s, 0, %s)
+        ''', (key, exact[key]))
+    return {key: int(exact[key]) for key in COUNTER_KEYS}
+
+
+def reconcile_stats():
+    """Sayaçları tam sayımla karşılaştırıp düzelt -> {anahtar: fark} (başka kopya çalışıyorsa None)
+
+    Sayım kilitsiz okunur, sadece farklar kısa bir transaction'da artış olarak eklenir;
+    artışlar trigger'ların eşzamanlı güncellemeleriyle çakışmaz.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        if not try_advisory_lock(cursor, STATS_LOCK_ID):
+            conn.rollback()
+            return None
+        try:
+            cursor.execute(DRIFT_QUERY)
+            drift = {row['anahtar']: int(row['fark']) for row in cursor.fetchall()}
+            cursor.execute(USER_DRIFT_QUERY)
+            user_drift = [(row['user_id'], int(row['fark'])) for row in cursor.fetchall()]
+            conn.rollback()
+
+            if drift or user_drift:
+                _apply_drift(cursor, drift, user_drift)
+                conn.commit()
+        finally:
+            advisory_unlock(cursor, STATS_LOCK_ID)
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    if drift:
+        logging.warning(f"İstatistik sayaçları düzeltildi: {drift}")
+    if user_drift:
+        logging.warning(f"{len(user_drift)} kullanıcının tahmin sayacı düzeltildi")
+    return drift
+
+
+def _apply_drift(cursor, drift, user_drift):
+    """Farkları sayaçlara artış olarak ekle (mevcut değerler yeniden yazılmaz)"""
+    for key, fark in drift.items():
+        cursor.execute('''
+            INSERT INTO istatistik_sayaclari AS s (anahtar, parca, deger) VALUES (%s, 0, %s)
+            ON CONFLICT (anahtar, parca) DO UPDATE SET deger = s.deger + EXCLUDED.deger
+        ''', (key, fark))
+    if user_drift:
+        execute_values(cursor, '''
+            INSERT INTO kullanici_tahmin_sayilari AS k (user_id, tahmin_sayisi) VALUES %s
+            ON CONFLICT (user_id) DO UPDATE SET tahmin_sayisi = k.tahmin_sayisi + EXCLUDED.tahmin_sayisi
+        ''', user_drift)
+        cursor.execute('''
+            DELETE FROM kullanici_tahmin_sayilari WHERE user_id = ANY(%s) AND tahmin_sayisi <= 0
+        ''', ([user_id for user_id, _ in user_drift],))
+
+
+class StatsReconciler:
+    """Sayaçları periyodik olarak tam sayımla uzlaştıran arka plan thread'i"""
+
+    def __init__(self, interval=STATS_RECONCILE_INTERVAL):
+        self.interval = interval
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='stats-reconciler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                reconcile_stats()
+            except Exception as e:
+                logging.error(f"İstatistik uzlaştırma hatası: {e}")
+
+
+if __name__ == '__main__':
+    # Cron ile de çalıştırılabilir: python stats.py
+    drift = reconcile_stats()
+    if drift is None:
+        print("ℹ️ Başka bir uzlaştırma çalışıyor")
+    else:
+        print(f"✅ İstatistik sayaçları uzlaştırıldı (fark: {drift or 'yok'})")
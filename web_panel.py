@@ -1,14 +1,26 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, Response, stream_with_context, g
+from flask import before_render_template, template_rendered
 import os
-import psycopg2
-import psycopg2.extras
+import base64
+import binascii
 import json
-import random
+import time
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import hashlib
 from functools import wraps
-from bot import init_database
+from migrations import run_migrations
+from database import get_db_connection, is_sqlite, notify_matches_changed, notify_predictions_deleted, SLOW_QUERY_MS
+from panel_cache import TTLCache
+from stats import get_stats
+from winners import determine_winners
+from points import update_match_points, standings_page, POINTS_EXACT_SCORE, POINTS_GOAL_DIFFERENCE, POINTS_OUTCOME
+from export import stream_query, EXPORT_FORMATS
+from fixtures import FixtureError, parse_fixtures, validate_fixtures, import_fixtures
+from lottery import NotEnoughCandidates, draw_general, draw_match
+from metrics import Histogram, start_metrics_server
+from slow_queries import SlowQueryRecorder, SIRALAMALAR, SLOW_QUERY_EXPLAIN_MS, list_slow_queries
+from profiler import RequestProfile, save_profile
 
 
 load_dotenv()
@@ -16,6 +28,93 @@ load_dotenv()
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'mac-tahmin-super-secret-key-2024-render')
 
+# Prometheus metrikleri bu yerel portta sunulur (her gunicorn worker'ı sıradaki boş portu alır, 0: kapalı)
+PANEL_METRICS_PORT = int(os.environ.get('PANEL_METRICS_PORT', 9102))
+
+ROUTE_SECONDS = Histogram('panel_request_seconds', 'Panel isteği süresi', ('rota', 'metod', 'durum'))
+
+# Eşiği aşan sorgular parmak iziyle toplanır, en yavaşlarının planı alınır
+slow_query_recorder = SlowQueryRecorder('panel')
+
+_metrics_pid = None
+
+@app.before_request
+def start_request_timer():
+    """İstek süresini ölçmeye başla (metrik sunucusu ve yavaş sorgu kaydı worker başına ilk istekte açılır)"""
+    global _metrics_pid
+    if _metrics_pid != os.getpid():
+        _metrics_pid = os.getpid()
+        start_metrics_server(PANEL_METRICS_PORT)
+        slow_query_recorder.start()
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    """Rota şablonu ile süreyi kaydet (/mac_tahminleri/<int:mac_id> tek seri)"""
+    start = g.get('request_start')
+    if start is not None:
+        rota = request.url_rule.rule if request.url_rule else 'bilinmeyen'
+        ROUTE_SECONDS.observe(time.perf_counter() - start, rota=rota, metod=request.method,
+                              durum=str(response.status_code))
+    return response
+
+# super_admin herhangi bir sayfanın adresine ?profil=1 ekleyerek isteği profilleyebilir
+PROFILE_PARAM = 'profil'
+
+@app.before_request
+def start_profile():
+    """İstenirse isteği cProfile ile ölçmeye başla (sadece super_admin)"""
+    if PROFILE_PARAM not in request.args or request.endpoint == 'static':
+        return
+    user = get_current_user()
+    if not user or user['yetki_seviyesi'] != 'super_admin':
+        return
+    profile = RequestProfile()
+    try:
+        profile.start()
+    except ValueError as e:
+        print_colored(f"⚠️ Profil başlatılamadı: {e}", Colors.YELLOW)
+        return
+    g.profile = profile
+
+@before_render_template.connect_via(app)
+def profile_template_started(sender, template, context, **extra):
+    profile = g.get('profile')
+    if profile is not None:
+        profile.template_started()
+
+@template_rendered.connect_via(app)
+def profile_template_finished(sender, template, context, **extra):
+    profile = g.get('profile')
+    if profile is not None:
+        profile.template_finished()
+
+@app.after_request
+def finish_profile(response):
+    """Profili bitir ve kaydet - kimlik X-Profil-Id başlığında döner"""
+    profile = g.pop('profile', None)
+    if profile is None:
+        return response
+    sonuc = profile.stop()
+    try:
+        rota = request.url_rule.rule if request.url_rule else request.path
+        profil_id = save_profile(rota, request.full_path, session.get('kullanici_adi'),
+                                 response.status_code, sonuc)
+        response.headers['X-Profil-Id'] = str(profil_id)
+        print_colored(f"🔬 Profil #{profil_id}: {request.path} {sonuc['toplam_ms']:.0f} ms "
+                      f"(DB {sonuc['db_ms']:.0f} ms / {sonuc['db_sorgu']} sorgu, şablon {sonuc['sablon_ms']:.0f} ms)",
+                      Colors.PURPLE)
+    except Exception as e:
+        print_colored(f"❌ Profil kaydedilemedi: {e}", Colors.RED)
+    return response
+
+@app.teardown_request
+def stop_profile(exc):
+    """after_request çalışmadıysa profiler açık kalmasın"""
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.stop()
+
 # Bu satırı ekleyin:
 @app.context_processor
 def inject_user():
@@ -36,13 +135,6 @@ def print_colored(message, color=Colors.CYAN):
     """Production'da konsol çıktısı için"""
     print(f"{color}{message}{Colors.END}")
 
-def get_db_connection():
-    """PostgreSQL bağlantısı"""
-    database_url = os.environ.get('DATABASE_URL')
-    if not database_url:
-        raise Exception("DATABASE_URL environment variable is required!")
-    return psycopg2.connect(database_url, cursor_factory=psycopg2.extras.RealDictCursor)
-
 def hash_password(password):
     """Şifreyi hash'le"""
     return hashlib.sha256(password.encode()).hexdigest()
@@ -60,11 +152,41 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def super_admin_required(f):
+    """Sadece super_admin yetkisindeki yöneticiler"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        user = get_current_user()
+        if not user or user['yetki_seviyesi'] != 'super_admin':
+            flash('❌ Bu sayfa için yetkiniz yok!', 'error')
+            return redirect(url_for('dashboard'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+# Giriş yapan yöneticinin bilgisi kısa süre önbellekte tutulur (her render'da sorgu yerine)
+CURRENT_USER_TTL = float(os.environ.get('CURRENT_USER_TTL', 30))
+current_user_cache = TTLCache(ttl=CURRENT_USER_TTL)
+
 def get_current_user():
-    """Mevcut kullanıcı bilgilerini getir"""
+    """Mevcut kullanıcı bilgilerini getir (istek başına bir kez çözülür)"""
     if 'user_id' not in session:
         return None
     
+    if 'current_user' in g:
+        return g.current_user
+    
+    user_id = session['user_id']
+    user = current_user_cache.get(user_id)
+    if user is None:
+        user = load_current_user(user_id)
+        if user is not None:
+            current_user_cache.set(user_id, user)
+    
+    g.current_user = user
+    return user
+
+def load_current_user(user_id):
+    """Yönetici bilgisini veritabanından oku (pasif yöneticiler için None)"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
@@ -73,16 +195,21 @@ def get_current_user():
             SELECT id, kullanici_adi, tam_isim, yetki_seviyesi 
             FROM yoneticiler 
             WHERE id = %s AND aktif = true
-        ''', (session['user_id'],))
+        ''', (user_id,))
         
         user = cursor.fetchone()
-        return user
+        return dict(user) if user else None
     except Exception as e:
         print_colored(f"❌ Kullanıcı bilgisi alınamadı: {e}", Colors.RED)
         return None
     finally:
         conn.close()
 
+def invalidate_current_user(user_id):
+    """Çıkış, şifre değişikliği veya pasifleştirmede önbelleği temizle"""
+    current_user_cache.invalidate(user_id)
+    g.pop('current_user', None)
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     """Giriş yapma sayfası"""
@@ -111,6 +238,7 @@ def login():
             
             if user and user['aktif'] and verify_password(sifre, user['sifre_hash']):
                 # Giriş başarılı
+                invalidate_current_user(user['id'])
                 session['user_id'] = user['id']
                 session['kullanici_adi'] = user['kullanici_adi']
                 session['tam_isim'] = user['tam_isim']
@@ -145,6 +273,7 @@ def login():
 def logout():
     """Çıkış yapma"""
     kullanici_adi = session.get('kullanici_adi', 'Bilinmeyen')
+    invalidate_current_user(session.get('user_id'))
     session.clear()
     flash('✅ Başarıyla çıkış yaptınız!', 'info')
     print_colored(f"👋 Çıkış yapıldı: {kullanici_adi}", Colors.YELLOW)
@@ -196,6 +325,7 @@ def change_password():
             ''', (yeni_sifre_hash, session['user_id']))
             
             conn.commit()
+            invalidate_current_user(session['user_id'])
             
             flash('✅ Şifreniz başarıyla değiştirildi!', 'success')
             print_colored(f"🔐 Şifre değiştirildi: {session['kullanici_adi']}", Colors.GREEN)
@@ -219,18 +349,8 @@ def dashboard():
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    # İstatistikler
-    cursor.execute("SELECT COUNT(*) FROM maclar WHERE durum='aktif'")
-    aktif_maclar = cursor.fetchone()['count']
-    
-    cursor.execute("SELECT COUNT(*) FROM tahminler")
-    toplam_tahminler = cursor.fetchone()['count']
-    
-    cursor.execute("SELECT COUNT(DISTINCT user_id) FROM tahminler")
-    toplam_kullanicilar = cursor.fetchone()['count']
-    
-    cursor.execute("SELECT COUNT(*) FROM kazananlar")
-    toplam_kazananlar = cursor.fetchone()['count']
+    # İstatistikler (trigger'larla tutulan sayaçlardan)
+    stats = get_stats(cursor)
     
     # Son maçlar
     cursor.execute('''
@@ -243,13 +363,6 @@ def dashboard():
     
     conn.close()
     
-    stats = {
-        'aktif_maclar': aktif_maclar,
-        'toplam_tahminler': toplam_tahminler,
-        'toplam_kullanicilar': toplam_kullanicilar,
-        'toplam_kazananlar': toplam_kazananlar
-    }
-    
     return render_template('dashboard.html', stats=stats, son_maclar=son_maclar)
 
 @app.route('/maclar')
@@ -285,32 +398,31 @@ def mac_sil(mac_id):
     mac_info = cursor.fetchone()
     
     if not mac_info:
+        conn.close()
         flash('❌ Maç bulunamadı!', 'error')
         return redirect(url_for('maclar'))
     
     mac_adi = mac_info['mac_adi']
     
     # İlişkili verileri say
-    cursor.execute('''
-        SELECT COUNT(*) FROM tahminler 
-        WHERE mac_id = %s OR mac_adi = %s
-    ''', (mac_id, mac_adi))
+    cursor.execute('SELECT COUNT(*) as count FROM tahminler WHERE mac_id = %s', (mac_id,))
     tahmin_sayisi = cursor.fetchone()['count']
     
-    cursor.execute('SELECT COUNT(*) FROM kazananlar WHERE mac_id = %s', (mac_id,))
+    cursor.execute('SELECT COUNT(*) as count FROM kazananlar WHERE mac_id = %s', (mac_id,))
     kazanan_sayisi = cursor.fetchone()['count']
     
     try:
-        # İlişkili verileri sil
-        cursor.execute('''
-            DELETE FROM tahminler 
-            WHERE mac_id = %s OR mac_adi = %s
-        ''', (mac_id, mac_adi))
+        # İlişkili verileri sil (maçın puanları sıralamadan düşülür)
+        update_match_points(cursor, mac_id, None)
+        cursor.execute('DELETE FROM tahminler WHERE mac_id = %s', (mac_id,))
+        notify_predictions_deleted(cursor, mac_id)
         
         cursor.execute('DELETE FROM kazananlar WHERE mac_id = %s', (mac_id,))
         cursor.execute('DELETE FROM maclar WHERE id = %s', (mac_id,))
+        notify_matches_changed(cursor, mac_id)
         
         conn.commit()
+        panel_verisi_degisti()
         
         flash(f'✅ {mac_adi} maçı silindi! ({tahmin_sayisi} tahmin, {kazanan_sayisi} kazanan)', 'success')
         print_colored(f"🗑️ Maç silindi: {mac_adi} (Tahmin: {tahmin_sayisi}, Kazanan: {kazanan_sayisi})", Colors.RED)
@@ -342,9 +454,12 @@ def mac_ekle():
         cursor.execute('''
             INSERT INTO maclar (mac_adi, takim1, takim2, mac_tarihi)
             VALUES (%s, %s, %s, %s)
+            RETURNING id
         ''', (mac_adi, takim1, takim2, mac_tarihi))
+        notify_matches_changed(cursor, cursor.fetchone()['id'])
         
         conn.commit()
+        panel_verisi_degisti()
         conn.close()
         
         flash(f'✅ {mac_adi} maçı başarıyla eklendi!', 'success')
@@ -354,6 +469,37 @@ def mac_ekle():
     
     return render_template('mac_ekle.html')
 
+@app.route('/mac_ekle_toplu', methods=['GET', 'POST'])
+@login_required
+def mac_ekle_toplu():
+    """CSV/JSON fikstür dosyasından toplu maç ekleme"""
+    if request.method == 'POST':
+        dosya = request.files.get('dosya')
+        if not dosya or not dosya.filename:
+            flash('❌ Dosya seçin!', 'error')
+            return redirect(url_for('mac_ekle_toplu'))
+        
+        fmt = 'json' if dosya.filename.lower().endswith('.json') else 'csv'
+        try:
+            fixtures, hatalar = validate_fixtures(parse_fixtures(dosya.read(), fmt))
+            rapor = import_fixtures(fixtures, update_existing=bool(request.form.get('guncelle')))
+        except FixtureError as e:
+            flash(f'❌ {e}', 'error')
+            return redirect(url_for('mac_ekle_toplu'))
+        except Exception as e:
+            flash(f'❌ İçe aktarma hatası: {str(e)}', 'error')
+            print_colored(f"❌ Toplu maç ekleme hatası: {str(e)}", Colors.RED)
+            return redirect(url_for('mac_ekle_toplu'))
+        
+        panel_verisi_degisti()
+        flash(f'✅ {len(rapor["eklenen"])} maç eklendi, {len(rapor["guncellenen"])} güncellendi', 'success')
+        print_colored(f"✅ Toplu maç ekleme: {len(rapor['eklenen'])} eklendi, "
+                      f"{len(rapor['cakisan'])} çakışma, {len(hatalar)} hatalı satır", Colors.GREEN)
+        
+        return render_template('mac_ekle_toplu.html', rapor=rapor, hatalar=hatalar)
+    
+    return render_template('mac_ekle_toplu.html', rapor=None, hatalar=[])
+
 @app.route('/mac_duzenle/<int:mac_id>', methods=['GET', 'POST'])
 @login_required
 def mac_duzenle(mac_id):
@@ -375,10 +521,10 @@ def mac_duzenle(mac_id):
         mac_adi = f"{takim1}-{takim2}"
         
         # Eski maç bilgisini al
-        cursor.execute('SELECT gercek_skor, mac_adi FROM maclar WHERE id=%s', (mac_id,))
+        cursor.execute('SELECT gercek_skor, mac_adi, durum FROM maclar WHERE id=%s', (mac_id,))
         eski_mac = cursor.fetchone()
         eski_gercek_skor = eski_mac['gercek_skor'] if eski_mac else None
-        eski_mac_adi = eski_mac['mac_adi'] if eski_mac else None
+        eski_durum = eski_mac['durum'] if eski_mac else None
         
         # Maçı güncelle
         cursor.execute('''
@@ -387,50 +533,19 @@ def mac_duzenle(mac_id):
             WHERE id=%s
         ''', (mac_adi, takim1, takim2, mac_tarihi, gercek_skor, durum, mac_id))
         
+        # Skor girildi, değişti veya silindi: sadece bu maçın puan farkı sıralamaya yansır.
+        # Skor girildikten sonra gelen tahminler bot yolunda puanlanmaz, maç aktiflikten çıkınca eklenir
+        if gercek_skor != eski_gercek_skor or (eski_durum == 'aktif' and durum != 'aktif'):
+            update_match_points(cursor, mac_id, gercek_skor)
+        
         # Eğer gerçek skor yeni girildiyse veya değiştiyse, otomatik kazananları belirle
         if gercek_skor and gercek_skor != eski_gercek_skor:
             print_colored(f"🎯 Gerçek skor güncellendi: {mac_adi} - {gercek_skor}", Colors.YELLOW)
             
-            # Bu maça tahmin yapan TÜM kullanıcıları bul
-            cursor.execute('''
-                SELECT DISTINCT user_id, username, skor_tahmini, mac_adi
-                FROM tahminler
-                WHERE (mac_id = %s OR mac_adi = %s OR mac_adi = %s) 
-                AND skor_tahmini = %s
-            ''', (mac_id, mac_adi, eski_mac_adi, gercek_skor))
-            
-            dogru_tahminler = cursor.fetchall()
+            # Doğru tahmin yapanlar tek sorguda kazanan olarak yazılır
+            kazanan_sayisi = determine_winners(cursor, mac_id, gercek_skor)
             
-            if dogru_tahminler:
-                # Mevcut kazananları temizle
-                cursor.execute('DELETE FROM kazananlar WHERE mac_id = %s', (mac_id,))
-                
-                # Yeni kazananları ekle
-                kazanan_sayisi = 0
-                for tahmin in dogru_tahminler:
-                    user_id, username, skor_tahmini_user, tahmin_mac_adi = tahmin['user_id'], tahmin['username'], tahmin['skor_tahmini'], tahmin['mac_adi']
-                    
-                    # Aynı kullanıcının birden fazla kaydı varsa sadece bir kez ekle
-                    cursor.execute('''
-                        SELECT COUNT(*) as count FROM kazananlar 
-                        WHERE mac_id = %s AND user_id = %s
-                    ''', (mac_id, user_id))
-                    
-                    if cursor.fetchone()['count'] == 0:
-                        cursor.execute('''
-                            INSERT INTO kazananlar (mac_id, user_id, username, dogru_tahmin, cekilis_durumu)
-                            VALUES (%s, %s, %s, %s, 'otomatik')
-                        ''', (mac_id, user_id, username, skor_tahmini_user))
-                        kazanan_sayisi += 1
-                        print_colored(f"✅ Kazanan eklendi: @{username} - {skor_tahmini_user}", Colors.GREEN)
-                
-                # Tahminler tablosundaki mac_id'leri de güncelle
-                cursor.execute('''
-                    UPDATE tahminler 
-                    SET mac_id = %s 
-                    WHERE (mac_adi = %s OR mac_adi = %s) AND mac_id IS NULL
-                ''', (mac_id, mac_adi, eski_mac_adi))
-                
+            if kazanan_sayisi:
                 flash(f'✅ {mac_adi} maçı güncellendi! {kazanan_sayisi} kazanan otomatik belirlendi!', 'success')
                 print_colored(f"🎉 {kazanan_sayisi} kazanan otomatik belirlendi: {mac_adi} - {gercek_skor}", Colors.GREEN)
             else:
@@ -439,7 +554,9 @@ def mac_duzenle(mac_id):
         else:
             flash(f'✅ {mac_adi} maçı güncellendi!', 'success')
         
+        notify_matches_changed(cursor, mac_id)
         conn.commit()
+        panel_verisi_degisti()
         conn.close()
         
         return redirect(url_for('maclar'))
@@ -492,137 +609,223 @@ def mac_duzenle(mac_id):
                          tarih_okunabilir=tarih_okunabilir)
 
 
-@app.route('/tahminler')
-@login_required
-def tahminler():
-    """Geliştirilmiş tahminler sayfası - Site kullanıcı adı ile"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Sayfa parametresi
-    page = request.args.get('page', 1, type=int)
-    per_page = 50
-    offset = (page - 1) * per_page
-    
-    # Filtreleme parametreleri
-    mac_filter = request.args.get('mac', '')
-    kullanici_filter = request.args.get('kullanici', '')
-    durum_filter = request.args.get('durum', '')
-    
-    # Base query - Site kullanıcı adı ile birleştir
-    query = '''
-        SELECT t.id, t.username, t.mac_adi, t.skor_tahmini, t.tarih, 
+# /tahminler ve sayım sorgusunun ortak gövdesi (sadece mac_id ile birleşir)
+TAHMINLER_FROM = '''
+        FROM tahminler t 
+        LEFT JOIN maclar m ON t.mac_id = m.id
+        LEFT JOIN kullanicilar k ON t.user_id = k.user_id
+        WHERE 1=1
+'''
+
+TAHMINLER_SELECT = '''
+        SELECT t.id, t.username, COALESCE(m.mac_adi, t.mac_adi) as mac_adi, t.skor_tahmini, t.tarih, 
                m.gercek_skor, m.durum,
                k.site_username,
                CASE 
                    WHEN m.gercek_skor IS NULL THEN 'beklemede'
                    WHEN t.skor_tahmini = m.gercek_skor THEN 'dogru'
                    ELSE 'yanlis'
-               END as tahmin_durumu
-        FROM tahminler t 
-        LEFT JOIN maclar m ON (t.mac_id = m.id OR t.mac_adi = m.mac_adi)
-        LEFT JOIN kullanicilar k ON t.user_id = k.user_id
-        WHERE 1=1
-    '''
-    
+               END as tahmin_durumu''' + TAHMINLER_FROM
+
+
+def tahmin_filtreleri(mac_filter, kullanici_filter, durum_filter):
+    """/tahminler filtrelerini WHERE ekine çevir -> (sql, parametreler)"""
+    sql = ''
     params = []
     
-    # Filtreleri ekle
     if mac_filter:
-        query += ' AND t.mac_adi ILIKE %s'
+        sql += ' AND m.mac_adi ILIKE %s'
         params.append(f'%{mac_filter}%')
     
     if kullanici_filter:
-        query += ' AND (t.username ILIKE %s OR k.site_username ILIKE %s)'
+        sql += ' AND (t.username ILIKE %s OR k.site_username ILIKE %s)'
         params.append(f'%{kullanici_filter}%')
         params.append(f'%{kullanici_filter}%')
     
     if durum_filter:
         if durum_filter == 'dogru':
-            query += ' AND t.skor_tahmini = m.gercek_skor AND m.gercek_skor IS NOT NULL'
+            sql += ' AND t.skor_tahmini = m.gercek_skor AND m.gercek_skor IS NOT NULL'
         elif durum_filter == 'yanlis':
-            query += ' AND t.skor_tahmini != m.gercek_skor AND m.gercek_skor IS NOT NULL'
+            sql += ' AND t.skor_tahmini != m.gercek_skor AND m.gercek_skor IS NOT NULL'
         elif durum_filter == 'beklemede':
-            query += ' AND m.gercek_skor IS NULL'
-    
-    # Toplam sayıyı al (count query'yi de güncelle)
-    count_query = '''
-        SELECT COUNT(*)
-        FROM tahminler t 
-        LEFT JOIN maclar m ON (t.mac_id = m.id OR t.mac_adi = m.mac_adi)
-        LEFT JOIN kullanicilar k ON t.user_id = k.user_id
-        WHERE 1=1
-    '''
-    
-    count_params = []
-    if mac_filter:
-        count_query += ' AND t.mac_adi ILIKE %s'
-        count_params.append(f'%{mac_filter}%')
+            sql += ' AND m.gercek_skor IS NULL'
     
-    if kullanici_filter:
-        count_query += ' AND (t.username ILIKE %s OR k.site_username ILIKE %s)'
-        count_params.append(f'%{kullanici_filter}%')
-        count_params.append(f'%{kullanici_filter}%')
-    
-    if durum_filter:
-        if durum_filter == 'dogru':
-            count_query += ' AND t.skor_tahmini = m.gercek_skor AND m.gercek_skor IS NOT NULL'
-        elif durum_filter == 'yanlis':
-            count_query += ' AND t.skor_tahmini != m.gercek_skor AND m.gercek_skor IS NOT NULL'
-        elif durum_filter == 'beklemede':
-            count_query += ' AND m.gercek_skor IS NULL'
-    
-    cursor.execute(count_query, count_params)
-    total = cursor.fetchone()['count']
-    
-    # Sayfalama ekle
-    query += ' ORDER BY t.tarih DESC LIMIT %s OFFSET %s'
-    params.extend([per_page, offset])
-    
-    cursor.execute(query, params)
-    tahminler_listesi = cursor.fetchall()
-    
-    # İstatistikler (değişmedi)
-    stats_query = '''
+    return sql, params
+
+
+TAHMIN_ISTATISTIK_SELECT = '''
         SELECT 
             COUNT(*) as toplam,
             COUNT(CASE WHEN t.skor_tahmini = m.gercek_skor THEN 1 END) as dogru,
             COUNT(CASE WHEN t.skor_tahmini != m.gercek_skor AND m.gercek_skor IS NOT NULL THEN 1 END) as yanlis,
             COUNT(CASE WHEN m.gercek_skor IS NULL THEN 1 END) as beklemede
         FROM tahminler t 
-        LEFT JOIN maclar m ON (t.mac_id = m.id OR t.mac_adi = m.mac_adi)
-    '''
-    
-    cursor.execute(stats_query)
-    istatistikler = cursor.fetchone()
+        LEFT JOIN maclar m ON t.mac_id = m.id
+'''
+
+TAHMINLER_PER_PAGE = 50
+
+# Toplam sayılar, istatistikler ve maç listesi her sayfa görüntülemesinde yeniden hesaplanmaz
+tahmin_sayim_cache = TTLCache()
+
+
+def panel_verisi_degisti():
+    """Maç/tahmin değişikliğinden sonra bu süreçteki sayım önbelleğini temizle"""
+    tahmin_sayim_cache.invalidate()
+
+
+def sayfa_imleci_olustur(tahmin):
+    """Satırın (tarih, id) anahtarından URL'de taşınabilir imleç üret"""
+    raw = f"{tahmin['tarih'].isoformat()}|{tahmin['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def sayfa_imleci_coz(imlec):
+    """İmleci (tarih, id) ikilisine çevir - geçersizse None"""
+    try:
+        raw = base64.urlsafe_b64decode(imlec + '=' * (-len(imlec) % 4)).decode()
+        tarih, tahmin_id = raw.split('|')
+        return datetime.fromisoformat(tarih), int(tahmin_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        return None
+
+
+def tahmin_sayfasi_getir(cursor, filters, sonra=None, once=None, per_page=TAHMINLER_PER_PAGE):
+    """Tahmin sayfası, toplam, istatistik ve maç listesini tek sorguda (tek snapshot) getir"""
+    where_sql, filter_params = tahmin_filtreleri(filters['mac'], filters['kullanici'], filters['durum'])
+    
+    toplam_key = ('toplam', filters['mac'], filters['kullanici'], filters['durum'])
+    toplam = tahmin_sayim_cache.get(toplam_key)
+    istatistikler = tahmin_sayim_cache.get('istatistik')
+    maclar_listesi = tahmin_sayim_cache.get('maclar')
+    
+    # Önbellekte olmayan özetler aynı sorguya eklenir
+    ozet_kolonlari = ['1 AS _ozet']
+    ozet_params = []
+    if toplam is None:
+        ozet_kolonlari.append('(SELECT COUNT(*)' + TAHMINLER_FROM + where_sql + ') AS _toplam')
+        ozet_params.extend(filter_params)
+    if istatistikler is None:
+        ozet_kolonlari.append('(SELECT row_to_json(s) FROM (' + TAHMIN_ISTATISTIK_SELECT + ') s) AS _istatistik')
+    if maclar_listesi is None:
+        ozet_kolonlari.append(
+            '(SELECT json_agg(mac_adi ORDER BY mac_adi) FROM (SELECT DISTINCT mac_adi FROM maclar) x) AS _maclar'
+        )
+    
+    # Keyset sayfalama: OFFSET yok, her sayfa (tarih, id) index'inden okunur
+    list_params = list(filter_params)
+    if once is not None:
+        keyset_sql = ' AND (t.tarih, t.id) > (%s, %s) ORDER BY t.tarih ASC, t.id ASC'
+        list_params.extend(once)
+    elif sonra is not None:
+        keyset_sql = ' AND (t.tarih, t.id) < (%s, %s) ORDER BY t.tarih DESC, t.id DESC'
+        list_params.extend(sonra)
+    else:
+        keyset_sql = ' ORDER BY t.tarih DESC, t.id DESC'
+    list_params.append(per_page + 1)
+    
+    if is_sqlite():
+        rows, ozet = _tahmin_sayfasi_sqlite(cursor, where_sql, filter_params, keyset_sql, list_params,
+                                            toplam is None, istatistikler is None, maclar_listesi is None)
+    else:
+        cursor.execute(
+            'WITH ozet AS (SELECT ' + ', '.join(ozet_kolonlari) + ') '
+            'SELECT ozet.*, sayfa.* FROM ozet LEFT JOIN LATERAL ('
+            + TAHMINLER_SELECT + where_sql + keyset_sql + ' LIMIT %s'
+            ') sayfa ON true',
+            ozet_params + list_params
+        )
+        rows = cursor.fetchall()
+        ozet = rows[0]
+    
+    if toplam is None:
+        toplam = ozet['_toplam']
+        tahmin_sayim_cache.set(toplam_key, toplam)
+    if istatistikler is None:
+        istatistikler = ozet['_istatistik']
+        tahmin_sayim_cache.set('istatistik', istatistikler)
+    if maclar_listesi is None:
+        maclar_listesi = [{'mac_adi': mac_adi} for mac_adi in ozet['_maclar'] or []]
+        tahmin_sayim_cache.set('maclar', maclar_listesi)
+    
+    tahminler_listesi = [row for row in rows if row['id'] is not None]
+    fazla = len(tahminler_listesi) > per_page
+    tahminler_listesi = tahminler_listesi[:per_page]
+    
+    if once is not None:
+        tahminler_listesi.reverse()
+        has_prev, has_next = fazla, True
+    else:
+        has_prev, has_next = sonra is not None, fazla
+    
+    return {
+        'tahminler': tahminler_listesi,
+        'toplam': toplam,
+        'istatistikler': istatistikler,
+        'maclar': maclar_listesi,
+        'has_prev': has_prev and bool(tahminler_listesi),
+        'has_next': has_next and bool(tahminler_listesi),
+    }
+
+
+def _tahmin_sayfasi_sqlite(cursor, where_sql, filter_params, keyset_sql, list_params,
+                           toplam_gerekli, istatistik_gerekli, maclar_gerekli):
+    """SQLite'da LATERAL/json_agg yok - gömülü veritabanında ayrı sorgular ağ turu maliyeti taşımaz"""
+    ozet = {}
+    if toplam_gerekli:
+        cursor.execute('SELECT COUNT(*) AS sayi' + TAHMINLER_FROM + where_sql, filter_params)
+        ozet['_toplam'] = cursor.fetchone()['sayi']
+    if istatistik_gerekli:
+        cursor.execute(TAHMIN_ISTATISTIK_SELECT)
+        ozet['_istatistik'] = cursor.fetchone()
+    if maclar_gerekli:
+        cursor.execute('SELECT DISTINCT mac_adi FROM maclar ORDER BY mac_adi')
+        ozet['_maclar'] = [row['mac_adi'] for row in cursor.fetchall()]
+
+    cursor.execute(TAHMINLER_SELECT + where_sql + keyset_sql + ' LIMIT %s', list_params)
+    return cursor.fetchall(), ozet
+
+
+@app.route('/tahminler')
+@login_required
+def tahminler():
+    """Geliştirilmiş tahminler sayfası - Site kullanıcı adı ile"""
+    # Filtreleme parametreleri
+    filters = {
+        'mac': request.args.get('mac', ''),
+        'kullanici': request.args.get('kullanici', ''),
+        'durum': request.args.get('durum', '')
+    }
     
-    # Tüm maçları al
-    cursor.execute('SELECT DISTINCT mac_adi FROM maclar ORDER BY mac_adi')
-    maclar_listesi = cursor.fetchall()
+    # Sayfa imleçleri (sayfa numarası sadece gösterim için)
+    sonra = sayfa_imleci_coz(request.args.get('sonra', ''))
+    once = sayfa_imleci_coz(request.args.get('once', '')) if sonra is None else None
+    page = request.args.get('page', 1, type=int) if (sonra or once) else 1
     
-    conn.close()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        sonuc = tahmin_sayfasi_getir(cursor, filters, sonra=sonra, once=once)
+    finally:
+        conn.close()
     
-    # Sayfa bilgileri
-    has_prev = page > 1
-    has_next = offset + per_page < total
-    prev_num = page - 1 if has_prev else None
-    next_num = page + 1 if has_next else None
+    tahminler_listesi = sonuc['tahminler']
+    prev_cursor = sayfa_imleci_olustur(tahminler_listesi[0]) if sonuc['has_prev'] else None
+    next_cursor = sayfa_imleci_olustur(tahminler_listesi[-1]) if sonuc['has_next'] else None
     
     return render_template('tahminler.html', 
                          tahminler=tahminler_listesi,
-                         istatistikler=istatistikler,
-                         maclar=maclar_listesi,
+                         istatistikler=sonuc['istatistikler'],
+                         maclar=sonuc['maclar'],
                          page=page,
-                         has_prev=has_prev,
-                         has_next=has_next,
-                         prev_num=prev_num,
-                         next_num=next_num,
-                         total=total,
-                         filters={
-                             'mac': mac_filter,
-                             'kullanici': kullanici_filter,
-                             'durum': durum_filter
-                         })
+                         has_prev=sonuc['has_prev'],
+                         has_next=sonuc['has_next'],
+                         prev_cursor=prev_cursor,
+                         next_cursor=next_cursor,
+                         prev_num=max(page - 1, 1),
+                         next_num=page + 1,
+                         total=sonuc['toplam'],
+                         filters=filters)
 
 
 @app.route('/mac_tahminleri/<int:mac_id>')
@@ -640,9 +843,9 @@ def mac_tahminleri(mac_id):
     cursor.execute('''
         SELECT t.id, t.user_id, t.username, t.skor_tahmini, t.tarih
         FROM tahminler t
-        WHERE t.mac_id = %s OR t.mac_adi = %s
+        WHERE t.mac_id = %s
         ORDER BY t.tarih ASC
-    ''', (mac_id, mac['mac_adi'] if mac else ''))
+    ''', (mac_id,))
     
     tahminler_listesi = cursor.fetchall()
     
@@ -671,63 +874,89 @@ def kazananlari_belirle(mac_id):
     mac = cursor.fetchone()
     
     if not mac or not mac['gercek_skor']:
+        conn.close()
         flash('❌ Önce maçın gerçek skorunu girin!', 'error')
         return redirect(url_for('mac_tahminleri', mac_id=mac_id))
     
     gercek_skor = mac['gercek_skor']
     
-    # Doğru tahmin yapanları bul
-    cursor.execute('''
-        SELECT user_id, username, skor_tahmini
-        FROM tahminler
-        WHERE (mac_id = %s OR mac_adi = %s) AND skor_tahmini = %s
-    ''', (mac_id, mac['mac_adi'], gercek_skor))
-    
-    dogru_tahminler = cursor.fetchall()
-    
-    # Kazananlar tablosunu temizle
-    cursor.execute('DELETE FROM kazananlar WHERE mac_id = %s', (mac_id,))
-    
-    # Kazananları ekle
-    for tahmin in dogru_tahminler:
-        cursor.execute('''
-            INSERT INTO kazananlar (mac_id, user_id, username, dogru_tahmin)
-            VALUES (%s, %s, %s, %s)
-        ''', (mac_id, tahmin['user_id'], tahmin['username'], tahmin['skor_tahmini']))
+    # Doğru tahmin yapanları kazanan olarak yaz
+    kazanan_sayisi = determine_winners(cursor, mac_id, gercek_skor)
     
     conn.commit()
     conn.close()
     
-    flash(f'✅ {len(dogru_tahminler)} kazanan belirlendi!', 'success')
-    print_colored(f"✅ {mac['mac_adi']} maçı için {len(dogru_tahminler)} kazanan belirlendi", Colors.GREEN)
+    flash(f'✅ {kazanan_sayisi} kazanan belirlendi!', 'success')
+    print_colored(f"✅ {mac['mac_adi']} maçı için {kazanan_sayisi} kazanan belirlendi", Colors.GREEN)
     
     return redirect(url_for('kazananlar', mac_id=mac_id))
 
-@app.route('/kazananlar')
-@login_required
-def kazananlar():
-    """Kazananlar sayfası - Site kullanıcı adı ile"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Kazananları getir - site kullanıcı adı ile birleştir
-    cursor.execute('''
+KAZANANLAR_QUERY = '''
         SELECT 
             t.id,
             t.username,
             COALESCE(k.site_username, '') as site_username,
-            t.mac_adi,
+            m.mac_adi,
             t.skor_tahmini as dogru_tahmin,
             m.gercek_skor,
             t.tarih as tahmin_tarihi,
             m.mac_tarihi
         FROM tahminler t
-        LEFT JOIN maclar m ON t.mac_adi = m.mac_adi
+        JOIN maclar m ON t.mac_id = m.id
         LEFT JOIN kullanicilar k ON t.user_id = k.user_id
         WHERE m.gercek_skor IS NOT NULL 
         AND t.skor_tahmini = m.gercek_skor
         ORDER BY t.tarih DESC
-    ''')
+'''
+
+
+def export_response(query, params, dosya_adi):
+    """Sorguyu ?format=csv|ndjson ile indirilebilir akış olarak döndür"""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Geçersiz format: {fmt}'}), 400
+    
+    dosya_adi = f"{dosya_adi}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    return Response(
+        stream_with_context(stream_query(query, params, fmt)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={
+            'Content-Disposition': f'attachment; filename="{dosya_adi}"',
+            # Proxy (nginx) akışı tamponlamasın
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
+@app.route('/tahminler/export')
+@login_required
+def tahminler_export():
+    """Tahminleri /tahminler filtreleriyle dışa aktar"""
+    where_sql, params = tahmin_filtreleri(
+        request.args.get('mac', ''),
+        request.args.get('kullanici', ''),
+        request.args.get('durum', '')
+    )
+    query = TAHMINLER_SELECT + where_sql + ' ORDER BY t.tarih DESC, t.id DESC'
+    return export_response(query, params, 'tahminler')
+
+
+@app.route('/kazananlar/export')
+@login_required
+def kazananlar_export():
+    """Kazananları dışa aktar"""
+    return export_response(KAZANANLAR_QUERY, (), 'kazananlar')
+
+
+@app.route('/kazananlar')
+@login_required
+def kazananlar():
+    """Kazananlar sayfası - Site kullanıcı adı ile"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    # Kazananları getir - site kullanıcı adı ile birleştir
+    cursor.execute(KAZANANLAR_QUERY)
     
     kazananlar_list = cursor.fetchall()
     
@@ -736,11 +965,50 @@ def kazananlar():
     
     conn.close()
     
-    return render_template('kazananlar.html', 
-                         kazananlar=kazananlar_list, 
+    return render_template('kazananlar.html',
+                         kazananlar=kazananlar_list,
                          toplam_kazanan=toplam_kazanan)
 
 
+SIRALAMA_PER_PAGE = 50
+
+
+def siralama_imleci_coz(imlec):
+    """'sira:user_id' imlecini ikiliye çevir - geçersizse None"""
+    try:
+        sira, user_id = imlec.split(':')
+        return int(sira), int(user_id)
+    except ValueError:
+        return None
+
+
+@app.route('/siralama')
+@login_required
+def siralama():
+    """Puan sıralaması - sıralar skor girilirken hesaplanır, sayfa sadece index'ten okunur"""
+    sonra = siralama_imleci_coz(request.args.get('sonra', ''))
+    page = request.args.get('page', 1, type=int) if sonra else 1
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        satirlar = standings_page(cursor, sonra=sonra, limit=SIRALAMA_PER_PAGE + 1)
+    finally:
+        conn.close()
+
+    has_next = len(satirlar) > SIRALAMA_PER_PAGE
+    satirlar = satirlar[:SIRALAMA_PER_PAGE]
+    next_cursor = f"{satirlar[-1]['sira']}:{satirlar[-1]['user_id']}" if has_next else None
+
+    return render_template('siralama.html',
+                         siralama=satirlar,
+                         page=page,
+                         next_cursor=next_cursor,
+                         puanlar={'tam_skor': POINTS_EXACT_SCORE,
+                                  'gol_farki': POINTS_GOAL_DIFFERENCE,
+                                  'dogru_sonuc': POINTS_OUTCOME})
+
+
 
 
 
@@ -754,23 +1022,20 @@ def cekilis_yap_genel():
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    # Tüm kazananları getir
-    cursor.execute('''
-        SELECT k.id, k.username, m.mac_adi, k.dogru_tahmin, m.gercek_skor
-        FROM kazananlar k
-        JOIN maclar m ON k.mac_id = m.id
-        ORDER BY k.kazanma_tarihi ASC
-    ''')
-    
-    tum_kazananlar = cursor.fetchall()
-    
-    if len(tum_kazananlar) < kazanan_sayisi:
-        flash(f'❌ Yeterli kazanan yok! Mevcut: {len(tum_kazananlar)}, İstenen: {kazanan_sayisi}', 'error')
+    # Adaylar veritabanında örneklenir, tohum ve sonuç cekilisler tablosuna yazılır
+    try:
+        cekilis = draw_general(cursor, kazanan_sayisi, tohum=request.form.get('tohum') or None,
+                               yapan=session.get('kullanici_adi'))
+    except (NotEnoughCandidates, ValueError) as e:
+        conn.rollback()
         conn.close()
+        flash(f'❌ {e}', 'error')
         return redirect(url_for('kazananlar'))
     
-    # Rastgele seç
-    secilen_kazananlar = random.sample(tum_kazananlar, kazanan_sayisi)
+    conn.commit()
+    conn.close()
+    
+    secilen_kazananlar = cekilis['secilenler']
     
     # Session'a kaydet
     session['cekilis_sonucu'] = [
@@ -782,15 +1047,14 @@ def cekilis_yap_genel():
         } for k in secilen_kazananlar
     ]
     
-    conn.close()
-    
     # Başarı mesajı
     kazanan_isimleri = [k['username'] for k in secilen_kazananlar]
-    flash(f'🎉 Çekiliş tamamlandı! {kazanan_sayisi} kazanan seçildi: {", ".join(["@" + isim for isim in kazanan_isimleri])}', 'success')
+    flash(f'🎉 Çekiliş tamamlandı! {kazanan_sayisi} kazanan seçildi: {", ".join(["@" + isim for isim in kazanan_isimleri])} '
+          f'(Çekiliş #{cekilis["id"]}, tohum: {cekilis["tohum"]})', 'success')
     
     # Konsol logu
-    print_colored(f"🎉 Genel çekiliş tamamlandı!", Colors.GREEN + Colors.BOLD)
-    print_colored(f"📊 Toplam Kazanan: {len(tum_kazananlar)}", Colors.CYAN)
+    print_colored(f"🎉 Genel çekiliş tamamlandı! (#{cekilis['id']}, tohum: {cekilis['tohum']})", Colors.GREEN + Colors.BOLD)
+    print_colored(f"📊 Toplam Kazanan: {cekilis['aday_sayisi']}", Colors.CYAN)
     print_colored(f"🏆 Seçilen Sayı: {kazanan_sayisi}", Colors.YELLOW)
     print_colored("🎯 Seçilen Kazananlar:", Colors.GREEN)
     for i, kazanan in enumerate(secilen_kazananlar, 1):
@@ -813,51 +1077,32 @@ def cekilis_yap(mac_id):
     if request.method == 'POST':
         kazanan_sayisi = int(request.form['kazanan_sayisi'])
         
-        # Çekiliş için uygun kazananları getir
-        cursor.execute('''
-            SELECT id, username, user_id FROM kazananlar 
-            WHERE mac_id = %s AND cekilis_durumu IN ('otomatik', 'beklemede')
-            ORDER BY kazanma_tarihi ASC
-        ''', (mac_id,))
-        
-        uygun_kazananlar = cursor.fetchall()
-        
-        if len(uygun_kazananlar) < kazanan_sayisi:
-            flash(f'❌ Çekiliş için yeterli kazanan yok! Mevcut: {len(uygun_kazananlar)}, İstenen: {kazanan_sayisi}', 'error')
+        # Örnekleme, çekiliş kaydı ve durum güncellemesi tek transaction'da
+        try:
+            cekilis = draw_match(cursor, mac_id, kazanan_sayisi, tohum=request.form.get('tohum') or None,
+                                 yapan=session.get('kullanici_adi'))
+        except (NotEnoughCandidates, ValueError) as e:
+            conn.rollback()
             conn.close()
+            flash(f'❌ Çekiliş yapılamadı: {e}', 'error')
             return redirect(url_for('cekilis_yap', mac_id=mac_id))
         
-        # Rastgele kazananları seç
-        secilen_kazananlar = random.sample(uygun_kazananlar, kazanan_sayisi)
-        secilen_ids = [k['id'] for k in secilen_kazananlar]
-        
-        # Çekiliş sonuçlarını güncelle
-        cursor.execute('''
-            UPDATE kazananlar 
-            SET cekilis_durumu = 'kaybetti'
-            WHERE mac_id = %s AND cekilis_durumu IN ('otomatik', 'beklemede')
-        ''', (mac_id,))
-
-                # Seçilenleri kazandı yap
-        if secilen_ids:
-            cursor.execute('''
-                UPDATE kazananlar 
-                SET cekilis_durumu = 'kazandi'
-                WHERE id = ANY(%s)
-            ''', (secilen_ids,))
-        
         conn.commit()
         conn.close()
         
+        secilen_kazananlar = cekilis['secilenler']
+        
         # Başarı mesajı
         kazanan_isimleri = [k['username'] for k in secilen_kazananlar]
-        flash(f'🎉 Çekiliş tamamlandı! {kazanan_sayisi} kazanan seçildi: {", ".join(["@" + isim for isim in kazanan_isimleri])}', 'success')
+        flash(f'🎉 Çekiliş tamamlandı! {kazanan_sayisi} kazanan seçildi: {", ".join(["@" + isim for isim in kazanan_isimleri])} '
+              f'(Çekiliş #{cekilis["id"]}, tohum: {cekilis["tohum"]})', 'success')
+        print_colored(f"🎉 {mac_adi} çekilişi: #{cekilis['id']}, tohum: {cekilis['tohum']}", Colors.GREEN)
         
         return redirect(url_for('kazananlar'))
     
     # GET isteği - Çekiliş sayfasını göster
     cursor.execute('''
-        SELECT COUNT(*) FROM kazananlar 
+        SELECT COUNT(*) as count FROM kazananlar 
         WHERE mac_id = %s AND cekilis_durumu IN ('otomatik', 'beklemede')
     ''', (mac_id,))
     
@@ -916,6 +1161,7 @@ def kazanan_ekle_manuel():
             mac_info = cursor.fetchone()
             
             if not mac_info:
+                conn.close()
                 flash('❌ Seçilen maç bulunamadı!', 'error')
                 return redirect(url_for('kazanan_ekle_manuel'))
             
@@ -936,6 +1182,10 @@ def kazanan_ekle_manuel():
             
             tahmin_id = cursor.fetchone()['id']
             
+            # Skoru girilmiş maça eklenen tahmin sıralamaya yansır
+            if mac_info['gercek_skor']:
+                update_match_points(cursor, mac_id, mac_info['gercek_skor'], user_ids=[user_id])
+            
             # Site kullanıcı adını kullanicilar tablosuna ekle/güncelle
             if site_username:
                 cursor.execute('''
@@ -951,6 +1201,8 @@ def kazanan_ekle_manuel():
                 print_colored(f"✅ Site kullanıcı adı kaydedildi: {site_username}", Colors.GREEN)
             
             conn.commit()
+            panel_verisi_degisti()
+            conn.close()
             
             flash(f'✅ @{username} başarıyla kazanan olarak eklendi! ({mac_adi})', 'success')
             print_colored(f"✅ Manuel kazanan eklendi: @{username} - {mac_adi} - {dogru_tahmin}", Colors.GREEN)
@@ -982,8 +1234,9 @@ def kazanan_sil_genel(kazanan_id):
     try:
         # Kazanan bilgisini al
         cursor.execute('''
-            SELECT t.id as tahmin_id, t.username, t.mac_adi, t.user_id
+            SELECT t.id as tahmin_id, t.username, t.mac_adi, t.user_id, t.mac_id, m.gercek_skor
             FROM tahminler t
+            LEFT JOIN maclar m ON m.id = t.mac_id
             WHERE t.id = %s
         ''', (kazanan_id,))
         
@@ -993,14 +1246,20 @@ def kazanan_sil_genel(kazanan_id):
             username = kazanan_info['username']
             mac_adi = kazanan_info['mac_adi']
             
-            # Tahminler tablosundan sil
+            # Tahminler tablosundan sil (puanı varsa sıralamadan düşülür)
             cursor.execute('DELETE FROM tahminler WHERE id = %s', (kazanan_id,))
+            if kazanan_info['mac_id'] is not None:
+                update_match_points(cursor, kazanan_info['mac_id'], kazanan_info['gercek_skor'],
+                                    user_ids=[kazanan_info['user_id']])
+                # Bot bu tahmini bellekte tutuyorsa unutsun, kullanıcı yeniden tahmin yapabilir
+                notify_predictions_deleted(cursor, kazanan_info['mac_id'], kazanan_info['user_id'])
             
             # Kazananlar tablosundan da sil (eğer varsa)
             cursor.execute('DELETE FROM kazananlar WHERE user_id = %s AND username = %s', 
                          (kazanan_info['user_id'], username))
             
             conn.commit()
+            panel_verisi_degisti()
             flash(f'✅ @{username} kazanan listesinden çıkarıldı! ({mac_adi})', 'success')
             print_colored(f"🗑️ Kazanan silindi: @{username} - {mac_adi}", Colors.RED)
         else:
@@ -1017,6 +1276,103 @@ def kazanan_sil_genel(kazanan_id):
     return redirect(url_for('kazananlar'))
 
 
+@app.route('/yavas_sorgular')
+@login_required
+@super_admin_required
+def yavas_sorgular():
+    """Yavaş sorgu kayıtları ve EXPLAIN çıktıları"""
+    siralama = request.args.get('sirala', 'toplam')
+    if siralama not in SIRALAMALAR:
+        siralama = 'toplam'
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        sorgular = list_slow_queries(cursor, siralama)
+    finally:
+        conn.close()
+    
+    return render_template('yavas_sorgular.html', sorgular=sorgular, siralama=siralama,
+                           esik_ms=SLOW_QUERY_MS, explain_ms=SLOW_QUERY_EXPLAIN_MS)
+
+@app.route('/yavas_sorgular/temizle', methods=['POST'])
+@login_required
+@super_admin_required
+def yavas_sorgular_temizle():
+    """Yavaş sorgu kayıtlarını sıfırla (iyileştirme sonrası temiz ölçüm için)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('DELETE FROM yavas_sorgular')
+        conn.commit()
+        flash(f'✅ {cursor.rowcount} yavaş sorgu kaydı silindi!', 'success')
+    finally:
+        conn.close()
+    return redirect(url_for('yavas_sorgular'))
+
+@app.route('/profiller')
+@login_required
+@super_admin_required
+def profiller():
+    """Kayıtlı istek profilleri"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            SELECT id, rota, yol, yapan, durum, toplam_ms, db_ms, db_sorgu, sablon_ms, python_ms, tarih
+            FROM profiller
+            ORDER BY id DESC
+            LIMIT 200
+        ''')
+        profiller = cursor.fetchall()
+    finally:
+        conn.close()
+    
+    return render_template('profiller.html', profiller=profiller, profil_param=PROFILE_PARAM)
+
+@app.route('/profiller/<int:profil_id>')
+@login_required
+@super_admin_required
+def profil_detay(profil_id):
+    """Profilin süre dağılımı, çağrı ağacı ve pstats tablosu"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            SELECT id, rota, yol, yapan, durum, toplam_ms, db_ms, db_sorgu, sablon_ms, python_ms,
+                   agac, tablo, tarih
+            FROM profiller WHERE id = %s
+        ''', (profil_id,))
+        profil = cursor.fetchone()
+    finally:
+        conn.close()
+    
+    if not profil:
+        flash('❌ Profil bulunamadı!', 'error')
+        return redirect(url_for('profiller'))
+    
+    return render_template('profil_detay.html', profil=profil)
+
+@app.route('/profiller/<int:profil_id>/indir')
+@login_required
+@super_admin_required
+def profil_indir(profil_id):
+    """Ham pstats dosyası (snakeviz, pstats ile açılabilir)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT ham FROM profiller WHERE id = %s', (profil_id,))
+        profil = cursor.fetchone()
+    finally:
+        conn.close()
+    
+    if not profil or profil['ham'] is None:
+        flash('❌ Profil bulunamadı!', 'error')
+        return redirect(url_for('profiller'))
+    
+    return Response(bytes(profil['ham']), mimetype='application/octet-stream',
+                    headers={'Content-Disposition': f'attachment; filename=profil_{profil_id}.prof'})
+
 @app.route('/api/stats')
 @login_required
 def api_stats():
@@ -1024,21 +1380,14 @@ def api_stats():
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    cursor.execute("SELECT COUNT(*) FROM maclar WHERE durum='aktif'")
-    aktif_maclar = cursor.fetchone()['count']
-    
-    cursor.execute("SELECT COUNT(*) FROM tahminler")
-    toplam_tahminler = cursor.fetchone()['count']
-    
-    cursor.execute("SELECT COUNT(DISTINCT user_id) FROM tahminler")
-    toplam_kullanicilar = cursor.fetchone()['count']
+    stats = get_stats(cursor)
     
     conn.close()
     
     return jsonify({
-        'aktif_maclar': aktif_maclar,
-        'toplam_tahminler': toplam_tahminler,
-        'toplam_kullanicilar': toplam_kullanicilar
+        'aktif_maclar': stats['aktif_maclar'],
+        'toplam_tahminler': stats['toplam_tahminler'],
+        'toplam_kullanicilar': stats['toplam_kullanicilar']
     })
 
 # Production için main fonksiyonu
@@ -1046,7 +1395,7 @@ if __name__ == '__main__':
     print_colored("🌐 PostgreSQL Web Yönetim Paneli Başlatılıyor...", Colors.CYAN + Colors.BOLD)
     print_colored("="*50, Colors.CYAN)
     
-    init_database()
+    run_migrations()
 
     # Production için port ayarı
     port = int(os.environ.get('PORT', 5000))
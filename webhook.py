@@ -0,0 +1,187 @@
+import argparse
+import asyncio
+import hmac
+import json
+import logging
+import os
+import signal
+from http import HTTPStatus
+from telegram import Update
+from telegram.ext import Application
+
+# Webhook ayarları
+WEBHOOK_LISTEN = os.environ.get('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.environ.get('WEBHOOK_PORT', os.environ.get('PORT', 8443)))
+WEBHOOK_PATH = os.environ.get('WEBHOOK_PATH', '/telegram')
+WEBHOOK_URL = os.environ.get('WEBHOOK_URL')  # Dışarıdan erişilen adres (load balancer)
+WEBHOOK_SECRET = os.environ.get('WEBHOOK_SECRET')
+WEBHOOK_MAX_CONNECTIONS = int(os.environ.get('WEBHOOK_MAX_CONNECTIONS', 40))
+
+SECRET_HEADER = 'x-telegram-bot-api-secret-token'
+MAX_BODY_SIZE = 1024 * 1024
+KEEPALIVE_TIMEOUT = 75
+
+
+class WebhookServer:
+    """Telegram update'lerini alan gömülü HTTP dinleyicisi (asyncio)"""
+
+    def __init__(self, app: Application, path=WEBHOOK_PATH, secret_token=WEBHOOK_SECRET):
+        self.app = app
+        self.path = path
+        self.secret_token = secret_token
+        self._server = None
+        self.received = 0
+        self.rejected = 0
+
+    async def start(self, host=WEBHOOK_LISTEN, port=WEBHOOK_PORT):
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _dispatch(self, method, target, headers, body):
+        path = target.split('?', 1)[0]
+
+        if path == '/healthz' and method == 'GET':
+            return HTTPStatus.OK
+        if path != self.path:
+            return HTTPStatus.NOT_FOUND
+        if method != 'POST':
+            return HTTPStatus.METHOD_NOT_ALLOWED
+
+        # Secret token doğrulaması (sabit süreli karşılaştırma)
+        if self.secret_token and not hmac.compare_digest(
+            headers.get(SECRET_HEADER, '').encode(), self.secret_token.encode()
+        ):
+            self.rejected += 1
+            logging.warning("Webhook: geçersiz secret token ile istek reddedildi")
+            return HTTPStatus.FORBIDDEN
+
+        try:
+            update = Update.de_json(json.loads(body), self.app.bot)
+        except Exception as e:
+            logging.warning(f"Webhook: geçersiz update gövdesi: {e}")
+            return HTTPStatus.BAD_REQUEST
+
+        # İşleme Application'ın eşzamanlılık sınırı ile arka planda yapılır
+        await self.app.update_queue.put(update)
+        self.received += 1
+        return HTTPStatus.OK
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+                if not request_line:
+                    break
+
+                method, target, version = request_line.decode('latin-1').rstrip('\r\n').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                length = int(headers.get('content-length') or 0)
+
+                if 'chunked' in headers.get('transfer-encoding', '').lower():
+                    status, keep_alive = HTTPStatus.LENGTH_REQUIRED, False
+                elif length > MAX_BODY_SIZE:
+                    status, keep_alive = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status = await self._dispatch(method, target, headers, body)
+
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Length: 0\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1')
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def run_webhook(app: Application):
+    """Botu webhook modunda çalıştır (run_polling yerine)"""
+    if not WEBHOOK_SECRET:
+        raise Exception("WEBHOOK_SECRET environment variable is required in webhook mode!")
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass
+
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+
+    if WEBHOOK_URL:
+        await app.bot.set_webhook(
+            url=WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+            allowed_updates=Update.ALL_TYPES,
+        )
+        logging.info(f"Webhook ayarlandı: {WEBHOOK_URL}")
+
+    server = WebhookServer(app)
+    await app.start()
+    host, port = await server.start()
+    logging.info(f"Webhook dinleniyor: http://{host}:{port}{WEBHOOK_PATH}")
+
+    try:
+        await stop_event.wait()
+    finally:
+        await server.stop()
+        await app.stop()
+        if app.post_stop:
+            await app.post_stop(app)
+        await app.shutdown()
+        if app.post_shutdown:
+            await app.post_shutdown(app)
+
+
+async def replay(url, files, secret_token):
+    """Kaydedilmiş Update JSON dosyalarını webhook'a gönder (yerel test için)"""
+    import httpx
+
+    headers = {'Content-Type': 'application/json'}
+    if secret_token:
+        headers['X-Telegram-Bot-Api-Secret-Token'] = secret_token
+
+    async with httpx.AsyncClient() as client:
+        for path in files:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            # Dosya tek update veya update listesi olabilir
+            for update in data if isinstance(data, list) else [data]:
+                response = await client.post(url, json=update, headers=headers)
+                print(f"{path} #{update.get('update_id')}: {response.status_code}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Kayıtlı Telegram update\'lerini webhook\'a gönder')
+    parser.add_argument('files', nargs='+', help='Update JSON dosyaları')
+    parser.add_argument('--url', default=f'http://127.0.0.1:{WEBHOOK_PORT}{WEBHOOK_PATH}')
+    parser.add_argument('--secret', default=WEBHOOK_SECRET, help='X-Telegram-Bot-Api-Secret-Token')
+    args = parser.parse_args()
+    asyncio.run(replay(args.url, args.files, args.secret))
+
+
+if __name__ == '__main__':
+    main()
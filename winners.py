@@ -0,0 +1,42 @@
+# Kazanan belirleme motoru - panelin tüm kazanan yolları bunu kullanır
+from database import is_sqlite
+
+
+def determine_winners(cursor, mac_id, gercek_skor):
+    """Maçın otomatik kazananlarını tek INSERT ... SELECT ile yeniden belirle -> kazanan sayısı
+
+    Commit çağırana aittir; maçın mevcut kazananları (çekiliş sonuçları dahil) silinir.
+    """
+    cursor.execute('DELETE FROM kazananlar WHERE mac_id = %s', (mac_id,))
+
+    if is_sqlite():
+        # DISTINCT ON ve veri değiştiren CTE yok: pencere fonksiyonu + eklenen satır sayısı
+        cursor.execute('''
+            INSERT INTO kazananlar (mac_id, user_id, username, dogru_tahmin, cekilis_durumu)
+            SELECT mac_id, user_id, username, skor_tahmini, 'otomatik'
+            FROM (
+                SELECT mac_id, user_id, username, skor_tahmini,
+                       ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY tarih, id) AS sira
+                FROM tahminler
+                WHERE mac_id = %s AND skor_tahmini = %s
+            )
+            WHERE sira = 1
+            ON CONFLICT ON CONSTRAINT kazananlar_mac_user_unique DO NOTHING
+        ''', (mac_id, gercek_skor))
+        return cursor.rowcount
+
+    # Kullanıcının birden fazla doğru kaydı varsa ilki alınır
+    cursor.execute('''
+        WITH eklenen AS (
+            INSERT INTO kazananlar (mac_id, user_id, username, dogru_tahmin, cekilis_durumu)
+            SELECT DISTINCT ON (user_id) mac_id, user_id, username, skor_tahmini, 'otomatik'
+            FROM tahminler
+            WHERE mac_id = %s AND skor_tahmini = %s
+            ORDER BY user_id, tarih, id
+            ON CONFLICT ON CONSTRAINT kazananlar_mac_user_unique DO NOTHING
+            RETURNING 1
+        )
+        SELECT COUNT(*) as sayi FROM eklenen
+    ''', (mac_id, gercek_skor))
+
+    return cursor.fetchone()['sayi']